@@ -2,41 +2,62 @@ from __future__ import annotations
 
 import hmac
 
-from fastapi import Depends, HTTPException, Security, status
+from fastapi import Depends, HTTPException, Request, Security, status
 from fastapi.security import APIKeyHeader
 
 from app.config import settings
+from app.services.idempotency import IdempotencyCache
 from app.services.relay_service import RelayService
 
 _relay_service: RelayService | None = None
+_idempotency_cache = IdempotencyCache(
+    max_entries=settings.idempotency_max_entries,
+    ttl_s=settings.idempotency_ttl_s,
+)
 
 _api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Dependencies that never block are ``async def``: FastAPI runs sync
+# dependencies in the threadpool, which would cost a thread hop each.
+# Anything that queries the service stays sync, since in multi-worker mode
+# that is a blocking call to the device owner.
+
 
 def init_relay_service(service: RelayService) -> None:
     global _relay_service
     _relay_service = service
 
 
-def verify_api_key(api_key: str | None = Security(_api_key_header)) -> None:
+def is_valid_api_key(api_key: str | None) -> bool:
+    """Check a presented API key against ``RELAY_API_KEY``.
+
+    Always ``True`` when authentication is disabled.  Uses constant-time
+    comparison to prevent timing side-channel attacks.
+    """
+    if not settings.api_key:
+        return True
+    # Compare bytes: compare_digest rejects non-ASCII str, and header
+    # values can carry any latin-1 character.
+    return bool(api_key) and hmac.compare_digest(
+        (api_key or "").encode(), settings.api_key.encode()
+    )
+
+
+async def verify_api_key(api_key: str | None = Security(_api_key_header)) -> None:
     """Verify API key if authentication is enabled.
 
     When ``RELAY_API_KEY`` is set, every request must include
     a matching ``X-API-Key`` header.  When the setting is empty
     (the default) authentication is disabled.
-
-    Uses constant-time comparison to prevent timing side-channel attacks.
     """
-    if not settings.api_key:
-        return
-    if not api_key or not hmac.compare_digest(api_key, settings.api_key):
+    if not is_valid_api_key(api_key):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing API key",
         )
 
 
-def get_relay_service(
+async def get_relay_service(
     _auth: None = Depends(verify_api_key),
 ) -> RelayService:
     if _relay_service is None:
@@ -44,7 +65,7 @@ def get_relay_service(
     return _relay_service
 
 
-def get_relay_service_public() -> RelayService:
+async def get_relay_service_public() -> RelayService:
     """Public access — no authentication required.
 
     Use only for endpoints that must be accessible without credentials,
@@ -69,3 +90,23 @@ def require_device(
             detail="USB relay device is not connected",
         )
     return service
+
+
+async def get_idempotency_cache() -> IdempotencyCache:
+    """Shared cache of recent results for ``Idempotency-Key`` replays."""
+    return _idempotency_cache
+
+
+async def get_idempotency_client(request: Request) -> str:
+    """Client an ``Idempotency-Key`` belongs to: its network address.
+
+    ``RELAY_API_KEY`` is a single shared key, so it cannot tell clients
+    apart.
+    """
+    return request.client.host if request.client else ""
+
+
+async def require_debug_endpoints() -> None:
+    """Hide debug routes (404) unless ``RELAY_DEBUG_ENDPOINTS`` is set."""
+    if not settings.debug_endpoints:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
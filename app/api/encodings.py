@@ -0,0 +1,150 @@
+"""Compact relay-state encodings for ``GET``/``PUT /api/v1/relays``.
+
+Besides JSON, the collection endpoint speaks three compact forms chosen
+by the ``Accept`` header (and, for bulk ``PUT``, ``Content-Type``):
+
+``application/octet-stream``
+    Raw bitmask: ``ceil(channels / 8)`` bytes, little-endian, bit
+    ``ch - 1`` set when channel ``ch`` is ON.
+``application/vnd.relay.versioned-bitmask``
+    ``<QH`` header (state version, channel count) followed by the bitmask.
+``application/msgpack``
+    ``{"version": int, "channels": int, "mask": bin}``, ``mask`` being the
+    bitmask bytes (so any channel count fits); needs the optional
+    ``msgpack`` package, otherwise requests for it get 406.
+"""
+
+from __future__ import annotations
+
+import struct
+from collections.abc import Sequence
+from typing import Any
+
+from fastapi import HTTPException, status
+
+from app.core import timing
+from app.models.schemas import RelayState, RelayStatus
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON = "application/json"
+BITMASK = "application/octet-stream"
+VERSIONED_BITMASK = "application/vnd.relay.versioned-bitmask"
+MSGPACK = "application/msgpack"
+
+_ALIASES = {"application/x-msgpack": MSGPACK}
+_VERSIONED_HEADER = struct.Struct("<QH")
+
+
+def negotiate(accept: str | None) -> str:
+    """Pick the response media type for an ``Accept`` header.
+
+    Honours q-values; wildcards, a missing header and unknown types all
+    mean JSON.  Raises 406 only when msgpack was asked for explicitly and
+    no acceptable alternative was offered, but msgpack is not installed.
+    """
+    if not accept:
+        return JSON
+    ranges: list[tuple[float, str]] = []
+    for part in accept.split(","):
+        media, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            ranges.append((q, media.strip().lower()))
+    ranges.sort(key=lambda r: r[0], reverse=True)  # stable: ties keep order
+
+    msgpack_missing = False
+    for _, media in ranges:
+        media = _ALIASES.get(media, media)
+        if media == MSGPACK and msgpack is None:
+            msgpack_missing = True
+        elif media in (JSON, BITMASK, VERSIONED_BITMASK, MSGPACK):
+            return media
+        elif media in ("*/*", "application/*"):
+            return JSON
+    if msgpack_missing:
+        raise HTTPException(
+            status.HTTP_406_NOT_ACCEPTABLE,
+            detail="msgpack is not installed on this server",
+        )
+    return JSON
+
+
+def mask_size(channels: int) -> int:
+    return (channels + 7) // 8
+
+
+def encode_bitmask(statuses: Sequence[RelayStatus]) -> bytes:
+    mask = 0
+    for s in statuses:
+        if s.state == RelayState.ON:
+            mask |= 1 << (s.channel - 1)
+    return mask.to_bytes(mask_size(len(statuses)), "little")
+
+
+def decode_bitmask(data: bytes, channels: int) -> dict[int, RelayState]:
+    """Map a bitmask body onto one target state per channel.
+
+    Raises ``ValueError`` if the length is wrong or bits are set beyond
+    the last channel.
+    """
+    if len(data) != mask_size(channels):
+        raise ValueError(
+            f"Bitmask must be {mask_size(channels)} byte(s) for {channels} channels"
+        )
+    mask = int.from_bytes(data, "little")
+    if mask >> channels:
+        raise ValueError(f"Bitmask sets bits beyond channel {channels}")
+    return {
+        ch: RelayState.ON if mask >> (ch - 1) & 1 else RelayState.OFF
+        for ch in range(1, channels + 1)
+    }
+
+
+def encode_states(
+    media_type: str, statuses: Sequence[RelayStatus], version: int
+) -> bytes:
+    """Render ``statuses`` in one of the compact (non-JSON) media types."""
+    with timing.phase("serialize"):
+        mask = encode_bitmask(statuses)
+        if media_type == BITMASK:
+            return mask
+        if media_type == VERSIONED_BITMASK:
+            return _VERSIONED_HEADER.pack(version, len(statuses)) + mask
+        packed: bytes = msgpack.packb(
+            {
+                "version": version,
+                "channels": len(statuses),
+                "mask": mask,
+            }
+        )
+        return packed
+
+
+_BINARY_SCHEMA = {"schema": {"type": "string", "format": "binary"}}
+
+# OpenAPI ``content`` entries for the compact encodings.
+COMPACT_CONTENT: dict[str, Any] = {
+    BITMASK: _BINARY_SCHEMA,
+    VERSIONED_BITMASK: _BINARY_SCHEMA,
+    MSGPACK: {
+        "schema": {
+            "type": "object",
+            "properties": {
+                "version": {"type": "integer"},
+                "channels": {"type": "integer"},
+                "mask": {"type": "string", "format": "binary"},
+            },
+        }
+    },
+}
@@ -0,0 +1,183 @@
+"""Fast request/response path for the hot relay endpoints.
+
+Relay payloads are tiny and highly repetitive, so the generic FastAPI
+pipeline (body validation, response-model validation, ``jsonable_encoder``
+and JSON rendering) dominates request cost.  Hot handlers instead parse
+bodies through a small cache of validated commands and return
+pre-rendered bytes, keeping ``response_model`` purely for OpenAPI docs.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from typing import Any, TypeVar
+
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from app.api.encodings import BITMASK
+from app.core import timing
+from app.models.schemas import RelayBulkCommand, RelayCommand, RelayState, RelayStatus
+from app.services.relay_service import RelayService
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
+JSON_MEDIA_TYPE = "application/json"
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when installed."""
+    start = time.perf_counter()
+    if orjson is not None:
+        body = orjson.dumps(content)
+    else:
+        body = json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode()
+    timing.record("serialize", time.perf_counter() - start)
+    return body
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with :func:`dumps` (orjson when available)."""
+
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def json_response(
+    content: bytes, headers: dict[str, str] | None = None
+) -> FastJSONResponse:
+    return FastJSONResponse(content, headers=headers)
+
+
+# --- Response rendering ---
+
+
+@lru_cache(maxsize=1024)
+def render_status(channel: int, state: RelayState) -> bytes:
+    """``RelayStatus`` JSON; there are only two payloads per channel."""
+    return dumps({"channel": channel, "state": state.value})
+
+
+def render_statuses(
+    statuses: Sequence[RelayStatus], version: int | None = None, full: bool = True
+) -> bytes:
+    """``RelayAllStatus`` JSON for an explicit list of statuses."""
+    return dumps(
+        {
+            "channels": [
+                {"channel": s.channel, "state": s.state.value} for s in statuses
+            ],
+            "version": version,
+            "full": full,
+        }
+    )
+
+
+class StateResponseCache:
+    """Single-slot cache of the ``RelayAllStatus`` body per state version.
+
+    Between writes every ``GET /relays`` returns identical bytes, so the
+    body is rendered once per ``state_version`` and reused.
+    """
+
+    def __init__(self) -> None:
+        self._slot: tuple[RelayService, int, bytes] | None = None
+
+    def render_all(self, service: RelayService) -> bytes:
+        version = service.state_version
+        slot = self._slot
+        if slot is not None and slot[0] is service and slot[1] == version:
+            return slot[2]
+        body = render_statuses(service.get_all_channels(), version)
+        self._slot = (service, version, body)
+        return body
+
+
+state_response_cache = StateResponseCache()
+
+
+# --- Request parsing ---
+
+
+def _validator(model: type[M]) -> Callable[[bytes], M]:
+    """Build a cached body validator for a frozen command model.
+
+    Clients send the same handful of bodies over and over, so validated
+    instances are memoized by raw body bytes.  Invalid bodies raise and
+    are therefore never cached.
+    """
+
+    @lru_cache(maxsize=64)
+    def validate(body: bytes) -> M:
+        return model.model_validate_json(body)
+
+    return validate
+
+
+parse_relay_command = _validator(RelayCommand)
+parse_relay_bulk_command = _validator(RelayBulkCommand)
+
+
+async def _parse_body(request: Request, parse: Callable[[bytes], M]) -> M:
+    body = await request.body()
+    if not body:
+        raise RequestValidationError(
+            [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+        )
+    try:
+        return parse(body)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [
+                {**err, "loc": ("body", *err["loc"])}
+                for err in exc.errors(include_url=False)
+            ],
+            body=body,
+        ) from exc
+
+
+async def relay_command_body(request: Request) -> RelayCommand:
+    """Dependency: validated ``RelayCommand`` request body."""
+    return await _parse_body(request, parse_relay_command)
+
+
+async def relay_bulk_body(request: Request) -> RelayBulkCommand | bytes:
+    """Dependency: validated ``RelayBulkCommand``, or a raw bitmask body.
+
+    Bodies sent as ``application/octet-stream`` are returned as bytes for
+    the caller to decode against the channel count.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.partition(";")[0].strip().lower() == BITMASK:
+        return await request.body()
+    return await _parse_body(request, parse_relay_bulk_command)
+
+
+def request_body_schema(
+    model: type[BaseModel], extra_content: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """OpenAPI ``requestBody`` for routes that parse their body manually.
+
+    ``extra_content`` documents additional accepted media types.
+    """
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {JSON_MEDIA_TYPE: {"schema": schema}, **(extra_content or {})},
+        }
+    }
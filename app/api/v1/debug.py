@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import inspect
+from types import CodeType
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import iter_route_contexts
+
+from app.api.dependencies import (
+    get_relay_service,
+    require_debug_endpoints,
+    verify_api_key,
+)
+from app.core import profiler
+from app.core.exceptions import ProfilerBusyError
+from app.models.schemas import LockProfile, LockProfilingUpdate
+from app.services.relay_service import RelayService
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["Debug"],
+    dependencies=[Depends(require_debug_endpoints)],
+)
+
+
+@router.get(
+    "/lock-profile",
+    response_model=LockProfile,
+    summary="Get device lock contention profile",
+    description="Returns the device lock operations with the most queue wait "
+    "(wait, hold and device I/O time per operation and source, and the "
+    "deepest queue each found on arrival) plus the current lock holder. "
+    "Recording must be switched on with `PUT /debug/lock-profile` or "
+    "`RELAY_LOCK_PROFILING`. Only available when `RELAY_DEBUG_ENDPOINTS` is set.",
+)
+def get_lock_profile(
+    top: int = Query(10, ge=1, le=100, description="Operations to return"),
+    service: RelayService = Depends(get_relay_service),
+) -> LockProfile:
+    return service.get_lock_profile(top)
+
+
+@router.put(
+    "/lock-profile",
+    response_model=LockProfile,
+    summary="Switch lock contention profiling on or off",
+    description="Enabling clears previously recorded data; disabling keeps "
+    "it readable. Only available when `RELAY_DEBUG_ENDPOINTS` is set.",
+)
+def set_lock_profiling(
+    body: LockProfilingUpdate,
+    service: RelayService = Depends(get_relay_service),
+) -> LockProfile:
+    return service.set_lock_profiling(body.enabled)
+
+
+def _route_code(request: Request, path: str, method: str) -> frozenset[CodeType]:
+    """Code objects of the endpoint functions serving ``path`` (and ``method``)."""
+    codes = {
+        inspect.unwrap(route.endpoint).__code__
+        for route in iter_route_contexts(request.app.routes)
+        if route.path == path
+        and route.endpoint is not None
+        and (not method or method in (route.methods or ()))
+    }
+    if not codes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No route {method + ' ' if method else ''}{path}",
+        )
+    return frozenset(codes)
+
+
+@router.get(
+    "/profile",
+    response_class=PlainTextResponse,
+    summary="Sample a CPU profile of the server process",
+    description="Samples the Python stack of every thread (request handlers, "
+    "pulse and debounce timers, the burn-test thread, ...) every "
+    "`interval_ms` for up to `seconds`, and returns collapsed stacks "
+    "(`thread;frame;...;frame count` per line) for `flamegraph.pl` or "
+    "speedscope. With `route` (a path template such as "
+    "`/api/v1/relays/{channel}`), only stacks inside that route's handler "
+    "are kept and sampling ends after the next `requests` matching requests "
+    "complete. The profile covers only the worker process that serves this "
+    "request. One profile at a time (409 otherwise). Only available when "
+    "`RELAY_DEBUG_ENDPOINTS` is set.",
+    responses={
+        404: {"description": "Unknown route"},
+        409: {"description": "A profile is already running"},
+    },
+    dependencies=[Depends(verify_api_key)],
+)
+def get_profile(
+    request: Request,
+    seconds: float = Query(5.0, gt=0, le=60, description="Upper time bound"),
+    interval_ms: float = Query(5.0, ge=1, le=100, description="Sampling interval"),
+    route: str | None = Query(None, description="Route template to profile"),
+    method: str | None = Query(None, description="HTTP method of `route`"),
+    requests: int = Query(
+        10, ge=1, le=10_000, description="Matching requests to profile (with `route`)"
+    ),
+) -> PlainTextResponse:
+    method = (method or "").upper()
+    codes = _route_code(request, route, method) if route else None
+    try:
+        profile = profiler.sample(
+            seconds,
+            interval_ms / 1000.0,
+            codes,
+            route=route or "",
+            method=method,
+            requests=requests,
+        )
+    except ProfilerBusyError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    headers = {
+        "X-Profile-Samples": str(profile.samples),
+        "X-Profile-Duration": f"{profile.duration_s:.3f}",
+    }
+    if route:
+        headers["X-Profile-Requests"] = str(profile.requests)
+    return PlainTextResponse(profile.collapsed(), headers=headers)
@@ -1,23 +1,134 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Path, status
+from collections.abc import Callable
+from functools import partial
+from typing import Annotated, TypeVar
 
-from app.api.dependencies import get_relay_service, require_device
-from app.core.exceptions import DeviceConnectionError, InvalidChannelError
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
+from fastapi.exceptions import RequestValidationError
+
+from app.api.dependencies import (
+    get_idempotency_cache,
+    get_idempotency_client,
+    get_relay_service,
+    require_device,
+)
+from app.api.encodings import (
+    BITMASK,
+    COMPACT_CONTENT,
+    JSON,
+    decode_bitmask,
+    encode_states,
+    negotiate,
+)
+from app.api.fastpath import (
+    FastJSONResponse,
+    json_response,
+    relay_bulk_body,
+    relay_command_body,
+    render_status,
+    render_statuses,
+    request_body_schema,
+    state_response_cache,
+)
+from app.core.exceptions import (
+    DeviceConnectionError,
+    IdempotencyKeyConflictError,
+    InvalidChannelError,
+)
 from app.models.schemas import (
     BurnTestRequest,
     BurnTestStatus,
+    DebounceStats,
     DeviceInfo,
     ErrorResponse,
     RelayAllStatus,
     RelayBulkCommand,
     RelayCommand,
     RelayStatus,
+    SchedulerStats,
 )
+from app.services.idempotency import IdempotencyCache
 from app.services.relay_service import RelayService
 
 router = APIRouter(prefix="/relays", tags=["Relays"])
 
+T = TypeVar("T")
+
+IdempotencyKey = Annotated[
+    str | None,
+    Header(
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Client-generated unique key. Retries with the same key "
+        "replay the original response without re-sending the command.",
+    ),
+]
+
+_IDEMPOTENCY_CONFLICT: dict[str, object] = {
+    "model": ErrorResponse,
+    "description": "Idempotency-Key was already used for a different request",
+}
+
+_REPLAYED_HEADERS = {"Idempotent-Replayed": "true"}
+
+Accept = Annotated[
+    str | None,
+    Header(
+        description="`application/json` (default), `application/octet-stream` "
+        "(bitmask), `application/vnd.relay.versioned-bitmask` or "
+        "`application/msgpack`.",
+    ),
+]
+
+_NOT_ACCEPTABLE: dict[str, object] = {
+    "model": ErrorResponse,
+    "description": "msgpack was requested but is not installed",
+}
+
+
+def _states_response(
+    media_type: str,
+    statuses: list[RelayStatus],
+    service: RelayService,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """Render channel states in a negotiated compact encoding."""
+    return Response(
+        encode_states(media_type, statuses, service.state_version),
+        media_type=media_type,
+        headers={"Vary": "Accept", **(headers or {})},
+    )
+
+
+def _idempotent(
+    cache: IdempotencyCache,
+    client: str,
+    key: str | None,
+    fingerprint: str,
+    fn: Callable[[], T],
+) -> tuple[T, bool]:
+    """Run a mutating command once per ``client`` and ``Idempotency-Key``.
+
+    Returns ``(result, replayed)``; replays should carry
+    ``_REPLAYED_HEADERS`` on the response.
+    """
+    if key is None:
+        return fn(), False
+    try:
+        return cache.run(key, fingerprint, fn, client)
+    except IdempotencyKeyConflictError as exc:
+        raise HTTPException(status.HTTP_409_CONFLICT, detail=str(exc))
+
 
 # --- Static routes first (before /{channel} path parameter) ---
 
@@ -27,7 +138,8 @@ router = APIRouter(prefix="/relays", tags=["Relays"])
     response_model=DeviceInfo,
     summary="Get USB device information",
     description="Returns the USB manufacturer string, product string, "
-    "total channel count, and live connection status of the relay module.",
+    "total channel count, and connection status of the relay module. Strings "
+    "are cached at device open and refreshed by the background prober.",
 )
 def get_device_info(
     service: RelayService = Depends(get_relay_service),
@@ -35,6 +147,34 @@ def get_device_info(
     return service.get_device_info()
 
 
+@router.get(
+    "/scheduler",
+    response_model=SchedulerStats,
+    summary="Get device scheduler statistics",
+    description="Returns device queue-wait statistics per priority class "
+    "(fail-safe, interactive, background): accesses granted, how many had "
+    "to queue, current queue depth, and mean/max wait.",
+)
+def get_scheduler_stats(
+    service: RelayService = Depends(get_relay_service),
+) -> SchedulerStats:
+    return service.get_scheduler_stats()
+
+
+@router.get(
+    "/debounce",
+    response_model=DebounceStats,
+    summary="Get switch debounce counters",
+    description="Returns each channel's minimum switch interval, how many "
+    "commands were deferred to the end of the window, how many device writes "
+    "were suppressed by coalescing, and any state still pending.",
+)
+def get_debounce_stats(
+    service: RelayService = Depends(get_relay_service),
+) -> DebounceStats:
+    return service.get_debounce_stats()
+
+
 # --- Burn test routes ---
 
 
@@ -48,7 +188,8 @@ def get_device_info(
     responses={
         409: {
             "model": ErrorResponse,
-            "description": "Burn test is already running",
+            "description": "Burn test is already running, or Idempotency-Key "
+            "was already used for a different request",
         },
         503: {
             "model": ErrorResponse,
@@ -59,15 +200,29 @@ def get_device_info(
 )
 def start_burn_test(
     request: BurnTestRequest,
+    response: Response,
+    idempotency_key: IdempotencyKey = None,
     service: RelayService = Depends(require_device),
+    cache: IdempotencyCache = Depends(get_idempotency_cache),
+    client: str = Depends(get_idempotency_client),
 ) -> BurnTestStatus:
-    status = service.get_burn_test_status()
-    if status.running:
-        raise HTTPException(
-            status_code=409,
-            detail="Burn test is already running. Stop it first.",
+    def start() -> BurnTestStatus:
+        if service.get_burn_test_status().running:
+            raise HTTPException(
+                status_code=409,
+                detail="Burn test is already running. Stop it first.",
+            )
+        return service.start_burn_test(
+            request.cycles, request.delay_ms, request.mode
         )
-    return service.start_burn_test(request.cycles, request.delay_ms, request.mode)
+
+    fingerprint = f"start_burn_test:{request.model_dump_json()}"
+    result, replayed = _idempotent(
+        cache, client, idempotency_key, fingerprint, start
+    )
+    if replayed:
+        response.headers.update(_REPLAYED_HEADERS)
+    return result
 
 
 @router.get(
@@ -89,37 +244,124 @@ def get_burn_test_status(
     response_model=BurnTestStatus,
     summary="Stop burn test",
     description="Stops a running burn test and turns all relays OFF (fail-safe).",
+    responses={409: _IDEMPOTENCY_CONFLICT},
     tags=["Burn Test"],
 )
 def stop_burn_test(
+    response: Response,
+    idempotency_key: IdempotencyKey = None,
     service: RelayService = Depends(require_device),
+    cache: IdempotencyCache = Depends(get_idempotency_cache),
+    client: str = Depends(get_idempotency_client),
 ) -> BurnTestStatus:
-    return service.stop_burn_test()
+    result, replayed = _idempotent(
+        cache, client, idempotency_key, "stop_burn_test", service.stop_burn_test
+    )
+    if replayed:
+        response.headers.update(_REPLAYED_HEADERS)
+    return result
 
 
 # --- Collection routes ---
+#
+# The hot collection and single-channel routes below use the fast path
+# (see ``app.api.fastpath``): bodies come from cached validators and
+# responses are pre-rendered bytes, so ``response_model`` only documents.
+# GET handlers query the service, which in multi-worker mode can be a
+# blocking call to the device owner, so they are plain ``def`` and stay
+# off the event loop.
 
 
 @router.get(
     "",
     response_model=RelayAllStatus,
+    response_class=FastJSONResponse,
     summary="Get all relay states",
-    description="Returns the current ON/OFF state of every relay channel.",
+    description="Returns the current ON/OFF state of every relay channel and "
+    "the state `version`. With `since_version` only channels changed after "
+    "that version are returned (`full: false`); if it has fallen out of the "
+    "change log the full state comes back with `full: true` so the client can "
+    "resync. `channels` restricts the result to the listed channels. Send an "
+    "`Accept` header to get a compact bitmask, versioned bitmask or msgpack "
+    "encoding of the full state instead of JSON.",
+    responses={
+        200: {"content": COMPACT_CONTENT},
+        404: {
+            "model": ErrorResponse,
+            "description": "A listed channel number is out of range",
+        },
+        406: {
+            "model": ErrorResponse,
+            "description": "msgpack was requested but is not installed, or a "
+            "compact encoding was requested for a filtered or delta query",
+        },
+    },
 )
 def get_all_relays(
+    accept: Accept = None,
+    since_version: int | None = Query(
+        default=None, ge=0, description="Return only changes after this version"
+    ),
+    channels: str | None = Query(
+        default=None,
+        pattern=r"^\d+(,\d+)*$",
+        description="Comma-separated channel numbers to include, e.g. `1,5,9`",
+    ),
     service: RelayService = Depends(get_relay_service),
-) -> RelayAllStatus:
-    return RelayAllStatus(channels=service.get_all_channels())
+) -> Response:
+    media_type = negotiate(accept)
+    if since_version is None and channels is None:
+        if media_type == JSON:
+            return json_response(
+                state_response_cache.render_all(service), {"Vary": "Accept"}
+            )
+        return _states_response(media_type, service.get_all_channels(), service)
+
+    if media_type != JSON:
+        raise HTTPException(
+            status.HTTP_406_NOT_ACCEPTABLE,
+            detail="since_version and channels queries are only available as JSON",
+        )
+    version = service.state_version
+    statuses = service.get_all_channels()
+    selected = set(range(1, len(statuses) + 1))
+    if channels is not None:
+        wanted = {int(ch) for ch in channels.split(",")}
+        unknown = sorted(wanted - selected)
+        if unknown:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND,
+                detail=str(InvalidChannelError(unknown[0], len(statuses))),
+            )
+        selected = wanted
+    full = True
+    if since_version is not None:
+        changed = service.changed_since(since_version)
+        if changed is not None:
+            selected.intersection_update(changed)
+            full = False
+    return json_response(
+        render_statuses(
+            [s for s in statuses if s.channel in selected], version, full
+        ),
+        {"Vary": "Accept"},
+    )
 
 
 @router.put(
     "",
     response_model=RelayAllStatus,
-    summary="Set all relays to the same state",
-    description="Sets every relay channel to the same state in a single "
-    "atomic operation. Useful for emergency shutoff (`off`) or powering "
-    "all channels simultaneously (`on`).",
+    summary="Set all relays",
+    description="Sets every relay channel in a single atomic operation. A JSON "
+    "body sets all channels to the same state — useful for emergency shutoff "
+    "(`off`) or powering all channels simultaneously (`on`). An "
+    "`application/octet-stream` bitmask body (bit `n - 1` = channel `n` ON) "
+    "sets each channel individually. The response honours `Accept` like "
+    "`GET /relays`.",
     responses={
+        200: {"content": COMPACT_CONTENT},
+        406: _NOT_ACCEPTABLE,
+        409: _IDEMPOTENCY_CONFLICT,
         502: {
             "model": ErrorResponse,
             "description": "USB device communication failure",
@@ -129,16 +371,52 @@ def get_all_relays(
             "description": "USB relay device is not connected",
         },
     },
+    response_class=FastJSONResponse,
+    openapi_extra=request_body_schema(
+        RelayBulkCommand, {BITMASK: COMPACT_CONTENT[BITMASK]}
+    ),
 )
 def set_all_relays(
-    command: RelayBulkCommand,
+    command: RelayBulkCommand | bytes = Depends(relay_bulk_body),
+    accept: Accept = None,
+    idempotency_key: IdempotencyKey = None,
     service: RelayService = Depends(require_device),
-) -> RelayAllStatus:
+    cache: IdempotencyCache = Depends(get_idempotency_cache),
+    client: str = Depends(get_idempotency_client),
+) -> Response:
+    media_type = negotiate(accept)
+    fn: Callable[[], list[RelayStatus]]
+    if isinstance(command, bytes):
+        try:
+            target = decode_bitmask(command, service.channel_count)
+        except ValueError as exc:
+            raise RequestValidationError(
+                [
+                    {
+                        "type": "value_error",
+                        "loc": ("body",),
+                        "msg": str(exc),
+                        "input": command.hex(),
+                    }
+                ]
+            )
+        fingerprint = f"set_channels:{command.hex()}"
+        fn = partial(service.set_channels, target)
+    else:
+        fingerprint = f"set_all_relays:{command.state.value}"
+        fn = partial(service.set_all_channels, command.state)
     try:
-        channels = service.set_all_channels(command.state)
+        channels, replayed = _idempotent(
+            cache, client, idempotency_key, fingerprint, fn
+        )
     except DeviceConnectionError as exc:
         raise HTTPException(status.HTTP_502_BAD_GATEWAY, detail=str(exc))
-    return RelayAllStatus(channels=channels)
+    headers = _REPLAYED_HEADERS if replayed else None
+    if media_type == JSON:
+        return json_response(
+            render_statuses(channels, service.state_version), headers
+        )
+    return _states_response(media_type, channels, service, headers)
 
 
 # --- Single channel routes ---
@@ -147,6 +425,7 @@ def set_all_relays(
 @router.get(
     "/{channel}",
     response_model=RelayStatus,
+    response_class=FastJSONResponse,
     summary="Get a single relay state",
     description="Returns the current ON/OFF state for the specified channel.",
     responses={
@@ -159,11 +438,12 @@ def set_all_relays(
 def get_relay(
     channel: int = Path(ge=1, description="Relay channel number (1-based)"),
     service: RelayService = Depends(get_relay_service),
-) -> RelayStatus:
+) -> Response:
     try:
-        return service.get_channel(channel)
+        result = service.get_channel(channel)
     except InvalidChannelError as exc:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail=str(exc))
+    return json_response(render_status(result.channel, result.state))
 
 
 @router.put(
@@ -177,6 +457,7 @@ def get_relay(
             "model": ErrorResponse,
             "description": "Channel number is out of range",
         },
+        409: _IDEMPOTENCY_CONFLICT,
         502: {
             "model": ErrorResponse,
             "description": "USB device communication failure",
@@ -186,15 +467,30 @@ def get_relay(
             "description": "USB relay device is not connected",
         },
     },
+    response_class=FastJSONResponse,
+    openapi_extra=request_body_schema(RelayCommand),
 )
 def set_relay(
-    command: RelayCommand,
+    command: RelayCommand = Depends(relay_command_body),
     channel: int = Path(ge=1, description="Relay channel number (1-based)"),
+    idempotency_key: IdempotencyKey = None,
     service: RelayService = Depends(require_device),
-) -> RelayStatus:
+    cache: IdempotencyCache = Depends(get_idempotency_cache),
+    client: str = Depends(get_idempotency_client),
+) -> Response:
     try:
-        return service.set_channel(channel, command.state)
+        result, replayed = _idempotent(
+            cache,
+            client,
+            idempotency_key,
+            f"set_relay:{channel}:{command.state.value}",
+            lambda: service.set_channel(channel, command.state),
+        )
     except InvalidChannelError as exc:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail=str(exc))
     except DeviceConnectionError as exc:
         raise HTTPException(status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+    return json_response(
+        render_status(result.channel, result.state),
+        _REPLAYED_HEADERS if replayed else None,
+    )
@@ -1,29 +1,99 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, Response, status
 
 from app.api.dependencies import get_relay_service_public
+from app.api.fastpath import FastJSONResponse, dumps
 from app.config import settings
-from app.models.schemas import HealthResponse
+from app.core.metrics import CONTENT_TYPE, HTTP_METRICS
+from app.models.schemas import HealthResponse, LivenessResponse
 from app.services.relay_service import RelayService
 
 router = APIRouter(tags=["System"])
 
 
+# Health probes return pre-rendered bodies and never touch the USB bus,
+# but they ask the service whether the device is connected.  In
+# multi-worker mode without a state segment that is a blocking call to
+# the device owner, so the probes that query the service are plain
+# ``def`` and stay off the event loop.  Liveness queries nothing.
+
+
+@lru_cache(maxsize=2)
+def _health_body(connected: bool) -> bytes:
+    return dumps(
+        {
+            "status": "ok" if connected else "degraded",
+            "device_connected": connected,
+            "version": settings.app_version,
+        }
+    )
+
+
+_LIVE_BODY = dumps({"status": "ok"})
+
+
 @router.get(
     "/health",
     response_model=HealthResponse,
     summary="Health check",
     description="Returns API status, USB device connection state, and version. "
-    "Use this endpoint for uptime monitoring and readiness probes. "
+    "Use this endpoint for uptime monitoring. "
     "This endpoint does not require authentication.",
 )
 def health_check(
     service: RelayService = Depends(get_relay_service_public),
-) -> HealthResponse:
+) -> Response:
+    return FastJSONResponse(_health_body(service.is_device_connected))
+
+
+@router.get(
+    "/health/live",
+    response_model=LivenessResponse,
+    summary="Liveness probe",
+    description="Always 200 while the process is serving HTTP; does not look "
+    "at the device. This endpoint does not require authentication.",
+)
+async def liveness() -> Response:
+    return FastJSONResponse(_LIVE_BODY)
+
+
+@router.get(
+    "/health/ready",
+    response_model=HealthResponse,
+    summary="Readiness probe",
+    description="200 when the relay device is connected, 503 otherwise (still "
+    "opening at startup, or unplugged). Connection state is kept current by "
+    "the background device prober. This endpoint does not require "
+    "authentication.",
+    responses={503: {"model": HealthResponse, "description": "Device not connected"}},
+)
+def readiness(
+    service: RelayService = Depends(get_relay_service_public),
+) -> Response:
     connected = service.is_device_connected
-    return HealthResponse(
-        status="ok" if connected else "degraded",
-        device_connected=connected,
-        version=settings.app_version,
+    return FastJSONResponse(
+        _health_body(connected),
+        status_code=(
+            status.HTTP_200_OK if connected else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
     )
+
+
+@router.get(
+    "/metrics",
+    response_class=Response,
+    summary="Prometheus metrics",
+    description="Request latency by route and status, rate-limit rejections, "
+    "device lock wait/hold times, device write latency and errors by channel, "
+    "active pulse timers, burn-test cycles and device connection state, in "
+    "Prometheus text format. This endpoint does not require authentication.",
+    responses={200: {"content": {CONTENT_TYPE: {}}}},
+)
+def metrics(
+    service: RelayService = Depends(get_relay_service_public),
+) -> Response:
+    body = HTTP_METRICS.render() + service.render_metrics()
+    return Response(body, media_type=CONTENT_TYPE)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from starlette.concurrency import run_in_threadpool
+
+from app.api.dependencies import get_relay_service_public, is_valid_api_key
+from app.core.exceptions import (
+    DeviceConnectionError,
+    InvalidChannelError,
+    RelayError,
+)
+from app.models.schemas import RelayState
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/relays", tags=["Relays"])
+
+_STATES = {"on": RelayState.ON, "off": RelayState.OFF}
+_WRITE_OPS = frozenset({"set", "set_all"})
+
+
+class _CommandError(Exception):
+    """A single command failed; reported in its ack, connection stays open."""
+
+    def __init__(self, code: int, message: str):
+        self.code = code
+        self.message = message
+        super().__init__(message)
+
+
+def _parse_state(msg: dict[str, Any]) -> RelayState:
+    value = msg.get("state")
+    state = _STATES.get(value) if isinstance(value, str) else None
+    if state is None:
+        raise _CommandError(422, "state must be 'on' or 'off'")
+    return state
+
+
+def _parse_channel(msg: dict[str, Any]) -> int:
+    channel = msg.get("ch")
+    if not isinstance(channel, int) or isinstance(channel, bool):
+        raise _CommandError(422, "ch must be an integer")
+    return channel
+
+
+def _execute(service: RelayService, msg: dict[str, Any]) -> dict[str, Any]:
+    """Run one decoded command against the service and build its ack.
+
+    Runs in the threadpool: service calls may block on the device lock.
+    """
+    op = msg.get("op")
+    if op in _WRITE_OPS and not service.is_device_connected:
+        raise _CommandError(503, "USB relay device is not connected")
+    try:
+        if op == "set":
+            result = service.set_channel(_parse_channel(msg), _parse_state(msg))
+            return {"ch": result.channel, "state": result.state.value}
+        if op == "get":
+            result = service.get_channel(_parse_channel(msg))
+            return {"ch": result.channel, "state": result.state.value}
+        if op == "set_all":
+            statuses = service.set_all_channels(_parse_state(msg))
+            return {"states": [s.state.value for s in statuses]}
+        if op == "get_all":
+            return {"states": [s.state.value for s in service.get_all_channels()]}
+    except InvalidChannelError as exc:
+        raise _CommandError(404, str(exc)) from exc
+    except DeviceConnectionError as exc:
+        raise _CommandError(502, str(exc)) from exc
+    except RelayError as exc:
+        # e.g. an error forwarded by the device owner in multi-worker mode
+        raise _CommandError(500, str(exc)) from exc
+    raise _CommandError(400, f"Unknown op: {op!r}")
+
+
+async def _authenticate(websocket: WebSocket) -> bool:
+    """Authenticate once per connection.
+
+    Accepts the ``X-API-Key`` handshake header, or — for clients that
+    cannot set headers — an initial ``{"op": "auth", "key": ...}`` frame.
+    """
+    if is_valid_api_key(websocket.headers.get("x-api-key")):
+        return True
+    try:
+        msg = json.loads(await websocket.receive_text())
+    except (ValueError, TypeError):
+        msg = None
+    if (
+        isinstance(msg, dict)
+        and msg.get("op") == "auth"
+        and isinstance(msg.get("key"), str)
+        and is_valid_api_key(msg["key"])
+    ):
+        await websocket.send_text(json.dumps({"id": msg.get("id"), "ok": True}))
+        return True
+    await websocket.send_text(
+        json.dumps({"ok": False, "code": 401, "error": "Invalid or missing API key"})
+    )
+    await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+    return False
+
+
+@router.websocket("/ws")
+async def relay_command_channel(
+    websocket: WebSocket,
+    service: RelayService = Depends(get_relay_service_public),
+) -> None:
+    """Persistent command channel for high-rate relay control.
+
+    Each text frame is one JSON command carrying a client-chosen ``id``;
+    commands are executed in arrival order and every command is answered
+    with exactly one ack echoing that ``id``, so clients may pipeline
+    without waiting for earlier acks.
+    """
+    await websocket.accept()
+    try:
+        if not await _authenticate(websocket):
+            return
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                await websocket.send_text(
+                    '{"id":null,"ok":false,"code":400,"error":"Malformed JSON"}'
+                )
+                continue
+            if not isinstance(msg, dict):
+                msg = {}
+            ack: dict[str, Any] = {"id": msg.get("id"), "ok": True}
+            if msg.get("op") != "ping":
+                try:
+                    ack.update(await run_in_threadpool(_execute, service, msg))
+                except _CommandError as exc:
+                    ack.update(ok=False, code=exc.code, error=exc.message)
+            await websocket.send_text(json.dumps(ack, separators=(",", ":")))
+    except WebSocketDisconnect:
+        logger.debug("WebSocket command channel closed")
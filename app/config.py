@@ -1,5 +1,7 @@
 from pathlib import Path
+from typing import Literal
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -19,10 +21,36 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     cors_origins: list[str] = ["*"]
+    workers: int = 1
+    owner_socket: str = ""
+    state_segment: str = ""
 
     api_key: str = ""
     rate_limit: int = 0
+    rate_limit_key: Literal["ip", "api_key"] = "ip"
+    rate_limit_max_clients: int = Field(default=10_000, ge=1)
+    rate_limit_costs: dict[str, int] = {
+        "PUT /api/v1/relays": 4,
+        "POST /api/v1/relays/burn-test": 10,
+    }
     pulse_ms: int = 0
+    min_switch_ms: int = 0
+    min_switch_ms_channels: dict[int, int] = {}
+    change_log_size: int = 1024
+    probe_interval_s: float = 5.0
+
+    modbus_host: str = "0.0.0.0"
+    modbus_port: int = 0
+    udp_host: str = "0.0.0.0"
+    udp_port: int = 0
+    udp_key: str = ""
+
+    server_timing: bool = False
+    debug_endpoints: bool = False
+    lock_profiling: bool = False
+
+    idempotency_ttl_s: int = 300
+    idempotency_max_entries: int = 1024
 
     model_config = SettingsConfigDict(
         env_prefix="RELAY_",
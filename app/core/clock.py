@@ -0,0 +1,281 @@
+"""Injectable time source for the relay service.
+
+``RelayService`` reads the time, arms pulse auto-off and debounce timers,
+starts the burn-test thread and sleeps between burn-test phases through a
+:class:`Clock`.  :class:`SystemClock` is the real thing.
+:class:`VirtualClock` only moves when :meth:`VirtualClock.advance` is
+called and fires due timers on the calling thread, so thousands of pulses
+or a week-long burn test run in milliseconds in tests and benchmarks.
+
+Durations measured for metrics and Server-Timing stay on
+``time.perf_counter()``: they report real CPU and device cost.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Protocol
+
+# How often a virtual wait checks its event while blocked (real seconds).
+_POLL_S = 0.001
+
+
+class Timer(Protocol):
+    def start(self) -> None: ...
+    def cancel(self) -> None: ...
+
+
+class Clock(Protocol):
+    """Time and timer operations used by ``RelayService``."""
+
+    def monotonic(self) -> float: ...
+    def time(self) -> float: ...
+    def now(self) -> datetime: ...
+
+    def timer(
+        self,
+        delay_s: float,
+        fn: Callable[..., object],
+        args: tuple[object, ...] = (),
+        name: str = "",
+    ) -> Timer: ...
+
+    def thread(
+        self,
+        target: Callable[..., object],
+        args: tuple[object, ...] = (),
+        name: str = "",
+    ) -> threading.Thread: ...
+
+    def wait(self, event: threading.Event, timeout_s: float) -> bool: ...
+
+
+class SystemClock:
+    """Wall and monotonic time, ``threading.Timer`` and daemon threads."""
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def timer(
+        self,
+        delay_s: float,
+        fn: Callable[..., object],
+        args: tuple[object, ...] = (),
+        name: str = "",
+    ) -> threading.Timer:
+        timer = threading.Timer(delay_s, fn, args=args)
+        if name:
+            timer.name = name
+        timer.daemon = True
+        return timer
+
+    def thread(
+        self,
+        target: Callable[..., object],
+        args: tuple[object, ...] = (),
+        name: str = "",
+    ) -> threading.Thread:
+        return threading.Thread(
+            target=target, args=args, name=name or None, daemon=True
+        )
+
+    def wait(self, event: threading.Event, timeout_s: float) -> bool:
+        """Wait for ``event`` up to ``timeout_s``; whether it is set."""
+        return event.wait(timeout_s)
+
+
+# --- Virtual time ---
+
+
+class _VirtualTimer:
+    def __init__(
+        self,
+        clock: VirtualClock,
+        delay_s: float,
+        fn: Callable[..., object],
+        args: tuple[object, ...],
+    ) -> None:
+        self._clock = clock
+        self._delay_s = delay_s
+        self._fn = fn
+        self._args = args
+        self.cancelled = False
+
+    def start(self) -> None:
+        if not self.cancelled:
+            self._clock._schedule(self, self._delay_s)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def fire(self) -> None:
+        self._fn(*self._args)
+
+
+class _VirtualThread(threading.Thread):
+    """Thread counted as running by its clock until it blocks or exits."""
+
+    def __init__(
+        self,
+        clock: VirtualClock,
+        target: Callable[..., object],
+        args: tuple[object, ...],
+        name: str,
+    ) -> None:
+        super().__init__(target=target, args=args, name=name or None, daemon=True)
+        self._clock = clock
+
+    def start(self) -> None:
+        self._clock._add_running(1)
+        try:
+            super().start()
+        except BaseException:
+            self._clock._add_running(-1)
+            raise
+
+    def run(self) -> None:
+        try:
+            super().run()
+        finally:
+            self._clock._add_running(-1)
+
+
+class VirtualClock:
+    """Clock whose time only moves on :meth:`advance`.
+
+    Timers fire on the thread calling :meth:`advance`, in due order, with
+    the clock set to their due time.  Threads started through
+    :meth:`thread` (the burn test) run for real, but :meth:`advance`
+    waits for each of them to block in :meth:`wait` or exit before moving
+    on, so every step is deterministic.  ``settle_timeout_s`` bounds that
+    wait in real time.
+    """
+
+    def __init__(
+        self,
+        start: float = 0.0,
+        wall_start: float = 1_700_000_000.0,
+        settle_timeout_s: float = 5.0,
+    ) -> None:
+        self._now = start
+        self._wall_offset = wall_start - start
+        self._settle_timeout_s = settle_timeout_s
+        self._cond = threading.Condition()
+        self._timers: list[tuple[float, int, _VirtualTimer]] = []
+        self._seq = itertools.count()
+        # Threads from thread() neither blocked in wait() nor finished.
+        self._running = 0
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def time(self) -> float:
+        return self._now + self._wall_offset
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time(), timezone.utc)
+
+    def timer(
+        self,
+        delay_s: float,
+        fn: Callable[..., object],
+        args: tuple[object, ...] = (),
+        name: str = "",
+    ) -> _VirtualTimer:
+        return _VirtualTimer(self, delay_s, fn, args)
+
+    def thread(
+        self,
+        target: Callable[..., object],
+        args: tuple[object, ...] = (),
+        name: str = "",
+    ) -> threading.Thread:
+        return _VirtualThread(self, target, args, name)
+
+    def wait(self, event: threading.Event, timeout_s: float) -> bool:
+        """Block until ``event`` is set or ``timeout_s`` of virtual time passes."""
+        if event.is_set() or timeout_s <= 0:
+            return event.is_set()
+        tracked = isinstance(threading.current_thread(), _VirtualThread)
+        woken = threading.Event()
+
+        def wake() -> None:
+            with self._cond:
+                if not woken.is_set():
+                    woken.set()
+                    if tracked:
+                        self._running += 1
+
+        timer = self.timer(timeout_s, wake)
+        with self._cond:
+            self._schedule(timer, timeout_s)
+            if tracked:
+                self._running -= 1
+                self._cond.notify_all()
+        while not woken.wait(_POLL_S):
+            if event.is_set():
+                break
+        with self._cond:
+            if not woken.is_set():
+                # Woken by the event: the timer must not count us again.
+                timer.cancel()
+                woken.set()
+                if tracked:
+                    self._running += 1
+        return event.is_set()
+
+    @property
+    def pending(self) -> int:
+        """Timers scheduled and not cancelled."""
+        with self._cond:
+            return sum(1 for _, _, t in self._timers if not t.cancelled)
+
+    def advance(self, seconds: float) -> None:
+        """Move time forward ``seconds``, firing every timer that falls due.
+
+        Raises ``RuntimeError`` if a clock thread keeps running for longer
+        than ``settle_timeout_s`` without blocking.
+        """
+        target = self._now + seconds
+        self._settle()
+        while True:
+            with self._cond:
+                if not self._timers or self._timers[0][0] > target:
+                    self._now = max(self._now, target)
+                    return
+                due, _, timer = heapq.heappop(self._timers)
+                self._now = max(self._now, due)
+            if not timer.cancelled:
+                timer.fire()
+                self._settle()
+
+    def _schedule(self, timer: _VirtualTimer, delay_s: float) -> None:
+        with self._cond:
+            due = self._now + max(0.0, delay_s)
+            heapq.heappush(self._timers, (due, next(self._seq), timer))
+
+    def _add_running(self, delta: int) -> None:
+        with self._cond:
+            self._running += delta
+            self._cond.notify_all()
+
+    def _settle(self) -> None:
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._running <= 0, timeout=self._settle_timeout_s
+            ):
+                raise RuntimeError(
+                    f"{self._running} clock thread(s) still running after "
+                    f"{self._settle_timeout_s:g}s"
+                )
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import logging
-from typing import Protocol, runtime_checkable
-
-import hid
+from typing import TYPE_CHECKING, Protocol, runtime_checkable
 
 from app.core.exceptions import DeviceConnectionError, DeviceNotFoundError
 
+if TYPE_CHECKING:
+    import hid
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,7 +38,11 @@ _COMMAND_OFF = 0xFD
 
 
 class HIDRelayDevice:
-    """Concrete HID implementation for DCT Tech USB relay modules."""
+    """Concrete HID implementation for DCT Tech USB relay modules.
+
+    The ``hid`` extension is imported on first :meth:`open`, so mock
+    mode and processes that never touch the device do not load it.
+    """
 
     def __init__(self, vendor_id: int, product_id: int):
         self._vendor_id = vendor_id
@@ -48,6 +53,8 @@ class HIDRelayDevice:
     def open(self) -> None:
         if self._is_open:
             return
+        import hid
+
         self._device = hid.device()
         try:
             self._device.open(self._vendor_id, self._product_id)
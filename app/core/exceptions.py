@@ -29,3 +29,17 @@ class InvalidChannelError(RelayError):
         super().__init__(
             f"Invalid channel {channel}. Must be between 1 and {max_channels}."
         )
+
+
+class IdempotencyKeyConflictError(RelayError):
+    """Raised when an idempotency key is reused for a different request."""
+
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(
+            "Idempotency-Key was already used for a different request"
+        )
+
+
+class ProfilerBusyError(RelayError):
+    """Raised when a sampling profile is requested while one is running."""
@@ -0,0 +1,256 @@
+"""Minimal Prometheus metrics: counters, gauges and fixed-bucket histograms.
+
+Recording is a dict lookup plus a short critical section, cheap enough to
+stay on in production; text exposition happens only when ``/metrics`` is
+scraped.
+
+Metrics live in two registries: :data:`HTTP_METRICS` (per HTTP process)
+and :data:`SERVICE_METRICS` (wherever the ``RelayService`` runs).  In
+multi-worker mode each worker serves its own HTTP metrics plus the device
+owner's service metrics fetched over IPC.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import TypeVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond HID writes up to slow, queued requests.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels(self, values: tuple[str, ...], extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"'
+            for name, value in zip(self.labelnames, values)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{self._labels(k)} {_format_value(v)}" for k, v in values
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else int(sum(series[:-1]))
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self._header()
+        for labels, series in snapshot:
+            cumulative = 0.0
+            for bound, hits in zip((*self.buckets, math.inf), series):
+                cumulative += hits
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{self._labels(labels, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            lines.append(
+                f"{self.name}_sum{self._labels(labels)} {_format_value(series[-1])}"
+            )
+            lines.append(
+                f"{self.name}_count{self._labels(labels)} {_format_value(cumulative)}"
+            )
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clear every recorded value (tests only)."""
+        for metric in self._metrics:
+            metric.reset()
+
+
+HTTP_METRICS = Registry()
+SERVICE_METRICS = Registry()
+
+_M = TypeVar("_M", bound=_Metric)
+
+
+def _register(registry: Registry, metric: _M) -> _M:
+    registry.register(metric)
+    return metric
+
+
+# --- HTTP metrics ---
+
+REQUEST_LATENCY = _register(
+    HTTP_METRICS,
+    Histogram(
+        "relay_http_request_duration_seconds",
+        "HTTP request latency by method, route template and status code.",
+        ("method", "route", "status"),
+    ),
+)
+RATE_LIMITED = _register(
+    HTTP_METRICS,
+    Counter("relay_rate_limited_total", "Requests rejected by the rate limiter."),
+)
+
+# --- Service and device metrics ---
+
+LOCK_WAIT = _register(
+    SERVICE_METRICS,
+    Histogram(
+        "relay_device_lock_wait_seconds",
+        "Time spent queued for the device lock, by priority class.",
+        ("priority",),
+    ),
+)
+LOCK_HOLD = _register(
+    SERVICE_METRICS,
+    Histogram(
+        "relay_device_lock_hold_seconds",
+        "Time the device lock was held, by priority class.",
+        ("priority",),
+    ),
+)
+DEVICE_WRITE = _register(
+    SERVICE_METRICS,
+    Histogram(
+        "relay_device_write_seconds",
+        "Relay device write (HID feature report) latency by channel.",
+        ("channel",),
+    ),
+)
+DEVICE_WRITE_ERRORS = _register(
+    SERVICE_METRICS,
+    Counter(
+        "relay_device_write_errors_total",
+        "Failed relay device writes by channel.",
+        ("channel",),
+    ),
+)
+PULSE_TIMERS = _register(
+    SERVICE_METRICS,
+    Gauge("relay_pulse_timers_active", "Pulse auto-off timers currently pending."),
+)
+BURN_CYCLES = _register(
+    SERVICE_METRICS,
+    Counter("relay_burn_test_cycles_total", "Completed burn-test cycles."),
+)
+DEVICE_CONNECTED = _register(
+    SERVICE_METRICS,
+    Gauge("relay_device_connected", "1 if the relay device is open, else 0."),
+)
+UDP_DROPPED = _register(
+    SERVICE_METRICS,
+    Counter(
+        "relay_udp_datagrams_dropped_total",
+        "UDP command datagrams dropped, by reason (auth, malformed, replay).",
+        ("reason",),
+    ),
+)
@@ -0,0 +1,161 @@
+"""On-demand sampling profiler producing collapsed stacks.
+
+A profile samples every thread's Python stack with
+``sys._current_frames()`` at a fixed interval, from the thread that asked
+for it, for a bounded time.  Between samples nothing is instrumented, so
+the cost is one stack walk per thread per interval, and zero when no
+profile is running.  Output is the collapsed-stack format read by
+``flamegraph.pl``, speedscope and similar tools: one line per distinct
+stack, root first, frames separated by ``;``, followed by the sample count.
+The root frame is the thread name (``relay-pulse-ch1``,
+``relay-burn-test``, ``AnyIO worker thread``, ...).
+
+A profile can instead be limited to the handler of one route: only stacks
+running inside that route's endpoint function are kept, and the profile
+ends once the next ``N`` matching requests have completed (reported by
+``MetricsMiddleware`` through :func:`request_finished`).
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from types import CodeType, FrameType
+
+from app.core.exceptions import ProfilerBusyError
+
+_DEFAULT_THREAD_NUMBER = re.compile(r"-\d+")
+
+# Only one profile at a time: overlapping samplers would double the cost
+# and skew each other.
+_busy = threading.Lock()
+
+
+@dataclass
+class Profile:
+    stacks: Counter[str]
+    samples: int
+    duration_s: float
+    requests: int = 0
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text, most frequent stacks first."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class _RequestWatch:
+    def __init__(self, route: str, method: str, requests: int) -> None:
+        self.route = route
+        self.method = method
+        self.remaining = requests
+        self.done = threading.Event()
+
+
+_watch: _RequestWatch | None = None
+
+
+def request_finished(method: str, route: str) -> None:
+    """Count a finished request towards a route-limited profile, if any."""
+    watch = _watch
+    if (
+        watch is not None
+        and watch.route == route
+        and watch.method in ("", method)
+    ):
+        watch.remaining -= 1
+        if watch.remaining <= 0:
+            watch.done.set()
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_qualname}"
+
+
+def _thread_label(name: str) -> str:
+    # "Thread-12 (run)" -> "Thread (run)" so short-lived threads merge.
+    if name.startswith("Thread-"):
+        return _DEFAULT_THREAD_NUMBER.sub("", name, count=1)
+    return name
+
+
+def _collapse(
+    frame: FrameType | None, thread: str, codes: frozenset[CodeType] | None
+) -> str | None:
+    labels: list[str] = []
+    inside = codes is None
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        if codes is not None and frame.f_code in codes:
+            inside = True
+        frame = frame.f_back
+    if not inside:
+        return None
+    labels.append(_thread_label(thread))
+    return ";".join(reversed(labels))
+
+
+def sample(
+    duration_s: float,
+    interval_s: float,
+    codes: frozenset[CodeType] | None = None,
+    route: str = "",
+    method: str = "",
+    requests: int = 0,
+) -> Profile:
+    """Sample all other threads for up to ``duration_s`` seconds.
+
+    With ``codes``, only stacks passing through one of those code objects
+    (a route's endpoint functions) are kept.  With ``route`` and
+    ``requests``, sampling stops early once that many requests for the
+    route template (and ``method``, if given) have finished.  Raises
+    :class:`ProfilerBusyError` if a profile is already running.
+    """
+    global _watch
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    watch = None
+    if route and requests > 0:
+        watch = _RequestWatch(route, method, requests)
+    _watch = watch
+    stacks: Counter[str] = Counter()
+    samples = 0
+    me = threading.get_ident()
+    start = time.perf_counter()
+    deadline = start + duration_s
+    try:
+        while True:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident, f"thread-{ident}")
+                stack = _collapse(frame, name, codes)
+                if stack is not None:
+                    stacks[stack] += 1
+            samples += 1
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            wait = min(interval_s, remaining)
+            if watch is not None:
+                if watch.done.wait(wait):
+                    break
+            else:
+                time.sleep(wait)
+    finally:
+        _watch = None
+        _busy.release()
+    return Profile(
+        stacks,
+        samples,
+        time.perf_counter() - start,
+        requests - watch.remaining if watch is not None else 0,
+    )
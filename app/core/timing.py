@@ -0,0 +1,61 @@
+"""Request-scoped timing phases for the ``Server-Timing`` response header.
+
+``ServerTimingMiddleware`` opens a phase table for each request in a
+context variable; the service, device and IPC layers add durations to it
+with :func:`record` or :func:`phase`.  Context variables follow the
+request into the threadpool, so sync handlers report into the right
+table.  Outside a timed request recording is a single context lookup.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+_phases: ContextVar[dict[str, float] | None] = ContextVar(
+    "server_timing_phases", default=None
+)
+
+
+def begin() -> tuple[dict[str, float], Token[dict[str, float] | None]]:
+    """Start collecting phases for the current request."""
+    phases: dict[str, float] = {}
+    return phases, _phases.set(phases)
+
+
+def end(token: Token[dict[str, float] | None]) -> None:
+    _phases.reset(token)
+
+
+def active() -> bool:
+    return _phases.get() is not None
+
+
+def record(name: str, seconds: float) -> None:
+    """Add ``seconds`` to phase ``name`` of the current request, if timed."""
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as phase ``name`` of the current request, if timed."""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def header(phases: dict[str, float]) -> str:
+    """Render phases as a ``Server-Timing`` value (durations in ms)."""
+    return ", ".join(
+        f"{name};dur={seconds * 1000.0:.3f}" for name, seconds in phases.items()
+    )
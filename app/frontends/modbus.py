@@ -0,0 +1,220 @@
+"""Modbus TCP frontend: coils mapped onto relay channels.
+
+Lets PLCs and SCADA systems drive the relays directly instead of going
+through a Modbus-to-HTTP gateway.  Coil address ``n`` is relay channel
+``n + 1``.  Supported function codes:
+
+``0x01`` Read Coils
+    Served from the in-memory relay state; never touches the device.
+``0x05`` Write Single Coil
+    ``RelayService.set_channel`` (lock source ``modbus``).
+``0x0F`` Write Multiple Coils
+    One ``RelayService.set_channels`` bulk write: all coils switch under a
+    single scheduler slot and roll back together on failure.
+
+Anything else gets exception 01 (illegal function); addresses past the
+last channel get 02, malformed values 03, and device errors 04.  Each
+connection handles its requests in order; the server is plain asyncio,
+so many PLC connections cost one coroutine each, and device writes run
+in the default executor so a slow USB write never stalls other
+connections.  Modbus TCP has no authentication: bind it to a trusted
+network only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+from collections.abc import Sequence
+
+from app.core.exceptions import DeviceConnectionError, InvalidChannelError
+from app.frontends.threaded import LoopThread
+from app.models.schemas import CommandPriority, RelayState
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+# MBAP header: transaction id, protocol id (0), length (unit id + PDU), unit id.
+_MBAP = struct.Struct(">HHHB")
+_ADDRESS_QUANTITY = struct.Struct(">HH")
+# The length field covers the unit id plus a PDU of at most 253 bytes.
+_MAX_LENGTH = 254
+
+READ_COILS = 0x01
+WRITE_SINGLE_COIL = 0x05
+WRITE_MULTIPLE_COILS = 0x0F
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+SERVER_DEVICE_FAILURE = 0x04
+
+_COIL_ON = 0xFF00
+_COIL_OFF = 0x0000
+_MAX_READ_COILS = 2000
+_MAX_WRITE_COILS = 1968
+
+
+class ModbusError(Exception):
+    """A request answered with a Modbus exception response."""
+
+    def __init__(self, code: int):
+        super().__init__(f"Modbus exception {code:#04x}")
+        self.code = code
+
+
+def pack_coils(coils: Sequence[bool]) -> bytes:
+    """Coil states as Modbus bytes: LSB of the first byte is the first coil."""
+    packed = bytearray((len(coils) + 7) // 8)
+    for i, on in enumerate(coils):
+        if on:
+            packed[i >> 3] |= 1 << (i & 7)
+    return bytes(packed)
+
+
+def unpack_coils(data: bytes, count: int) -> list[bool]:
+    return [bool(data[i >> 3] >> (i & 7) & 1) for i in range(count)]
+
+
+class ModbusTCPServer:
+    """Asyncio Modbus TCP server in front of a ``RelayService``."""
+
+    def __init__(self, service: RelayService):
+        self._service = service
+        self._server: asyncio.Server | None = None
+        self._clients: set[asyncio.StreamWriter] = set()
+        self._runner = LoopThread("relay-modbus")
+
+    @property
+    def port(self) -> int:
+        """The bound port (useful when started on port 0)."""
+        if self._server is None:
+            raise RuntimeError("Modbus server is not running")
+        return int(self._server.sockets[0].getsockname()[1])
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        logger.info("Modbus TCP listening on %s:%d", host, self.port)
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        # Drop idle PLC connections too; wait_closed() waits for them.
+        for writer in list(self._clients):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    # --- Running on a dedicated thread (device-owner process, tests) ---
+
+    def start_in_thread(self, host: str, port: int) -> None:
+        """Serve on a private event loop in a daemon thread."""
+        self._runner.start(lambda: self.start(host, port), self.close)
+
+    def stop_thread(self, timeout: float = 5.0) -> None:
+        self._runner.stop(timeout)
+
+    # --- Protocol ---
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        peer = writer.get_extra_info("peername")
+        logger.debug("Modbus client connected: %s", peer)
+        self._clients.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(_MBAP.size)
+                tid, protocol, length, unit = _MBAP.unpack(header)
+                if protocol != 0 or not 2 <= length <= _MAX_LENGTH:
+                    logger.warning("Dropping Modbus client %s: bad MBAP header", peer)
+                    return
+                pdu = await reader.readexactly(length - 1)
+                response = await self._dispatch(pdu)
+                writer.write(_MBAP.pack(tid, 0, len(response) + 1, unit) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+            logger.debug("Modbus client disconnected: %s", peer)
+
+    async def _dispatch(self, pdu: bytes) -> bytes:
+        function = pdu[0]
+        try:
+            if function == READ_COILS:
+                return self._read_coils(pdu)
+            if function == WRITE_SINGLE_COIL:
+                return await self._write_single_coil(pdu)
+            if function == WRITE_MULTIPLE_COILS:
+                return await self._write_multiple_coils(pdu)
+            raise ModbusError(ILLEGAL_FUNCTION)
+        except ModbusError as exc:
+            return bytes((function | 0x80, exc.code))
+        except InvalidChannelError:
+            return bytes((function | 0x80, ILLEGAL_DATA_ADDRESS))
+        except Exception:
+            logger.exception("Modbus function %#04x failed", function)
+            return bytes((function | 0x80, SERVER_DEVICE_FAILURE))
+
+    def _coil_range(self, pdu: bytes, limit: int) -> tuple[int, int]:
+        if len(pdu) < 5:
+            raise ModbusError(ILLEGAL_DATA_VALUE)
+        address, quantity = _ADDRESS_QUANTITY.unpack_from(pdu, 1)
+        if not 1 <= quantity <= limit:
+            raise ModbusError(ILLEGAL_DATA_VALUE)
+        if address + quantity > self._service.channel_count:
+            raise ModbusError(ILLEGAL_DATA_ADDRESS)
+        return address, quantity
+
+    def _require_device(self) -> None:
+        if not self._service.is_device_connected:
+            raise ModbusError(SERVER_DEVICE_FAILURE)
+
+    def _read_coils(self, pdu: bytes) -> bytes:
+        address, quantity = self._coil_range(pdu, _MAX_READ_COILS)
+        statuses = self._service.get_all_channels()[address : address + quantity]
+        coils = pack_coils([s.state == RelayState.ON for s in statuses])
+        return bytes((READ_COILS, len(coils))) + coils
+
+    async def _write_single_coil(self, pdu: bytes) -> bytes:
+        if len(pdu) != 5:
+            raise ModbusError(ILLEGAL_DATA_VALUE)
+        address, value = _ADDRESS_QUANTITY.unpack_from(pdu, 1)
+        if value not in (_COIL_ON, _COIL_OFF):
+            raise ModbusError(ILLEGAL_DATA_VALUE)
+        if address >= self._service.channel_count:
+            raise ModbusError(ILLEGAL_DATA_ADDRESS)
+        self._require_device()
+        state = RelayState.ON if value == _COIL_ON else RelayState.OFF
+        try:
+            await asyncio.to_thread(
+                self._service.set_channel,
+                address + 1,
+                state,
+                CommandPriority.INTERACTIVE,
+                "modbus",
+            )
+        except DeviceConnectionError as exc:
+            raise ModbusError(SERVER_DEVICE_FAILURE) from exc
+        return pdu  # the normal response echoes the request
+
+    async def _write_multiple_coils(self, pdu: bytes) -> bytes:
+        address, quantity = self._coil_range(pdu, _MAX_WRITE_COILS)
+        byte_count = (quantity + 7) // 8
+        if len(pdu) != 6 + byte_count or pdu[5] != byte_count:
+            raise ModbusError(ILLEGAL_DATA_VALUE)
+        self._require_device()
+        coils = unpack_coils(pdu[6:], quantity)
+        target = {
+            address + i + 1: RelayState.ON if on else RelayState.OFF
+            for i, on in enumerate(coils)
+        }
+        try:
+            await asyncio.to_thread(self._service.set_channels, target)
+        except DeviceConnectionError as exc:
+            raise ModbusError(SERVER_DEVICE_FAILURE) from exc
+        return pdu[:5]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+_Starter = Callable[[], Coroutine[Any, Any, None]]
+
+
+class LoopThread:
+    """A private event loop on a daemon thread, for serving outside uvicorn.
+
+    The device-owner process has no event loop of its own, so the optional
+    network frontends run their asyncio servers on one of these.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self, start: _Starter, close: _Starter) -> None:
+        """Run ``start()`` on the loop, then serve until :meth:`stop`.
+
+        Errors from ``start()`` (e.g. the port is taken) are re-raised here.
+        """
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors: list[BaseException] = []
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(start())
+            except BaseException as exc:
+                errors.append(exc)
+                loop.close()
+                return
+            finally:
+                started.set()
+            loop.run_forever()
+            loop.run_until_complete(close())
+            loop.close()
+
+        self._loop = loop
+        self._thread = threading.Thread(target=run, name=self._name, daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._loop is None or self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop = self._thread = None
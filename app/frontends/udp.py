@@ -0,0 +1,347 @@
+"""UDP command listener: one authenticated datagram per relay command.
+
+Meant for LAN test rigs that fire thousands of short toggles, where an
+HTTP connection per command is mostly overhead.  Every datagram is a
+fixed header followed by a truncated HMAC-SHA256 tag over the header::
+
+    request  >BBIQBB  version, op, client id, sequence, channel, state
+                      + 16-byte tag
+    ack      >BBQB    version, op | 0x80, sequence, status
+                      + relay state bitmask (as the octet-stream encoding)
+                      + 16-byte tag
+
+Ops are ``SET`` (one channel), ``ALL`` (every channel) and ``GET`` (state
+only).  Datagrams with a bad tag are dropped without an answer.  Each
+client id keeps a 64-entry sliding sequence window: a sequence number
+already seen (a retransmission) is not executed again, its cached ack is
+re-sent instead, and one older than the window is dropped.  The window is
+keyed by the authenticated client id rather than the source address, so a
+captured datagram replayed from another address is still a duplicate.
+Sequence numbers must only grow; :class:`UDPRelayClient` seeds them from
+the clock so a restarted client is not mistaken for a replay.  Commands
+from one client run in arrival order, each in the default executor.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+import socket
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import IntEnum
+
+from app.api.encodings import encode_bitmask
+from app.core.exceptions import DeviceConnectionError, InvalidChannelError
+from app.core.metrics import UDP_DROPPED
+from app.frontends.threaded import LoopThread
+from app.models.schemas import CommandPriority, RelayState
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+_REQUEST = struct.Struct(">BBIQBB")
+_ACK = struct.Struct(">BBQB")
+_TAG_SIZE = 16
+_WINDOW = 64
+_MAX_PEERS = 1024
+
+
+class Op(IntEnum):
+    SET = 1
+    ALL = 2
+    GET = 3
+
+
+class Status(IntEnum):
+    OK = 0
+    INVALID_CHANNEL = 1
+    INVALID_REQUEST = 2
+    DEVICE_ERROR = 3
+
+
+@dataclass(frozen=True, slots=True)
+class Ack:
+    sequence: int
+    op: int
+    status: Status
+    mask: int
+
+    def state(self, channel: int) -> RelayState:
+        return RelayState.ON if self.mask >> (channel - 1) & 1 else RelayState.OFF
+
+
+def _tag(key: bytes, data: bytes) -> bytes:
+    return hmac.new(key, data, hashlib.sha256).digest()[:_TAG_SIZE]
+
+
+def _verify(key: bytes, datagram: bytes) -> bytes | None:
+    """The datagram without its tag, or ``None`` if the tag is wrong."""
+    if len(datagram) <= _TAG_SIZE:
+        return None
+    body, tag = datagram[:-_TAG_SIZE], datagram[-_TAG_SIZE:]
+    return body if hmac.compare_digest(tag, _tag(key, body)) else None
+
+
+def pack_request(
+    key: bytes,
+    client: int,
+    sequence: int,
+    op: Op,
+    channel: int = 0,
+    state: bool = False,
+) -> bytes:
+    body = _REQUEST.pack(VERSION, op, client, sequence, channel, state)
+    return body + _tag(key, body)
+
+
+def unpack_ack(key: bytes, datagram: bytes) -> Ack:
+    """Decode an ack; raises ``ValueError`` if it is forged or malformed."""
+    body = _verify(key, datagram)
+    if body is None or len(body) < _ACK.size:
+        raise ValueError("Invalid ack")
+    version, op, sequence, status = _ACK.unpack_from(body)
+    if version != VERSION or not op & 0x80:
+        raise ValueError("Invalid ack")
+    mask = int.from_bytes(body[_ACK.size :], "little")
+    return Ack(sequence, op & 0x7F, Status(status), mask)
+
+
+class SequenceWindow:
+    """Sliding window of recently seen sequence numbers (anti-replay).
+
+    The window lives in memory only: after a restart, or once a peer has
+    been evicted past ``_MAX_PEERS``, previously captured datagrams from
+    that peer are accepted again.
+    """
+
+    __slots__ = ("_top", "_seen")
+
+    def __init__(self) -> None:
+        self._top = -1
+        self._seen = 0  # bit i set: sequence top - i was accepted
+
+    def accept(self, sequence: int) -> bool:
+        """Record ``sequence``; ``False`` if it is a duplicate or too old."""
+        if sequence > self._top:
+            shift = sequence - self._top
+            # A jump past the window clears it without a huge shift.
+            if shift >= _WINDOW:
+                self._seen = 1
+            else:
+                self._seen = (self._seen << shift | 1) & ((1 << _WINDOW) - 1)
+            self._top = sequence
+            return True
+        offset = self._top - sequence
+        if offset >= _WINDOW or self._seen >> offset & 1:
+            return False
+        self._seen |= 1 << offset
+        return True
+
+
+class _Peer:
+    __slots__ = ("window", "acks", "lock")
+
+    def __init__(self) -> None:
+        self.window = SequenceWindow()
+        self.acks: OrderedDict[int, bytes] = OrderedDict()
+        self.lock = asyncio.Lock()
+
+    def remember(self, sequence: int, ack: bytes) -> None:
+        self.acks[sequence] = ack
+        if len(self.acks) > _WINDOW:
+            self.acks.popitem(last=False)
+
+
+class UDPCommandServer(asyncio.DatagramProtocol):
+    """Asyncio UDP server in front of a ``RelayService``."""
+
+    def __init__(self, service: RelayService, key: str):
+        if not key:
+            raise ValueError("RELAY_UDP_KEY must be set to enable the UDP listener")
+        self._service = service
+        self._key = key.encode()
+        self._peers: OrderedDict[int, _Peer] = OrderedDict()
+        self._transport: asyncio.DatagramTransport | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._runner = LoopThread("relay-udp")
+
+    @property
+    def port(self) -> int:
+        """The bound port (useful when started on port 0)."""
+        if self._transport is None:
+            raise RuntimeError("UDP server is not running")
+        return int(self._transport.get_extra_info("sockname")[1])
+
+    async def start(self, host: str, port: int) -> None:
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: self, local_addr=(host, port)
+        )
+        logger.info("UDP command listener on %s:%d", host, self.port)
+
+    async def close(self) -> None:
+        if self._transport is None:
+            return
+        self._transport.close()
+        self._transport = None
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+
+    # --- Running on a dedicated thread (device-owner process, tests) ---
+
+    def start_in_thread(self, host: str, port: int) -> None:
+        """Serve on a private event loop in a daemon thread."""
+        self._runner.start(lambda: self.start(host, port), self.close)
+
+    def stop_thread(self, timeout: float = 5.0) -> None:
+        self._runner.stop(timeout)
+
+    # --- Protocol ---
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        body = _verify(self._key, data)
+        if body is None:
+            UDP_DROPPED.inc("auth")
+            return
+        if len(body) != _REQUEST.size or body[0] != VERSION:
+            UDP_DROPPED.inc("malformed")
+            return
+        _, op, client, sequence, channel, state = _REQUEST.unpack(body)
+        peer = self._peer(client)
+        if not peer.window.accept(sequence):
+            ack = peer.acks.get(sequence)
+            if ack is None:
+                UDP_DROPPED.inc("replay")
+            elif self._transport is not None:
+                self._transport.sendto(ack, addr)  # our ack was lost
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._execute(peer, addr, op, sequence, channel, state)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _peer(self, client: int) -> _Peer:
+        peer = self._peers.get(client)
+        if peer is None:
+            peer = self._peers[client] = _Peer()
+            if len(self._peers) > _MAX_PEERS:
+                self._peers.popitem(last=False)
+        else:
+            self._peers.move_to_end(client)
+        return peer
+
+    async def _execute(
+        self,
+        peer: _Peer,
+        addr: tuple[str, int],
+        op: int,
+        sequence: int,
+        channel: int,
+        state: int,
+    ) -> None:
+        # Lock waiters are woken in FIFO order, so one sender's commands
+        # run in the order they arrived.
+        async with peer.lock:
+            status = await asyncio.to_thread(self._run, op, channel, state)
+        body = _ACK.pack(VERSION, op | 0x80, sequence, status) + encode_bitmask(
+            self._service.get_all_channels()
+        )
+        ack = body + _tag(self._key, body)
+        peer.remember(sequence, ack)
+        if self._transport is not None:
+            self._transport.sendto(ack, addr)
+
+    def _run(self, op: int, channel: int, state: int) -> Status:
+        if op not in (Op.SET, Op.ALL, Op.GET) or state > 1:
+            return Status.INVALID_REQUEST
+        if op == Op.GET:
+            return Status.OK
+        target = RelayState.ON if state else RelayState.OFF
+        try:
+            if op == Op.SET:
+                self._service.set_channel(
+                    channel, target, CommandPriority.INTERACTIVE, "udp"
+                )
+            else:
+                self._service.set_all_channels(target)
+        except InvalidChannelError:
+            return Status.INVALID_CHANNEL
+        except DeviceConnectionError:
+            return Status.DEVICE_ERROR
+        except Exception:
+            logger.exception("UDP command %d failed", op)
+            return Status.DEVICE_ERROR
+        return Status.OK
+
+
+class UDPRelayClient:
+    """Blocking client with retransmission, for test rigs and benchmarks."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        key: str,
+        timeout: float = 0.2,
+        retries: int = 3,
+    ):
+        self._key = key.encode()
+        self._retries = retries
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect((host, port))
+        self._client = secrets.randbits(32)
+        # Microseconds since the epoch: keeps growing across client restarts.
+        self._sequence = time.time_ns() // 1000
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self) -> UDPRelayClient:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def set_channel(self, channel: int, state: RelayState) -> Ack:
+        return self.send(Op.SET, channel, state == RelayState.ON)
+
+    def set_all(self, state: RelayState) -> Ack:
+        return self.send(Op.ALL, 0, state == RelayState.ON)
+
+    def get(self) -> Ack:
+        return self.send(Op.GET)
+
+    def send(self, op: Op, channel: int = 0, state: bool = False) -> Ack:
+        """Send one command and wait for its ack, retransmitting on timeout.
+
+        Raises ``TimeoutError`` when no ack arrives after all retries.
+        """
+        self._sequence += 1
+        datagram = pack_request(
+            self._key, self._client, self._sequence, op, channel, state
+        )
+        for _ in range(self._retries + 1):
+            self._sock.send(datagram)
+            try:
+                while True:
+                    ack = self._receive()
+                    if ack is not None and ack.sequence == self._sequence:
+                        return ack
+            except TimeoutError:
+                continue
+        raise TimeoutError(f"No ack for sequence {self._sequence}")
+
+    def _receive(self) -> Ack | None:
+        try:
+            return unpack_ack(self._key, self._sock.recv(2048))
+        except ValueError:
+            return None
@@ -0,0 +1,285 @@
+"""Worker-side proxy that forwards ``RelayService`` calls to the device owner."""
+
+from __future__ import annotations
+
+import logging
+import select
+import socket
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any
+
+from app.core import timing
+from app.core.exceptions import (
+    DeviceConnectionError,
+    InvalidChannelError,
+    RelayError,
+)
+from app.ipc.protocol import ProtocolError, recv_frame, send_frame
+from app.ipc.shm import StateSegmentReader
+from app.models.schemas import (
+    BurnTestMode,
+    BurnTestStatus,
+    CommandPriority,
+    DebounceStats,
+    DeviceInfo,
+    LockProfile,
+    RelayState,
+    RelayStatus,
+    SchedulerStats,
+)
+from app.services.events import EventBus
+
+logger = logging.getLogger(__name__)
+
+_ERRORS: dict[str, type[RelayError]] = {
+    "DeviceConnectionError": DeviceConnectionError,
+    "InvalidChannelError": InvalidChannelError,
+}
+
+
+def _is_open(sock: socket.socket) -> bool:
+    """Whether an idle connection is still usable (the owner has not closed it)."""
+    # An idle connection has nothing to read unless the owner closed it
+    # (or sent bytes no request asked for): either way it is unusable.
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    return not readable
+
+
+class RemoteRelayService:
+    """Drop-in stand-in for ``RelayService`` backed by the device owner.
+
+    Calls travel over persistent Unix-socket connections kept in a small
+    pool, so concurrent requests each hold their own connection and
+    sequential requests reuse one.  Errors raised in the owner are
+    re-raised here as the same exception types.  If the owner cannot be
+    reached the device counts as disconnected.
+
+    A pooled connection the owner has closed (e.g. it restarted) is
+    dropped before use, and a request that could not be sent on a pooled
+    connection is retried on another.  Once a request has gone out it is
+    never sent again: a lost or late reply raises
+    ``DeviceConnectionError``, since the owner may already have acted on
+    it (a burn test must not be started twice).
+
+    With ``segment`` (the owner's shared-memory state segment) state reads
+    — channel states, version, connection and burn-test status — are
+    served from shared memory without any IPC; only writes and rarely used
+    queries go to the owner.
+
+    :attr:`events` is a local bus: events are published in the owner
+    process and are not forwarded to workers.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        segment: str = "",
+        pool_size: int = 16,
+        timeout_s: float = 10.0,
+    ):
+        self._path = path
+        self._state: StateSegmentReader | None = None
+        if segment:
+            try:
+                self._state = StateSegmentReader(segment)
+            except FileNotFoundError:
+                logger.warning(
+                    "State segment %s not found — reading state over IPC", segment
+                )
+        self._pool_size = pool_size
+        self._timeout_s = timeout_s
+        self._idle: list[socket.socket] = []
+        self._pool_lock = threading.Lock()
+        self._channels: int | None = None
+        self._events = EventBus()
+
+    # --- Connection pool ---
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout_s)
+        try:
+            sock.connect(self._path)
+        except OSError as exc:
+            sock.close()
+            raise DeviceConnectionError(
+                f"Device owner unavailable at {self._path}: {exc}"
+            ) from exc
+        return sock
+
+    def _checkout(self) -> tuple[socket.socket, bool]:
+        while True:
+            with self._pool_lock:
+                if not self._idle:
+                    break
+                sock = self._idle.pop()
+            if _is_open(sock):
+                return sock, True
+            sock.close()
+        return self._connect(), False
+
+    def _checkin(self, sock: socket.socket) -> None:
+        with self._pool_lock:
+            if len(self._idle) < self._pool_size:
+                self._idle.append(sock)
+                return
+        sock.close()
+
+    @property
+    def idle_connections(self) -> int:
+        return len(self._idle)
+
+    def close(self) -> None:
+        if self._state is not None:
+            self._state.close()
+            self._state = None
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+    def _call(self, method: str, *args: Any) -> Any:
+        request: dict[str, Any] = {"m": method, "a": list(args)}
+        timed = timing.active()
+        if timed:
+            request["t"] = 1
+            start = time.perf_counter()
+        while True:
+            sock, pooled = self._checkout()
+            try:
+                send_frame(sock, request)
+            except OSError as exc:
+                sock.close()
+                if pooled:
+                    # A partial frame is never executed: safe to resend.
+                    continue
+                raise DeviceConnectionError(
+                    f"Device owner request failed: {exc}"
+                ) from exc
+            try:
+                reply = recv_frame(sock)
+                if reply is None:
+                    raise ProtocolError("Device owner closed the connection")
+            except (OSError, ProtocolError) as exc:
+                sock.close()
+                raise DeviceConnectionError(
+                    f"Device owner request failed: {exc}"
+                ) from exc
+            self._checkin(sock)
+            if timed:
+                # Owner-side phases, plus the round trip as a whole.
+                for name, seconds in reply.get("t", {}).items():
+                    timing.record(name, seconds)
+                timing.record("ipc", time.perf_counter() - start)
+            if "e" in reply:
+                error = _ERRORS.get(reply["e"], RelayError)
+                raise error(*reply["a"])
+            return reply["r"]
+
+    # --- RelayService interface ---
+
+    def set_channel(
+        self,
+        channel: int,
+        state: RelayState,
+        priority: CommandPriority = CommandPriority.INTERACTIVE,
+        source: str = "api",
+    ) -> RelayStatus:
+        return RelayStatus.model_validate(
+            self._call("set_channel", channel, state.value, priority.value, source)
+        )
+
+    def get_channel(self, channel: int) -> RelayStatus:
+        if self._state is not None:
+            return self._state.read().channel(channel)
+        return RelayStatus.model_validate(self._call("get_channel", channel))
+
+    def get_all_channels(self) -> list[RelayStatus]:
+        if self._state is not None:
+            return self._state.read().all_channels()
+        return [
+            RelayStatus.model_validate(r) for r in self._call("get_all_channels")
+        ]
+
+    def set_all_channels(self, state: RelayState) -> list[RelayStatus]:
+        return [
+            RelayStatus.model_validate(r)
+            for r in self._call("set_all_channels", state.value)
+        ]
+
+    def set_channels(self, states: Mapping[int, RelayState]) -> list[RelayStatus]:
+        pairs = [[ch, state.value] for ch, state in states.items()]
+        return [
+            RelayStatus.model_validate(r) for r in self._call("set_channels", pairs)
+        ]
+
+    def all_off(self) -> None:
+        self._call("all_off")
+
+    @property
+    def channel_count(self) -> int:
+        if self._channels is None:
+            self._channels = int(self._call("channel_count"))
+        return self._channels
+
+    def get_scheduler_stats(self) -> SchedulerStats:
+        return SchedulerStats.model_validate(self._call("get_scheduler_stats"))
+
+    def get_debounce_stats(self) -> DebounceStats:
+        return DebounceStats.model_validate(self._call("get_debounce_stats"))
+
+    def get_lock_profile(self, top: int = 10) -> LockProfile:
+        return LockProfile.model_validate(self._call("get_lock_profile", top))
+
+    def set_lock_profiling(self, enabled: bool) -> LockProfile:
+        return LockProfile.model_validate(self._call("set_lock_profiling", enabled))
+
+    @property
+    def state_version(self) -> int:
+        if self._state is not None:
+            return self._state.read().version
+        return int(self._call("state_version"))
+
+    def changed_since(self, version: int) -> list[int] | None:
+        result = self._call("changed_since", version)
+        return None if result is None else [int(ch) for ch in result]
+
+    @property
+    def events(self) -> EventBus:
+        return self._events
+
+    @property
+    def is_device_connected(self) -> bool:
+        if self._state is not None:
+            return self._state.read().connected
+        try:
+            return bool(self._call("is_device_connected"))
+        except DeviceConnectionError:
+            return False
+
+    def render_metrics(self) -> str:
+        """The device owner's service and device metrics."""
+        return str(self._call("render_metrics"))
+
+    def get_device_info(self) -> DeviceInfo:
+        return DeviceInfo.model_validate(self._call("get_device_info"))
+
+    def start_burn_test(
+        self, cycles: int, delay_ms: int, mode: BurnTestMode = BurnTestMode.ALL,
+    ) -> BurnTestStatus:
+        return BurnTestStatus.model_validate(
+            self._call("start_burn_test", cycles, delay_ms, mode.value)
+        )
+
+    def stop_burn_test(self) -> BurnTestStatus:
+        return BurnTestStatus.model_validate(self._call("stop_burn_test"))
+
+    def get_burn_test_status(self) -> BurnTestStatus:
+        if self._state is not None:
+            return self._state.read().burn
+        return BurnTestStatus.model_validate(self._call("get_burn_test_status"))
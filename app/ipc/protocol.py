@@ -0,0 +1,64 @@
+"""Wire protocol between HTTP workers and the device-owner process.
+
+Every message is one frame: a 4-byte big-endian length followed by a
+compact JSON object.  Requests are ``{"m": method, "a": [args...]}``;
+replies are ``{"r": result}`` on success or ``{"e": error_type,
+"a": [args...]}`` when the owner raised.  A request carrying ``"t": 1``
+asks for the owner's ``Server-Timing`` phases, returned as ``"t":
+{phase: seconds}`` on the reply.  Connections are persistent and carry
+one request at a time, so no request ids are needed.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import struct
+from typing import Any
+
+_HEADER = struct.Struct(">I")
+
+# Frames are tiny; anything larger is a protocol error, not a real message.
+MAX_FRAME = 1 << 20
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a malformed or oversized frame."""
+
+
+def encode(message: dict[str, Any]) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+def send_frame(sock: socket.socket, message: dict[str, Any]) -> None:
+    sock.sendall(encode(message))
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes | None:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            if buf:
+                raise ProtocolError("Connection closed mid-frame")
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket) -> dict[str, Any] | None:
+    """Read one frame; ``None`` when the peer closed the connection cleanly."""
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ProtocolError(f"Frame of {size} bytes exceeds {MAX_FRAME}")
+    body = _recv_exactly(sock, size)
+    if body is None:
+        raise ProtocolError("Connection closed mid-frame")
+    message = json.loads(body)
+    if not isinstance(message, dict):
+        raise ProtocolError("Frame is not a JSON object")
+    return message
@@ -0,0 +1,254 @@
+"""Device-owner process: the only process that talks to the relay device.
+
+In multi-worker mode every HTTP worker forwards relay commands here over a
+Unix socket, so there is exactly one ``RelayService`` — one copy of the
+relay states, one device scheduler, one set of pulse and debounce timers —
+no matter how many workers serve requests.  Run standalone with::
+
+    RELAY_OWNER_SOCKET=/run/relay/owner.sock RELAY_STATE_SEGMENT=relay-state \\
+        python -m app.ipc.server
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from collections.abc import Callable
+from types import FrameType
+from typing import Any, NoReturn
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.core import timing
+from app.core.exceptions import InvalidChannelError
+from app.frontends.modbus import ModbusTCPServer
+from app.frontends.udp import UDPCommandServer
+from app.ipc.protocol import ProtocolError, recv_frame, send_frame
+from app.ipc.shm import StateSegmentWriter
+from app.models.schemas import BurnTestMode, CommandPriority, RelayState
+from app.services.factory import (
+    create_device,
+    create_relay_service,
+    start_device,
+    start_prober,
+)
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "/tmp/relay-owner.sock"
+
+
+def _dump(model: BaseModel) -> Any:
+    return model.model_dump(mode="json")
+
+
+# Remote-callable surface of ``RelayService``: name -> (service, *args).
+_METHODS: dict[str, Callable[..., Any]] = {
+    "set_channel": lambda s, channel, state, priority, source: _dump(
+        s.set_channel(channel, RelayState(state), CommandPriority(priority), source)
+    ),
+    "get_channel": lambda s, channel: _dump(s.get_channel(channel)),
+    "get_all_channels": lambda s: [_dump(r) for r in s.get_all_channels()],
+    "set_all_channels": lambda s, state: [
+        _dump(r) for r in s.set_all_channels(RelayState(state))
+    ],
+    "set_channels": lambda s, pairs: [
+        _dump(r)
+        for r in s.set_channels({ch: RelayState(state) for ch, state in pairs})
+    ],
+    "all_off": lambda s: s.all_off(),
+    "channel_count": lambda s: s.channel_count,
+    "state_version": lambda s: s.state_version,
+    "changed_since": lambda s, version: s.changed_since(version),
+    "is_device_connected": lambda s: s.is_device_connected,
+    "get_device_info": lambda s: _dump(s.get_device_info()),
+    "render_metrics": lambda s: s.render_metrics(),
+    "get_scheduler_stats": lambda s: _dump(s.get_scheduler_stats()),
+    "get_debounce_stats": lambda s: _dump(s.get_debounce_stats()),
+    "get_lock_profile": lambda s, top: _dump(s.get_lock_profile(top)),
+    "set_lock_profiling": lambda s, enabled: _dump(s.set_lock_profiling(enabled)),
+    "start_burn_test": lambda s, cycles, delay_ms, mode: _dump(
+        s.start_burn_test(cycles, delay_ms, BurnTestMode(mode))
+    ),
+    "stop_burn_test": lambda s: _dump(s.stop_burn_test()),
+    "get_burn_test_status": lambda s: _dump(s.get_burn_test_status()),
+}
+
+
+# Calls that may change state; the shared snapshot is refreshed before
+# replying so the caller's next read sees its own write.
+_MUTATING = frozenset(
+    {
+        "set_channel",
+        "set_all_channels",
+        "set_channels",
+        "all_off",
+        "start_burn_test",
+        "stop_burn_test",
+    }
+)
+
+
+def _error_reply(exc: Exception) -> dict[str, Any]:
+    if isinstance(exc, InvalidChannelError):
+        return {"e": "InvalidChannelError", "a": [exc.channel, exc.max_channels]}
+    return {"e": type(exc).__name__, "a": [str(exc)]}
+
+
+class _OwnerHandler(socketserver.BaseRequestHandler):
+    """Serve requests from one persistent worker connection."""
+
+    server: RelayOwnerServer
+
+    def setup(self) -> None:
+        self.server.track(self.request)
+
+    def finish(self) -> None:
+        self.server.untrack(self.request)
+
+    def handle(self) -> None:
+        service = self.server.service
+        segment = self.server.segment
+        while True:
+            try:
+                request = recv_frame(self.request)
+            except (OSError, ProtocolError, ValueError):
+                logger.warning("Dropping malformed IPC connection")
+                return
+            if request is None:
+                return
+            name = request.get("m")
+            token = None
+            if request.get("t"):
+                phases, token = timing.begin()
+            try:
+                reply = {"r": _METHODS[str(name)](service, *request.get("a", ()))}
+            except Exception as exc:
+                reply = _error_reply(exc)
+            if segment is not None and name in _MUTATING:
+                segment.publish(service)
+            if token is not None:
+                timing.end(token)
+                reply["t"] = phases
+            try:
+                send_frame(self.request, reply)
+            except OSError:
+                return
+
+
+class RelayOwnerServer(socketserver.ThreadingUnixStreamServer):
+    """Unix-socket server exposing one ``RelayService`` to worker processes.
+
+    Each worker connection gets its own thread; the service's device
+    scheduler serializes the actual HID writes as it does in-process.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        path: str,
+        service: RelayService,
+        segment: StateSegmentWriter | None = None,
+    ):
+        self.service = service
+        self.segment = segment
+        self._connections: set[socket.socket] = set()
+        self._connections_lock = threading.Lock()
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket from a previous owner
+        super().__init__(path, _OwnerHandler)
+        os.chmod(path, 0o600)
+
+    def track(self, conn: socket.socket) -> None:
+        with self._connections_lock:
+            self._connections.add(conn)
+
+    def untrack(self, conn: socket.socket) -> None:
+        with self._connections_lock:
+            self._connections.discard(conn)
+
+    def server_close(self) -> None:
+        """Stop listening and hang up on every connected worker."""
+        super().server_close()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        try:
+            os.unlink(self.server_address)  # type: ignore[arg-type]
+        except FileNotFoundError:
+            pass
+
+
+def _terminate(signum: int, frame: FrameType | None) -> NoReturn:
+    raise SystemExit(0)
+
+
+def run_owner(path: str, segment_name: str = "") -> None:
+    """Serve the device on ``path`` until terminated.
+
+    The device is opened in the background, as in a single-process
+    server, so the socket is listening right away.
+
+    With ``segment_name`` the owner also publishes relay state into that
+    shared-memory segment for workers to read without IPC.  On exit every
+    relay is driven OFF before the device is closed, exactly as a
+    single-process server does on shutdown.
+    """
+    logging.basicConfig(
+        level=logging.DEBUG if settings.debug else logging.INFO,
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+    )
+    signal.signal(signal.SIGTERM, _terminate)
+    service = create_relay_service(create_device())
+    segment: StateSegmentWriter | None = None
+    if segment_name:
+        segment = StateSegmentWriter(segment_name, service.channel_count)
+        segment.follow(service)
+    # Workers may connect before the device is open; they see it as
+    # disconnected until the background open publishes the OFF state.
+    start_device(service)
+    prober = start_prober(service)
+    modbus: ModbusTCPServer | None = None
+    if settings.modbus_port > 0:
+        modbus = ModbusTCPServer(service)
+        modbus.start_in_thread(settings.modbus_host, settings.modbus_port)
+    udp: UDPCommandServer | None = None
+    if settings.udp_port > 0:
+        udp = UDPCommandServer(service, settings.udp_key)
+        udp.start_in_thread(settings.udp_host, settings.udp_port)
+    server = RelayOwnerServer(path, service, segment)
+    logger.info("Device owner listening on %s", path)
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        logger.info("Device owner shutting down")
+        server.server_close()
+        if modbus is not None:
+            modbus.stop_thread()
+        if udp is not None:
+            udp.stop_thread()
+        if prober is not None:
+            prober.stop()
+        service.stop_burn_test()
+        service.close_device()
+        if segment is not None:
+            segment.publish(service)  # workers now read "disconnected"
+            segment.close()
+
+
+if __name__ == "__main__":
+    run_owner(settings.owner_socket or DEFAULT_SOCKET, settings.state_segment)
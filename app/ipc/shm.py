@@ -0,0 +1,209 @@
+"""Shared-memory snapshot of relay state, published by the device owner.
+
+The owner writes channel states, the state version, device connection and
+burn-test status into a ``multiprocessing.shared_memory`` segment; workers
+read it directly, so reads never need an IPC round trip.
+
+Writes follow a seqlock protocol: the writer bumps a sequence counter to
+an odd value, writes the payload, then bumps it to the next even value.
+Readers copy the payload and retry if the counter was odd or changed
+while they were copying, so a snapshot is never torn.  There is exactly
+one writer (the owner), serialized by a lock.
+
+Layout (little-endian)::
+
+    seq:Q  version:Q  channels:I  connected:B  burn_running:B  burn_mode:B
+    pad:x  burn_cycles_completed:Q  burn_cycles_target:Q  burn_errors:Q
+    states:B * channels
+"""
+
+from __future__ import annotations
+
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from app.core.exceptions import InvalidChannelError
+from app.models.schemas import BurnTestMode, BurnTestStatus, RelayState, RelayStatus
+from app.services.relay_service import RelayService
+
+_SEQ = struct.Struct("<Q")
+_HEADER = struct.Struct("<QIBBBxQQQ")
+_PAYLOAD_OFFSET = _SEQ.size
+_STATES_OFFSET = _PAYLOAD_OFFSET + _HEADER.size
+
+_MODES = list(BurnTestMode)
+
+
+@dataclass(frozen=True, slots=True)
+class StateSnapshot:
+    version: int
+    states: tuple[RelayState, ...]
+    connected: bool
+    burn: BurnTestStatus
+
+    def channel(self, channel: int) -> RelayStatus:
+        if channel < 1 or channel > len(self.states):
+            raise InvalidChannelError(channel, len(self.states))
+        return RelayStatus(channel=channel, state=self.states[channel - 1])
+
+    def all_channels(self) -> list[RelayStatus]:
+        return [
+            RelayStatus(channel=ch, state=state)
+            for ch, state in enumerate(self.states, start=1)
+        ]
+
+
+def segment_size(channels: int) -> int:
+    return _STATES_OFFSET + channels
+
+
+def _buffer(shm: SharedMemory) -> memoryview:
+    buf = shm.buf
+    if buf is None:
+        raise RuntimeError(f"Shared memory segment {shm.name} is closed")
+    return buf
+
+
+class StateSegmentWriter:
+    """Owner side: creates the segment and publishes service snapshots."""
+
+    def __init__(self, name: str, channels: int):
+        self._channels = channels
+        self._shm = SharedMemory(name=name, create=True, size=segment_size(channels))
+        self._buf = _buffer(self._shm)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._follower: threading.Thread | None = None
+        self._closed = threading.Event()
+        _HEADER.pack_into(self._buf, _PAYLOAD_OFFSET, 0, channels, 0, 0, 0, 0, 0, 0)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def follow(self, service: RelayService) -> None:
+        """Republish after every service event (pulse, debounce, burn test).
+
+        Changes made through IPC calls are also published synchronously
+        by the owner before it replies, so callers read their own writes.
+        """
+        sub = service.events.subscribe()
+
+        def run() -> None:
+            with sub:
+                while not self._closed.is_set():
+                    if sub.get(timeout=0.5) is not None:
+                        sub.drain()
+                        self.publish(service)
+
+        self.publish(service)
+        self._follower = threading.Thread(
+            target=run, name="relay-shm-writer", daemon=True
+        )
+        self._follower.start()
+
+    def publish(self, service: RelayService) -> None:
+        """Write the service's current state as one consistent snapshot.
+
+        The follower thread and the IPC handler both publish.  The state
+        is read under the writer lock, so a publish never overwrites a
+        newer snapshot with an older one.
+        """
+        with self._lock:
+            version = service.state_version
+            states = bytes(
+                s.state == RelayState.ON for s in service.get_all_channels()
+            )
+            burn = service.get_burn_test_status()
+            connected = service.is_device_connected
+            buf = self._buf
+            self._seq += 1
+            _SEQ.pack_into(buf, 0, self._seq)
+            _HEADER.pack_into(
+                buf,
+                _PAYLOAD_OFFSET,
+                version,
+                self._channels,
+                connected,
+                burn.running,
+                _MODES.index(burn.mode),
+                burn.cycles_completed,
+                burn.cycles_target,
+                burn.errors,
+            )
+            buf[_STATES_OFFSET : _STATES_OFFSET + self._channels] = states
+            self._seq += 1
+            _SEQ.pack_into(buf, 0, self._seq)
+
+    def close(self) -> None:
+        """Release and remove the segment (owner shutdown)."""
+        self._closed.set()
+        if self._follower is not None:
+            self._follower.join(timeout=1.0)
+        del self._buf
+        self._shm.close()
+        self._shm.unlink()
+
+
+class StateSegmentReader:
+    """Worker side: lock-free consistent reads of the owner's snapshot."""
+
+    def __init__(self, name: str):
+        self._shm = SharedMemory(name=name)
+        # Attaching registers the segment with this process's resource
+        # tracker, which would unlink it when the worker exits; only the
+        # owner may do that.
+        resource_tracker.unregister(self._shm._name, "shared_memory")  # type: ignore[attr-defined]
+        self._buf = _buffer(self._shm)
+        channels = _HEADER.unpack_from(self._buf, _PAYLOAD_OFFSET)[1]
+        self._end = _STATES_OFFSET + channels
+        self._last: tuple[int, StateSnapshot] | None = None
+
+    def read(self) -> StateSnapshot:
+        buf = self._buf
+        while True:
+            seq = _SEQ.unpack_from(buf, 0)[0]
+            if seq & 1:
+                time.sleep(0)  # writer mid-update; let it finish
+                continue
+            last = self._last
+            if last is not None and last[0] == seq:
+                return last[1]
+            payload = bytes(buf[_PAYLOAD_OFFSET : self._end])
+            if _SEQ.unpack_from(buf, 0)[0] == seq:
+                break
+        (
+            version,
+            _channels,
+            connected,
+            burn_running,
+            burn_mode,
+            cycles_completed,
+            cycles_target,
+            errors,
+        ) = _HEADER.unpack_from(payload)
+        snapshot = StateSnapshot(
+            version=version,
+            states=tuple(
+                RelayState.ON if b else RelayState.OFF
+                for b in payload[_HEADER.size :]
+            ),
+            connected=bool(connected),
+            burn=BurnTestStatus(
+                running=bool(burn_running),
+                cycles_completed=cycles_completed,
+                cycles_target=cycles_target,
+                errors=errors,
+                mode=_MODES[burn_mode],
+            ),
+        )
+        self._last = (seq, snapshot)
+        return snapshot
+
+    def close(self) -> None:
+        del self._buf
+        self._shm.close()
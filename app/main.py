@@ -1,68 +1,124 @@
 from __future__ import annotations
 
 import logging
+import threading
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, cast
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.dependencies import init_relay_service
+from app.api.v1.debug import router as debug_router
 from app.api.v1.relays import router as relays_router
 from app.api.v1.system import router as system_router
+from app.api.v1.ws import router as ws_router
 from app.config import settings
-from app.core.device import HIDRelayDevice, MockRelayDevice, RelayDevice
+from app.middleware import (
+    APIKeyAuthMiddleware,
+    MetricsMiddleware,
+    RateLimitMiddleware,
+    ServerTimingMiddleware,
+)
+from app.services.factory import (
+    create_device,
+    create_relay_service,
+    start_device,
+    start_prober,
+)
+from app.services.prober import DeviceProber
 from app.services.relay_service import RelayService
 
+if TYPE_CHECKING:
+    from app.frontends.modbus import ModbusTCPServer
+    from app.frontends.udp import UDPCommandServer
+    from app.ipc.client import RemoteRelayService
+
 logging.basicConfig(
     level=logging.DEBUG if settings.debug else logging.INFO,
     format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
 )
 logger = logging.getLogger(__name__)
 
+# How long shutdown waits for a still-running background device open.
+_DEVICE_OPEN_TIMEOUT_S = 5.0
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    device: RelayDevice
-    if settings.mock:
-        device = MockRelayDevice(channels=settings.relay_channels)
-        device.open()
-        logger.info("Running in MOCK mode — no real hardware")
+    remote: RemoteRelayService | None = None
+    service: RelayService | None = None
+    opener: threading.Thread | None = None
+    prober: DeviceProber | None = None
+    modbus: ModbusTCPServer | None = None
+    udp: UDPCommandServer | None = None
+    if settings.owner_socket:
+        # Multi-worker mode: the device lives in the owner process.  The
+        # IPC client is only imported here, where it is needed.
+        from app.ipc.client import RemoteRelayService
+
+        remote = RemoteRelayService(settings.owner_socket, settings.state_segment)
+        init_relay_service(cast(RelayService, remote))
+        logger.info(
+            "Forwarding relay commands to device owner at %s",
+            settings.owner_socket,
+        )
     else:
-        device = HIDRelayDevice(settings.vendor_id, settings.product_id)
-        try:
-            device.open()
-            logger.info(
-                "Device connected — %d channels ready", settings.relay_channels
-            )
-        except Exception:
-            logger.warning(
-                "USB relay device not found — starting in disconnected mode. "
-                "Relay endpoints will return 503 until the device is available."
-            )
-
-    service = RelayService(
-        device, channels=settings.relay_channels, pulse_ms=settings.pulse_ms,
-    )
-    if device.is_open:
-        service.all_off()
-    init_relay_service(service)
+        # The device is opened (and driven OFF) in the background so a
+        # slow USB enumeration never holds up accepting connections.
+        service = create_relay_service(create_device())
+        init_relay_service(service)
+        opener = start_device(service)
+        prober = start_prober(service)
+        # With several workers the device owner serves these instead.
+        if settings.modbus_port > 0:
+            from app.frontends.modbus import ModbusTCPServer
+
+            modbus = ModbusTCPServer(service)
+            await modbus.start(settings.modbus_host, settings.modbus_port)
+        if settings.udp_port > 0:
+            from app.frontends.udp import UDPCommandServer
+
+            udp = UDPCommandServer(service, settings.udp_key)
+            await udp.start(settings.udp_host, settings.udp_port)
 
     if settings.api_key:
         logger.info("API key authentication ENABLED")
     else:
         logger.info("API key authentication DISABLED (open access)")
     if settings.rate_limit > 0:
-        logger.info("Rate limiting ENABLED (%d req/min)", settings.rate_limit)
+        logger.info(
+            "Rate limiting ENABLED (%d/min per %s)",
+            settings.rate_limit,
+            settings.rate_limit_key,
+        )
     if settings.pulse_ms > 0:
         logger.info("Pulse mode ENABLED (%dms auto-off)", settings.pulse_ms)
+    if settings.min_switch_ms > 0 or settings.min_switch_ms_channels:
+        logger.info(
+            "Switch debounce ENABLED (%dms default, overrides: %s)",
+            settings.min_switch_ms,
+            settings.min_switch_ms_channels or "none",
+        )
     logger.info("Relay API started")
     yield
 
     logger.info("Shutting down")
-    if device.is_open:
-        service.all_off()
-        device.close()
+    if remote is not None:
+        # Fail-safe OFF on shutdown is the owner's job: other workers may
+        # still be serving.
+        remote.close()
+    elif service is not None:
+        if modbus is not None:
+            await modbus.close()
+        if udp is not None:
+            await udp.close()
+        if prober is not None:
+            prober.stop()
+        if opener is not None:
+            opener.join(timeout=_DEVICE_OPEN_TIMEOUT_S)
+        service.close_device()
 
 
 DESCRIPTION = """\
@@ -79,9 +135,21 @@ REST API for controlling DCT Tech USB relay modules via HID.
 ## Authentication
 
 Set the `RELAY_API_KEY` environment variable to enable API key authentication.
-When enabled, all requests must include an `X-API-Key` header with the configured key.
+When enabled, all requests must include an `X-API-Key` header with the configured key
+(health probes, `/metrics` and the API docs stay public); requests without one
+are rejected before routing.
 When unset, the API is open — restrict access via network policies.
 
+## WebSocket Command Channel
+
+`/api/v1/relays/ws` accepts a persistent WebSocket for high-rate control.
+Authenticate once per connection (`X-API-Key` handshake header, or a first
+frame `{"op": "auth", "key": "..."}`), then send JSON commands such as
+`{"id": 1, "op": "set", "ch": 1, "state": "on"}`. Ops are `set`, `get`,
+`set_all`, `get_all` and `ping`. Commands may be pipelined; each receives
+one ack echoing its `id`, e.g. `{"id": 1, "ok": true, "ch": 1, "state": "on"}`
+or `{"id": 1, "ok": false, "code": 404, "error": "..."}`.
+
 ## Audit Logging
 
 All relay state changes are logged to the `relay.audit` logger with ISO-8601 timestamps,
@@ -89,9 +157,28 @@ action type, target channel(s), and resulting state.
 
 ## Rate Limiting
 
-Set `RELAY_RATE_LIMIT` to a positive integer to enable per-client IP rate limiting
-(requests per minute). Returns `429 Too Many Requests` with a `Retry-After` header
-when exceeded. Disabled by default.
+Set `RELAY_RATE_LIMIT` to a positive integer to enable per-client rate limiting
+(cost units per minute, sliding window). Most requests cost 1; bulk writes and
+burn tests cost more (`RELAY_RATE_LIMIT_COSTS`). Clients are identified by IP,
+or by API key with `RELAY_RATE_LIMIT_KEY=api_key`. Returns `429 Too Many Requests`
+with a `Retry-After` header when exceeded. Disabled by default.
+
+## Multiple Workers
+
+Set `RELAY_WORKERS` above 1 to serve HTTP from several processes. A single
+device-owner process then holds the USB device and all relay state; workers
+forward commands to it over a Unix socket, so state and fail-safe behaviour
+are identical to single-process mode. Reads are served from a shared-memory
+snapshot the owner keeps current. Rate limits and idempotency keys are
+tracked per worker.
+
+## Metrics
+
+`GET /metrics` serves Prometheus text-format metrics: request latency by
+route and status, rate-limit rejections, device lock wait/hold times, device
+write latency and errors per channel, active pulse timers, burn-test cycles
+and device connection state. Recording is a few dictionary updates per
+request, so metrics are always on.
 """
 
 app = FastAPI(
@@ -115,17 +202,29 @@ app = FastAPI(
     contact={"name": "Relay API Team"},
 )
 
+# Middleware runs outermost-last-added:
+# metrics -> Server-Timing -> CORS -> rate limit -> auth -> routes.
+# Auth and rate limiting are pure ASGI and reject before routing; CORS
+# wraps them so preflights and rejections carry CORS headers, and metrics
+# wraps everything so rejected requests are timed too.  Server-Timing must
+# wrap auth and rate limiting so they can report their phases.
+app.add_middleware(APIKeyAuthMiddleware)
+
+if settings.rate_limit > 0:
+    app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-if settings.rate_limit > 0:
-    from app.middleware import RateLimitMiddleware
-
-    app.add_middleware(RateLimitMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(relays_router, prefix="/api/v1")
+app.include_router(ws_router, prefix="/api/v1")
+app.include_router(
+    debug_router, prefix="/api/v1", include_in_schema=settings.debug_endpoints
+)
 app.include_router(system_router)
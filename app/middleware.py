@@ -1,53 +1,323 @@
+"""Pure ASGI middleware: metrics, Server-Timing, rate limiting and API-key auth.
+
+All run without the per-request task and stream overhead of
+``BaseHTTPMiddleware``; rate limiting and auth short-circuit rejected
+requests before routing.
+"""
+
 from __future__ import annotations
 
+import hashlib
+import math
 import time
-from collections import defaultdict
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_429_TOO_MANY_REQUESTS
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.api.dependencies import is_valid_api_key
 from app.config import settings
+from app.core import timing
+from app.core.metrics import RATE_LIMITED, REQUEST_LATENCY
+from app.core.profiler import request_finished
+
+# Paths reachable without an API key (health probes, metrics and API docs).
+PUBLIC_PATHS = frozenset(
+    {
+        "/health",
+        "/health/live",
+        "/health/ready",
+        "/metrics",
+        "/docs",
+        "/docs/oauth2-redirect",
+        "/redoc",
+        "/openapi.json",
+    }
+)
+
+
+class _Bucket:
+    __slots__ = ("window", "previous", "current", "last_seen")
+
+    def __init__(self, window: int, now: float):
+        self.window = window
+        self.previous = 0
+        self.current = 0
+        self.last_seen = now
+
+
+class SlidingWindowRateLimiter:
+    """Sliding-window-counter rate limiter with bounded memory.
+
+    Each client costs one small bucket holding the request count of the
+    current and previous fixed window; the sliding estimate weights the
+    previous window by how much of it still overlaps.  Every check is
+    O(1).  Buckets live in an LRU map capped at ``max_clients``, and
+    buckets idle for two windows are evicted as new traffic arrives.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        window_s: float = 60.0,
+        max_clients: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._limit = limit
+        self._window_s = window_s
+        self._max_clients = max_clients
+        self._clock = clock
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, key: str, cost: int = 1) -> int | None:
+        """Record a request of ``cost`` units for ``key``.
+
+        Returns ``None`` if allowed, otherwise the number of seconds
+        after which the same request would be allowed.
+        """
+        now = self._clock()
+        window = int(now // self._window_s)
+        elapsed = now - window * self._window_s
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(window, now)
+            self._buckets[key] = bucket
+            self._evict(now)
+        else:
+            self._buckets.move_to_end(key)
+            if bucket.window != window:
+                bucket.previous = bucket.current if bucket.window == window - 1 else 0
+                bucket.current = 0
+                bucket.window = window
+            bucket.last_seen = now
 
+        weight = 1.0 - elapsed / self._window_s
+        if bucket.previous * weight + bucket.current + cost <= self._limit:
+            bucket.current += cost
+            return None
+        return self._retry_after(bucket, elapsed, cost)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple fixed-window rate limiter per client IP.
+    def _retry_after(self, bucket: _Bucket, elapsed: float, cost: int) -> int:
+        w = self._window_s
+        if cost > self._limit:
+            return math.ceil(w)
+        if bucket.current + cost > self._limit:
+            # Wait for the next window, then for this window's share to decay.
+            wait = w - elapsed + w * (1.0 - (self._limit - cost) / bucket.current)
+        else:
+            headroom = self._limit - bucket.current - cost
+            wait = w * (1.0 - headroom / bucket.previous) - elapsed
+        return max(1, math.ceil(wait))
 
-    Limits each client to ``settings.rate_limit`` requests per minute.
-    Disabled when ``rate_limit`` is ``0`` (the default).
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while len(buckets) > self._max_clients:
+            buckets.popitem(last=False)
+        idle_before = now - 2 * self._window_s
+        # Amortized idle sweep: at most a couple of stale buckets per call.
+        for _ in range(2):
+            if not buckets:
+                break
+            oldest = next(iter(buckets.values()))
+            if oldest.last_seen >= idle_before:
+                break
+            buckets.popitem(last=False)
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return str(value.decode("latin-1"))
+    return None
+
+
+def client_key(scope: Scope, key_by: str) -> str:
+    """Identity a request is rate-limited under.
+
+    With ``key_by == "api_key"`` requests presenting a valid ``X-API-Key``
+    are limited per key (stored as a digest, never the secret itself);
+    everything else is limited per client IP.  The limiter runs before
+    authentication, so an unchecked key is never trusted: otherwise a
+    client could mint a fresh bucket per request with made-up keys.
+    """
+    if key_by == "api_key" and settings.api_key:
+        api_key = _header(scope, b"x-api-key")
+        if api_key and is_valid_api_key(api_key):
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def route_cost(method: str, path: str, costs: Mapping[str, int]) -> int:
+    return costs.get(f"{method} {path}", 1)
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled ``scope``.
+
+    Routes from included routers keep their router-relative path on
+    ``scope["route"]``; FastAPI records the full, prefixed template on
+    its effective route context, so that is preferred when present.
+    """
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path if isinstance(path, str) else "unmatched"
+
+
+class MetricsMiddleware:
+    """Record HTTP request latency by method, route template and status.
+
+    Routes are labelled by their template (``/api/v1/relays/{channel}``)
+    so label cardinality stays bounded; requests that never reached a
+    route (404s, auth and rate-limit rejections) share ``"unmatched"``.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route,
+                str(status_code),
+            )
+            request_finished(scope["method"], route)
+
+
+class ServerTimingMiddleware:
+    """Add a ``Server-Timing`` header breaking each HTTP response into phases.
+
+    Opt-in via ``settings.server_timing``.  Phases are collected through
+    :mod:`app.core.timing`: ``auth``, ``ratelimit``, ``lock`` (device
+    lock wait), ``device`` (device writes), ``audit``, ``serialize`` and,
+    in multi-worker mode, ``ipc`` (owner round trip), followed by
+    ``total`` up to the start of the response.  Phases a request never
+    reached are omitted.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.server_timing:
+            await self.app(scope, receive, send)
+            return
+
+        phases, token = timing.begin()
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                phases["total"] = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timing.header(phases))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timing.end(token)
+
+
+class RateLimitMiddleware:
+    """Sliding-window rate limiter per client.
+
+    Limits each client to ``settings.rate_limit`` cost units per minute,
+    where most requests cost 1 and ``settings.rate_limit_costs`` makes
+    heavier routes (bulk writes, burn tests) cost more.  Clients are
+    keyed per IP, or per API key when ``settings.rate_limit_key`` is
+    ``"api_key"``.  Disabled when ``rate_limit`` is ``0`` (the default).
 
     Returns 429 Too Many Requests with a ``Retry-After`` header when
     the limit is exceeded.
     """
 
-    def __init__(self, app: object) -> None:
-        super().__init__(app)  # type: ignore[arg-type]
-        self._window: dict[str, list[float]] = defaultdict(list)
-
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        limit = settings.rate_limit
-        if limit <= 0:
-            return await call_next(request)
-
-        client_ip = request.client.host if request.client else "unknown"
-        now = time.monotonic()
-        window_start = now - 60.0
-
-        # Prune expired timestamps
-        timestamps = self._window[client_ip]
-        self._window[client_ip] = [t for t in timestamps if t > window_start]
-        timestamps = self._window[client_ip]
-
-        if len(timestamps) >= limit:
-            retry_after = int(60.0 - (now - timestamps[0])) + 1
-            return Response(
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._limiter = SlidingWindowRateLimiter(
+            settings.rate_limit, max_clients=settings.rate_limit_max_clients
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or settings.rate_limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        retry_after = self._limiter.hit(
+            client_key(scope, settings.rate_limit_key),
+            route_cost(scope["method"], scope["path"], settings.rate_limit_costs),
+        )
+        timing.record("ratelimit", time.perf_counter() - start)
+        if retry_after is not None:
+            RATE_LIMITED.inc()
+            response = Response(
                 content='{"detail":"Rate limit exceeded"}',
                 status_code=HTTP_429_TOO_MANY_REQUESTS,
                 media_type="application/json",
                 headers={"Retry-After": str(retry_after)},
             )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
 
-        timestamps.append(now)
-        return await call_next(request)
+class APIKeyAuthMiddleware:
+    """Reject unauthenticated HTTP requests before routing.
+
+    Mirrors ``verify_api_key`` (which stays on the routes as defense in
+    depth) and shares its ``is_valid_api_key`` check: when
+    ``RELAY_API_KEY`` is set, every HTTP request outside ``PUBLIC_PATHS``
+    must carry a matching ``X-API-Key`` header.  WebSocket connections pass through, since the
+    command channel also accepts an in-band auth frame.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not settings.api_key
+            or scope["type"] != "http"
+            or scope["path"] in PUBLIC_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        authorized = is_valid_api_key(_header(scope, b"x-api-key"))
+        timing.record("auth", time.perf_counter() - start)
+        if not authorized:
+            response = Response(
+                content='{"detail":"Invalid or missing API key"}',
+                status_code=HTTP_401_UNAUTHORIZED,
+                media_type="application/json",
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -15,10 +15,21 @@ class BurnTestMode(str, Enum):
     ALTERNATE = "alternate"
 
 
+class CommandPriority(str, Enum):
+    """Device access class, highest first."""
+
+    FAIL_SAFE = "fail_safe"
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
 class RelayCommand(BaseModel):
     """Command to set a single relay channel state."""
 
-    model_config = {"json_schema_extra": {"examples": [{"state": "on"}]}}
+    model_config = {
+        "frozen": True,
+        "json_schema_extra": {"examples": [{"state": "on"}]},
+    }
 
     state: RelayState = Field(
         description="Desired relay state: 'on' or 'off'"
@@ -41,7 +52,10 @@ class RelayStatus(BaseModel):
 class RelayBulkCommand(BaseModel):
     """Command to set all relay channels to the same state."""
 
-    model_config = {"json_schema_extra": {"examples": [{"state": "off"}]}}
+    model_config = {
+        "frozen": True,
+        "json_schema_extra": {"examples": [{"state": "off"}]},
+    }
 
     state: RelayState = Field(
         description="Desired state for all relay channels"
@@ -90,6 +104,14 @@ class HealthResponse(BaseModel):
     version: str = Field(description="API version")
 
 
+class LivenessResponse(BaseModel):
+    """Liveness probe response."""
+
+    model_config = {"json_schema_extra": {"examples": [{"status": "ok"}]}}
+
+    status: str = Field(description="Always 'ok' while the process serves HTTP")
+
+
 class ErrorResponse(BaseModel):
     """Standard error response body."""
 
@@ -112,13 +134,25 @@ class RelayAllStatus(BaseModel):
                     "channels": [
                         {"channel": 1, "state": "off"},
                         {"channel": 2, "state": "off"},
-                    ]
+                    ],
+                    "version": 7,
+                    "full": True,
                 }
             ]
         }
     }
 
     channels: list[RelayStatus] = Field(description="List of all channel states")
+    version: int | None = Field(
+        default=None,
+        description="State version the channels reflect; pass it back as "
+        "`since_version` to fetch only later changes",
+    )
+    full: bool = Field(
+        default=True,
+        description="False when `channels` holds only the channels changed "
+        "since `since_version`",
+    )
 
 
 class BurnTestRequest(BaseModel):
@@ -178,3 +212,173 @@ class BurnTestStatus(BaseModel):
         default=BurnTestMode.ALL,
         description="Current burn test mode",
     )
+
+
+class SchedulerClassStats(BaseModel):
+    """Device queue-wait statistics for one priority class."""
+
+    priority: CommandPriority = Field(description="Priority class")
+    acquisitions: int = Field(description="Device accesses granted")
+    contended: int = Field(
+        description="Accesses that had to queue behind another command"
+    )
+    queued: int = Field(description="Commands currently waiting")
+    mean_wait_ms: float = Field(description="Mean queue wait per access (ms)")
+    max_wait_ms: float = Field(description="Longest queue wait observed (ms)")
+
+
+class SchedulerStats(BaseModel):
+    """Device command scheduler statistics per priority class."""
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "classes": [
+                        {
+                            "priority": "fail_safe",
+                            "acquisitions": 3,
+                            "contended": 1,
+                            "queued": 0,
+                            "mean_wait_ms": 0.4,
+                            "max_wait_ms": 1.1,
+                        }
+                    ]
+                }
+            ]
+        }
+    }
+
+    classes: list[SchedulerClassStats] = Field(
+        description="Statistics for each priority class, highest first"
+    )
+
+
+class ChannelDebounceStats(BaseModel):
+    """Switch-interval debounce counters for one relay channel."""
+
+    channel: int = Field(ge=1, description="Relay channel number (1-based)")
+    min_switch_ms: int = Field(
+        description="Minimum time the relay stays in a state before switching"
+    )
+    deferred: int = Field(
+        description="Commands held back until the switch window ended"
+    )
+    suppressed: int = Field(
+        description="Device writes avoided by coalescing commands in the window"
+    )
+    pending: RelayState | None = Field(
+        description="State waiting to be applied when the window ends"
+    )
+
+
+class DebounceStats(BaseModel):
+    """Switch-interval debounce counters for all relay channels."""
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "channels": [
+                        {
+                            "channel": 1,
+                            "min_switch_ms": 500,
+                            "deferred": 4,
+                            "suppressed": 9,
+                            "pending": "on",
+                        }
+                    ]
+                }
+            ]
+        }
+    }
+
+    channels: list[ChannelDebounceStats] = Field(
+        description="Counters for each channel"
+    )
+
+
+class LockOperationStats(BaseModel):
+    """Device lock contention accumulated for one operation and source."""
+
+    operation: str = Field(description="Service operation that took the lock")
+    source: str = Field(description="Command source (api, burn_test, pulse, ...)")
+    priority: CommandPriority = Field(description="Priority class last used")
+    acquisitions: int = Field(description="Times the lock was taken")
+    contended: int = Field(description="Acquisitions that had to queue")
+    total_wait_ms: float = Field(description="Total time spent queued (ms)")
+    max_wait_ms: float = Field(description="Longest queue wait (ms)")
+    total_hold_ms: float = Field(description="Total time the lock was held (ms)")
+    max_hold_ms: float = Field(description="Longest hold (ms)")
+    device_io_ms: float = Field(
+        description="Part of the hold time spent in device writes (ms)"
+    )
+    max_queue_depth: int = Field(
+        description="Most commands found already queued when arriving"
+    )
+
+
+class LockHolder(BaseModel):
+    """The operation currently holding the device lock."""
+
+    operation: str = Field(description="Service operation holding the lock")
+    source: str = Field(description="Command source")
+    priority: CommandPriority = Field(description="Priority class")
+    thread: str = Field(description="Name of the holding thread")
+    held_ms: float = Field(description="How long the lock has been held (ms)")
+
+
+class LockProfile(BaseModel):
+    """Device lock contention profile, most contended operations first."""
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "enabled": True,
+                    "queue_depth": 1,
+                    "holder": {
+                        "operation": "set_channel",
+                        "source": "burn_test",
+                        "priority": "background",
+                        "thread": "relay-burn-test",
+                        "held_ms": 0.8,
+                    },
+                    "operations": [
+                        {
+                            "operation": "set_channel",
+                            "source": "api",
+                            "priority": "interactive",
+                            "acquisitions": 120,
+                            "contended": 31,
+                            "total_wait_ms": 48.2,
+                            "max_wait_ms": 3.9,
+                            "total_hold_ms": 130.5,
+                            "max_hold_ms": 4.1,
+                            "device_io_ms": 118.0,
+                            "max_queue_depth": 2,
+                        }
+                    ],
+                }
+            ]
+        }
+    }
+
+    enabled: bool = Field(description="Whether profiling is currently recording")
+    queue_depth: int = Field(description="Commands currently waiting for the lock")
+    holder: LockHolder | None = Field(
+        description="Current lock holder, if profiling is enabled and it is held"
+    )
+    operations: list[LockOperationStats] = Field(
+        description="Per-operation statistics, sorted by total wait, descending"
+    )
+
+
+class LockProfilingUpdate(BaseModel):
+    """Request body to switch lock contention profiling on or off."""
+
+    model_config = {"json_schema_extra": {"examples": [{"enabled": True}]}}
+
+    enabled: bool = Field(
+        description="Start (clearing previous data) or stop recording"
+    )
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app.models.schemas import (
+    CommandPriority,
+    LockHolder,
+    LockOperationStats,
+    LockProfile,
+)
+
+
+class _OperationStats:
+    __slots__ = (
+        "priority",
+        "acquisitions",
+        "contended",
+        "total_wait",
+        "max_wait",
+        "total_hold",
+        "max_hold",
+        "device_io",
+        "max_depth",
+    )
+
+    def __init__(self, priority: CommandPriority) -> None:
+        self.priority = priority
+        self.acquisitions = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_hold = 0.0
+        self.max_hold = 0.0
+        self.device_io = 0.0
+        self.max_depth = 0
+
+
+class _Hold:
+    __slots__ = ("key", "priority", "thread", "start", "device_io")
+
+    def __init__(
+        self, key: tuple[str, str], priority: CommandPriority, start: float
+    ) -> None:
+        self.key = key
+        self.priority = priority
+        self.thread = threading.current_thread().name
+        self.start = start
+        self.device_io = 0.0
+
+
+class ContentionProfiler:
+    """Per-operation device lock accounting, switchable at runtime.
+
+    While enabled, every scheduler slot records which operation took the
+    lock, how long it queued and how deep the queue was on arrival, how
+    long it held the lock and how much of that hold was device I/O.
+    Splitting hold time into device I/O and everything else tells lock
+    contention apart from a slow USB write.  When disabled the only cost
+    is one attribute check per slot.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._operations: dict[tuple[str, str], _OperationStats] = {}
+        self._hold: _Hold | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Start or stop recording; starting clears previous data."""
+        with self._lock:
+            if enabled and not self._enabled:
+                self._operations.clear()
+            if not enabled:
+                self._hold = None
+            self._enabled = enabled
+
+    def acquired(
+        self,
+        operation: str,
+        source: str,
+        priority: CommandPriority,
+        waited: float,
+        queue_depth: int,
+    ) -> None:
+        """Record a lock acquisition.  Caller holds the device lock."""
+        key = (operation, source)
+        hold = _Hold(key, priority, time.perf_counter())
+        with self._lock:
+            if not self._enabled:
+                return
+            stats = self._operations.get(key)
+            if stats is None:
+                stats = self._operations[key] = _OperationStats(priority)
+            stats.priority = priority
+            stats.acquisitions += 1
+            if queue_depth:
+                stats.contended += 1
+            stats.total_wait += waited
+            if waited > stats.max_wait:
+                stats.max_wait = waited
+            if queue_depth > stats.max_depth:
+                stats.max_depth = queue_depth
+            self._hold = hold
+
+    def add_device_io(self, seconds: float) -> None:
+        """Attribute device write time to the current holder."""
+        hold = self._hold
+        if hold is not None:
+            hold.device_io += seconds
+
+    def released(self) -> None:
+        """Record the end of the current hold.  Caller holds the device lock."""
+        now = time.perf_counter()
+        with self._lock:
+            hold, self._hold = self._hold, None
+            if hold is None:
+                return
+            stats = self._operations.get(hold.key)
+            if stats is None:
+                return
+            held = now - hold.start
+            stats.total_hold += held
+            if held > stats.max_hold:
+                stats.max_hold = held
+            stats.device_io += hold.device_io
+
+    def report(self, queue_depth: int, top: int = 10) -> LockProfile:
+        now = time.perf_counter()
+        with self._lock:
+            hold = self._hold
+            holder = (
+                LockHolder(
+                    operation=hold.key[0],
+                    source=hold.key[1],
+                    priority=hold.priority,
+                    thread=hold.thread,
+                    held_ms=(now - hold.start) * 1000.0,
+                )
+                if hold is not None
+                else None
+            )
+            operations = [
+                LockOperationStats(
+                    operation=operation,
+                    source=source,
+                    priority=s.priority,
+                    acquisitions=s.acquisitions,
+                    contended=s.contended,
+                    total_wait_ms=s.total_wait * 1000.0,
+                    max_wait_ms=s.max_wait * 1000.0,
+                    total_hold_ms=s.total_hold * 1000.0,
+                    max_hold_ms=s.max_hold * 1000.0,
+                    device_io_ms=s.device_io * 1000.0,
+                    max_queue_depth=s.max_depth,
+                )
+                for (operation, source), s in self._operations.items()
+            ]
+            enabled = self._enabled
+        operations.sort(key=lambda s: (s.total_wait_ms, s.contended), reverse=True)
+        return LockProfile(
+            enabled=enabled,
+            queue_depth=queue_depth,
+            holder=holder,
+            operations=operations[:top],
+        )
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from types import TracebackType
+
+from app.models.schemas import RelayState
+
+logger = logging.getLogger(__name__)
+
+
+class EventType(str, Enum):
+    CHANNEL_SET = "channel_set"
+    ALL_SET = "all_set"
+    CHANNELS_SET = "channels_set"
+    FAIL_SAFE = "fail_safe"
+    DEVICE_DISCONNECTED = "device_disconnected"
+    PULSE_OFF = "pulse_off"
+    BURN_STARTED = "burn_started"
+    BURN_CYCLE = "burn_cycle"
+    BURN_STOPPED = "burn_stopped"
+    BURN_FINISHED = "burn_finished"
+
+
+@dataclass(frozen=True, slots=True)
+class RelayEvent:
+    """Immutable record of something that happened in ``RelayService``.
+
+    A single instance is shared by every subscriber, so consumers must
+    not (and cannot) mutate it.
+    """
+
+    type: EventType
+    channel: int | None
+    state: RelayState | None
+    version: int
+    timestamp: float
+
+
+class Subscription:
+    """A subscriber's private bounded queue of events.
+
+    When the queue is full the oldest event is discarded and counted in
+    :attr:`dropped`, so a slow consumer never blocks the publisher.
+    """
+
+    def __init__(self, bus: EventBus, maxsize: int):
+        self._bus = bus
+        self._queue: deque[RelayEvent] = deque(maxlen=maxsize)
+        self._ready = threading.Event()
+        self.dropped = 0
+
+    def _offer(self, event: RelayEvent) -> None:
+        queue = self._queue
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append(event)
+        if not self._ready.is_set():
+            self._ready.set()
+
+    def get_nowait(self) -> RelayEvent | None:
+        try:
+            return self._queue.popleft()
+        except IndexError:
+            return None
+
+    def get(self, timeout: float | None = None) -> RelayEvent | None:
+        """Return the next event, waiting up to ``timeout`` seconds."""
+        event = self.get_nowait()
+        if event is not None:
+            return event
+        self._ready.clear()
+        # Re-check after clearing: an event may have landed in between.
+        event = self.get_nowait()
+        if event is not None:
+            return event
+        self._ready.wait(timeout)
+        return self.get_nowait()
+
+    def drain(self) -> list[RelayEvent]:
+        """Return and remove every queued event."""
+        events: list[RelayEvent] = []
+        while (event := self.get_nowait()) is not None:
+            events.append(event)
+        return events
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class EventBus:
+    """In-process pub/sub for relay events.
+
+    Publishing never blocks and takes no lock: the subscriber list is a
+    tuple replaced copy-on-write, and each subscriber owns its queue.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, maxsize: int = 1024) -> Subscription:
+        sub = Subscription(self, maxsize)
+        with self._lock:
+            self._subscribers = (*self._subscribers, sub)
+        logger.debug("Event subscriber added (%d total)", len(self._subscribers))
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+
+    def publish(self, event: RelayEvent) -> None:
+        for sub in self._subscribers:
+            sub._offer(event)
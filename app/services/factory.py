@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+from app.config import settings
+from app.core.device import HIDRelayDevice, MockRelayDevice, RelayDevice
+from app.services.prober import DeviceProber
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+
+def create_device() -> RelayDevice:
+    """Build the configured relay device (mock or HID), not yet open.
+
+    Opening, which for HID means USB enumeration, is left to
+    :func:`start_device` so it never delays startup.
+    """
+    if settings.mock:
+        logger.info("Running in MOCK mode — no real hardware")
+        return MockRelayDevice(channels=settings.relay_channels)
+    return HIDRelayDevice(settings.vendor_id, settings.product_id)
+
+
+def create_relay_service(device: RelayDevice) -> RelayService:
+    """Build the ``RelayService`` for ``device``."""
+    return RelayService(
+        device,
+        channels=settings.relay_channels,
+        pulse_ms=settings.pulse_ms,
+        min_switch_ms=settings.min_switch_ms,
+        min_switch_ms_channels=settings.min_switch_ms_channels,
+        change_log_size=settings.change_log_size,
+        lock_profiling=settings.lock_profiling,
+    )
+
+
+def _open_device(service: RelayService) -> None:
+    try:
+        service.open_device()
+        logger.info("Device connected — %d channels ready", service.channel_count)
+    except Exception:
+        logger.warning(
+            "USB relay device not found — running in disconnected mode. "
+            "Relay endpoints will return 503 until the device is available."
+        )
+
+
+def start_device(service: RelayService) -> threading.Thread:
+    """Open the device and drive every relay OFF on a background thread.
+
+    The server accepts connections meanwhile; relay endpoints answer 503
+    until the device is open.  A missing HID device is not fatal.
+    """
+    thread = threading.Thread(
+        target=_open_device, args=(service,), name="relay-device-open", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def start_prober(service: RelayService) -> DeviceProber | None:
+    """Start the background device prober, unless disabled."""
+    if settings.probe_interval_s <= 0:
+        return None
+    prober = DeviceProber(service, settings.probe_interval_s)
+    prober.start()
+    return prober
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TypeVar, cast
+
+from app.core.exceptions import IdempotencyKeyConflictError
+
+T = TypeVar("T")
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "completed", "result", "expires_at")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.completed = False
+        self.result: object = None
+        self.expires_at = float("inf")
+
+
+class IdempotencyCache:
+    """Bounded LRU cache of recent command results, keyed by idempotency key.
+
+    The first request for a key runs the command; replays within
+    ``ttl_s`` get the cached result without running it again, and
+    concurrent duplicates block until the in-flight result is ready.
+    Failed commands are not cached, so a retry after an error re-runs.
+    Keys are scoped per client, so two clients picking the same key never
+    see each other's results.
+
+    In-flight entries are never evicted, since duplicates may be waiting
+    on them; they can hold the cache above ``max_entries`` only for as
+    long as the requests that own them are running.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._max_entries = max_entries
+        self._ttl_s = ttl_s
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float) -> None:
+        """Drop completed entries from the LRU end while expired or over the cap.
+
+        In-flight entries are skipped, not a reason to stop.
+        """
+        entries = self._entries
+        excess = len(entries) - self._max_entries
+        stale = []
+        for slot, entry in entries.items():
+            if not entry.completed:
+                continue
+            if excess <= 0 and entry.expires_at > now:
+                break
+            stale.append(slot)
+            excess -= 1
+        for slot in stale:
+            del entries[slot]
+
+    def run(
+        self, key: str, fingerprint: str, fn: Callable[[], T], client: str = ""
+    ) -> tuple[T, bool]:
+        """Run ``fn`` at most once per ``(client, key)``.
+
+        Returns ``(result, replayed)``.  Raises
+        :class:`IdempotencyKeyConflictError` if ``key`` was used with a
+        different ``fingerprint``.
+        """
+        slot = (client, key)
+        while True:
+            with self._lock:
+                now = self._clock()
+                entry = self._entries.get(slot)
+                if entry is not None and entry.expires_at <= now:
+                    del self._entries[slot]
+                    entry = None
+                if entry is None:
+                    entry = _Entry(fingerprint)
+                    self._entries[slot] = entry
+                    self._evict(now)
+                    owner = True
+                else:
+                    if entry.fingerprint != fingerprint:
+                        raise IdempotencyKeyConflictError(key)
+                    self._entries.move_to_end(slot)
+                    owner = False
+
+            if owner:
+                return self._execute(slot, entry, fn), False
+
+            entry.done.wait()
+            if entry.completed:
+                return cast(T, entry.result), True
+            # The in-flight attempt failed: retry as the new owner.
+
+    def _execute(
+        self, slot: tuple[str, str], entry: _Entry, fn: Callable[[], T]
+    ) -> T:
+        try:
+            result = fn()
+        except BaseException:
+            with self._lock:
+                if self._entries.get(slot) is entry:
+                    del self._entries[slot]
+            entry.done.set()
+            raise
+        with self._lock:
+            entry.result = result
+            entry.completed = True
+            entry.expires_at = self._clock() + self._ttl_s
+        entry.done.set()
+        return result
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceProber:
+    """Background thread that calls ``RelayService.probe_device`` on an interval.
+
+    Keeps the connection state and cached device strings fresh so health
+    probes and ``/device/info`` are answered from memory, and re-opens a
+    device that was unplugged and plugged back in.
+    """
+
+    def __init__(self, service: RelayService, interval_s: float) -> None:
+        self._service = service
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="relay-device-prober", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            try:
+                self._service.probe_device()
+            except Exception:
+                logger.exception("Device probe failed")
@@ -3,17 +3,36 @@ from __future__ import annotations
 import logging
 import threading
 import time
-from datetime import datetime, timezone
+from collections import deque
+from collections.abc import Iterable, Mapping
 
+from app.core import timing
+from app.core.clock import Clock, SystemClock, Timer
 from app.core.device import RelayDevice
 from app.core.exceptions import InvalidChannelError
+from app.core.metrics import (
+    BURN_CYCLES,
+    DEVICE_CONNECTED,
+    DEVICE_WRITE,
+    DEVICE_WRITE_ERRORS,
+    PULSE_TIMERS,
+    SERVICE_METRICS,
+)
 from app.models.schemas import (
     BurnTestMode,
     BurnTestStatus,
+    ChannelDebounceStats,
+    CommandPriority,
+    DebounceStats,
     DeviceInfo,
+    LockProfile,
     RelayState,
     RelayStatus,
+    SchedulerStats,
 )
+from app.services.contention import ContentionProfiler
+from app.services.events import EventBus, EventType, RelayEvent
+from app.services.scheduler import DeviceScheduler
 
 logger = logging.getLogger(__name__)
 audit_logger = logging.getLogger("relay.audit")
@@ -22,21 +41,63 @@ audit_logger = logging.getLogger("relay.audit")
 class RelayService:
     """Thread-safe orchestration layer for relay operations.
 
-    Manages relay state tracking and serializes device access
-    via a lock to prevent concurrent HID writes.
+    Manages relay state tracking and serializes device access through a
+    priority scheduler to prevent concurrent HID writes: fail-safe OFF
+    commands go ahead of interactive API calls, which go ahead of
+    background work such as burn tests.  Every state change is
+    published on :attr:`events`; ``state_version`` increases whenever
+    the tracked state actually changes.
+
+    ``min_switch_ms`` (optionally overridden per channel) is the minimum
+    time a relay must stay in a state before it switches again.  Single
+    channel commands arriving inside that window are coalesced to the
+    latest requested state and applied when the window ends.
+
+    All timing (pulse and debounce timers, burn-test delays, timestamps)
+    goes through ``clock``; pass a :class:`~app.core.clock.VirtualClock`
+    to simulate long schedules without waiting.
     """
 
     def __init__(
-        self, device: RelayDevice, channels: int, pulse_ms: int = 0,
+        self,
+        device: RelayDevice,
+        channels: int,
+        pulse_ms: int = 0,
+        events: EventBus | None = None,
+        min_switch_ms: int = 0,
+        min_switch_ms_channels: Mapping[int, int] | None = None,
+        change_log_size: int = 1024,
+        lock_profiling: bool = False,
+        clock: Clock | None = None,
     ):
         self._device = device
+        self._clock = clock if clock is not None else SystemClock()
         self._channels = channels
         self._pulse_ms = pulse_ms
-        self._lock = threading.Lock()
+        self._lock = DeviceScheduler(ContentionProfiler(lock_profiling))
         self._states: dict[int, RelayState] = {
             ch: RelayState.OFF for ch in range(1, channels + 1)
         }
-        self._pulse_timers: dict[int, threading.Timer] = {}
+        self._version = 0
+        # (version, channels changed by that version), one entry per bump.
+        self._change_log: deque[tuple[int, tuple[int, ...]]] = deque(
+            maxlen=change_log_size
+        )
+        self._events = events if events is not None else EventBus()
+        self._pulse_timers: dict[int, Timer] = {}
+        overrides = min_switch_ms_channels or {}
+        self._min_switch_s: dict[int, float] = {
+            ch: overrides.get(ch, min_switch_ms) / 1000.0
+            for ch in range(1, channels + 1)
+        }
+        self._last_switch: dict[int, float] = {
+            ch: float("-inf") for ch in range(1, channels + 1)
+        }
+        self._debounce_lock = threading.Lock()
+        self._pending: dict[int, RelayState] = {}
+        self._debounce_timers: dict[int, Timer] = {}
+        self._deferred = {ch: 0 for ch in range(1, channels + 1)}
+        self._suppressed = {ch: 0 for ch in range(1, channels + 1)}
         self._burn_running = False
         self._burn_stop = threading.Event()
         self._burn_cycles_completed = 0
@@ -44,15 +105,73 @@ class RelayService:
         self._burn_errors = 0
         self._burn_mode = BurnTestMode.ALL
         self._burn_thread: threading.Thread | None = None
+        # Device strings are read only at open and by probe_device(), never
+        # per request: each read is a USB transfer competing with writes.
+        self._manufacturer = device.manufacturer
+        self._product = device.product
+
+    def _write(self, channel: int, on: bool) -> None:
+        """One device write, timed and counted in the device metrics."""
+        label = str(channel)
+        start = time.perf_counter()
+        try:
+            self._device.set_channel(channel, on)
+        except Exception:
+            DEVICE_WRITE_ERRORS.inc(label)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            DEVICE_WRITE.observe(elapsed, label)
+            self._lock.profiler.add_device_io(elapsed)
+            timing.record("device", elapsed)
 
     def _validate_channel(self, channel: int) -> None:
         if channel < 1 or channel > self._channels:
             raise InvalidChannelError(channel, self._channels)
 
-    def _audit(self, action: str, channel: int | None, state: RelayState) -> None:
-        ts = datetime.now(timezone.utc).isoformat()
+    def _audit(
+        self,
+        action: str,
+        channel: int | None,
+        state: RelayState,
+        ts: str | None = None,
+    ) -> None:
+        start = time.perf_counter()
+        if ts is None:
+            ts = self._clock.now().isoformat()
         target = f"channel={channel}" if channel else "all"
         audit_logger.info("%s | %s | %s → %s", ts, action, target, state.value)
+        timing.record("audit", time.perf_counter() - start)
+
+    def _publish(
+        self,
+        event_type: EventType,
+        channel: int | None = None,
+        state: RelayState | None = None,
+    ) -> None:
+        """Publish an event; free when nobody is subscribed."""
+        if self._events.has_subscribers:
+            self._events.publish(
+                RelayEvent(
+                    event_type, channel, state, self._version, self._clock.time()
+                )
+            )
+
+    def _commit_states(self, states: Mapping[int, RelayState]) -> None:
+        """Record new channel states as one version step.
+
+        Caller must hold ``_lock``.
+        """
+        changed: list[int] = []
+        now = self._clock.monotonic()
+        for ch, state in states.items():
+            if self._states[ch] != state:
+                self._states[ch] = state
+                self._last_switch[ch] = now
+                changed.append(ch)
+        if changed:
+            self._version += 1
+            self._change_log.append((self._version, tuple(changed)))
 
     def _cancel_pulse_timer(self, channel: int) -> None:
         """Cancel any pending pulse auto-off timer for a channel."""
@@ -61,32 +180,136 @@ class RelayService:
             timer.cancel()
 
     def _pulse_off(self, channel: int) -> None:
-        """Timer callback: turn a channel OFF after a pulse delay."""
-        with self._lock:
+        """Timer callback: turn a channel OFF after a pulse delay.
+
+        Runs at fail-safe priority: it only ever drives a relay OFF and
+        its timing is what makes a pulse a pulse.
+        """
+        with self._lock.slot(CommandPriority.FAIL_SAFE, "pulse", "pulse_off"):
             try:
-                self._device.set_channel(channel, False)
-                self._states[channel] = RelayState.OFF
+                self._write(channel, False)
+                self._commit_states({channel: RelayState.OFF})
                 logger.info("Channel %d pulse OFF (auto)", channel)
+                self._publish(EventType.PULSE_OFF, channel, RelayState.OFF)
             except Exception:
                 logger.exception("Pulse auto-off failed for channel %d", channel)
             finally:
                 self._pulse_timers.pop(channel, None)
         self._audit("pulse_off", channel, RelayState.OFF)
 
-    def set_channel(self, channel: int, state: RelayState) -> RelayStatus:
+    def _debounce(self, channel: int, state: RelayState) -> bool:
+        """Defer or coalesce a command that falls inside the switch window.
+
+        Returns ``True`` if the command was absorbed (nothing to write
+        now), ``False`` if the caller should write immediately.
+        """
+        with self._debounce_lock:
+            if channel in self._pending:
+                # Window still open: this command never writes by itself.
+                self._suppressed[channel] += 1
+                if state == self._states[channel]:
+                    # Flapped back before the window ended: drop the
+                    # pending switch as well.
+                    del self._pending[channel]
+                    self._debounce_timers.pop(channel).cancel()
+                    self._suppressed[channel] += 1
+                else:
+                    self._pending[channel] = state
+                return True
+            if state == self._states[channel]:
+                return False
+            remaining = (
+                self._last_switch[channel]
+                + self._min_switch_s[channel]
+                - self._clock.monotonic()
+            )
+            if remaining <= 0:
+                return False
+            self._pending[channel] = state
+            self._deferred[channel] += 1
+            timer = self._clock.timer(
+                remaining,
+                self._apply_pending,
+                (channel,),
+                name=f"relay-debounce-ch{channel}",
+            )
+            self._debounce_timers[channel] = timer
+            timer.start()
+        logger.info(
+            "Channel %d %s deferred %.0fms (min switch interval)",
+            channel,
+            state.value,
+            remaining * 1000.0,
+        )
+        return True
+
+    def _apply_pending(self, channel: int) -> None:
+        """Timer callback: apply the coalesced command when the window ends."""
+        with self._debounce_lock:
+            state = self._pending.pop(channel, None)
+            self._debounce_timers.pop(channel, None)
+        if state is None:
+            return
+        try:
+            self._switch(channel, state, CommandPriority.INTERACTIVE, "debounce")
+        except Exception:
+            logger.exception("Deferred switch failed for channel %d", channel)
+
+    def _cancel_pending(self, channels: Iterable[int] | None = None) -> None:
+        """Drop deferred commands (for ``channels``, default all).
+
+        Bulk and fail-safe writes supersede them.
+        """
+        with self._debounce_lock:
+            if channels is None:
+                channels = list(self._debounce_timers)
+            for channel in channels:
+                timer = self._debounce_timers.pop(channel, None)
+                if timer is not None:
+                    timer.cancel()
+                    self._suppressed[channel] += 1
+                    del self._pending[channel]
+
+    def set_channel(
+        self,
+        channel: int,
+        state: RelayState,
+        priority: CommandPriority = CommandPriority.INTERACTIVE,
+        source: str = "api",
+    ) -> RelayStatus:
+        """Switch a single channel.
+
+        If the command falls inside the channel's minimum switch interval
+        it is deferred, and the returned status is the state the relay is
+        actually in right now.
+        """
         self._validate_channel(channel)
+        if self._min_switch_s[channel] > 0 and self._debounce(channel, state):
+            return RelayStatus(channel=channel, state=self._states[channel])
+        return self._switch(channel, state, priority, source)
+
+    def _switch(
+        self,
+        channel: int,
+        state: RelayState,
+        priority: CommandPriority,
+        source: str,
+    ) -> RelayStatus:
         on = state == RelayState.ON
         self._cancel_pulse_timer(channel)
-        with self._lock:
-            self._device.set_channel(channel, on)
-            self._states[channel] = state
+        with self._lock.slot(priority, source, "set_channel"):
+            self._write(channel, on)
+            self._commit_states({channel: state})
             logger.info("Channel %d set to %s", channel, state.value)
+            self._publish(EventType.CHANNEL_SET, channel, state)
         self._audit("set_channel", channel, state)
         if on and self._pulse_ms > 0:
-            timer = threading.Timer(
-                self._pulse_ms / 1000.0, self._pulse_off, args=(channel,),
+            timer = self._clock.timer(
+                self._pulse_ms / 1000.0,
+                self._pulse_off,
+                (channel,),
+                name=f"relay-pulse-ch{channel}",
             )
-            timer.daemon = True
             self._pulse_timers[channel] = timer
             timer.start()
         return RelayStatus(channel=channel, state=state)
@@ -106,56 +329,234 @@ class RelayService:
 
         On partial failure, rolls back successfully-set channels to their
         previous state (best-effort) and re-raises the original exception.
+        Bulk OFF is the emergency shutoff and runs at fail-safe priority.
         """
-        on = state == RelayState.ON
-        with self._lock:
+        self._write_bulk(
+            dict.fromkeys(self._states, state), EventType.ALL_SET, "set_all_channels"
+        )
+        self._audit("set_all_channels", None, state)
+        return self.get_all_channels()
+
+    def set_channels(self, states: Mapping[int, RelayState]) -> list[RelayStatus]:
+        """Set several channels, each to its own state, in one bulk write.
+
+        Same atomicity as :meth:`set_all_channels`: all writes succeed or
+        the written channels are rolled back and the error re-raised.
+        """
+        for channel in states:
+            self._validate_channel(channel)
+        self._write_bulk(dict(states), EventType.CHANNELS_SET, "set_channels")
+        # One timestamp for the whole write: replay merges records by it.
+        ts = self._clock.now().isoformat()
+        for channel, state in states.items():
+            self._audit("set_channels", channel, state, ts)
+        return self.get_all_channels()
+
+    def _write_bulk(
+        self, target: dict[int, RelayState], event_type: EventType, operation: str
+    ) -> None:
+        """Write ``target`` to the device under one scheduler slot.
+
+        A write that only turns relays OFF runs at fail-safe priority.
+        Bulk writes supersede deferred commands for the same channels.
+        """
+        priority = (
+            CommandPriority.FAIL_SAFE
+            if all(s == RelayState.OFF for s in target.values())
+            else CommandPriority.INTERACTIVE
+        )
+        self._cancel_pending(target)
+        with self._lock.slot(priority, "api", operation):
             previous = dict(self._states)
             completed: list[int] = []
             try:
-                for ch in range(1, self._channels + 1):
-                    self._device.set_channel(ch, on)
-                    self._states[ch] = state
+                for ch, state in target.items():
+                    self._write(ch, state == RelayState.ON)
                     completed.append(ch)
             except Exception:
                 for ch in completed:
                     try:
-                        self._device.set_channel(
+                        self._write(
                             ch, previous[ch] == RelayState.ON
                         )
                     except Exception:
                         logger.exception(
                             "Rollback failed for channel %d", ch
                         )
-                    self._states[ch] = previous[ch]
                 raise
-            logger.info("All channels set to %s", state.value)
-        self._audit("set_all_channels", None, state)
-        return self.get_all_channels()
+            self._commit_states(target)
+            states = set(target.values())
+            common = states.pop() if len(states) == 1 else None
+            if len(target) == self._channels and common is not None:
+                logger.info("All channels set to %s", common.value)
+            else:
+                logger.info(
+                    "Channels set: %s",
+                    ", ".join(f"{ch}={s.value}" for ch, s in target.items()),
+                )
+            self._publish(event_type, None, common)
 
     def all_off(self) -> None:
         """Fail-safe: turn all channels OFF."""
-        with self._lock:
-            for ch in range(1, self._channels + 1):
+        self._cancel_pending()
+        with self._lock.slot(CommandPriority.FAIL_SAFE, "fail_safe", "all_off"):
+            self._all_off_locked()
+        self._audit("fail_safe", None, RelayState.OFF)
+
+    def open_device(self) -> None:
+        """Open the device and drive every relay OFF in one fail-safe slot.
+
+        Meant to run in the background at startup: until the device is
+        open, relay endpoints answer 503, and no command can reach the
+        device between the open and the fail-safe OFF.  Raises if the
+        device cannot be opened.
+        """
+        self._cancel_pending()
+        with self._lock.slot(CommandPriority.FAIL_SAFE, "startup", "open_device"):
+            self._device.open()
+            self._all_off_locked()
+            self._refresh_device_strings()
+        self._audit("fail_safe", None, RelayState.OFF)
+
+    def close_device(self) -> None:
+        """Fail-safe shutdown: drive every relay OFF, then close the device."""
+        self._cancel_pending()
+        with self._lock.slot(CommandPriority.FAIL_SAFE, "shutdown", "close_device"):
+            if not self._device.is_open:
+                return
+            self._all_off_locked()
+            self._device.close()
+            self._refresh_device_strings()
+        self._audit("fail_safe", None, RelayState.OFF)
+
+    def probe_device(self) -> bool:
+        """Check the device and refresh the cached device strings.
+
+        Runs at background priority, so it never delays relay commands.
+        A device that stops answering is closed, after which relay
+        endpoints answer 503; a closed device is re-opened and driven
+        OFF.  Returns whether the device is connected afterwards.
+        """
+        with self._lock.slot(CommandPriority.BACKGROUND, "prober", "probe_device"):
+            if self._device.is_open:
                 try:
-                    self._device.set_channel(ch, False)
+                    self._refresh_device_strings()
+                    return True
                 except Exception:
-                    logger.exception("Fail-safe OFF failed for channel %d", ch)
-                self._states[ch] = RelayState.OFF
-            logger.info("Fail-safe: all channels OFF")
+                    logger.warning(
+                        "Relay device stopped responding — closing it", exc_info=True
+                    )
+                    try:
+                        self._device.close()
+                    except Exception:
+                        logger.debug("Closing device failed", exc_info=True)
+                    self._manufacturer = self._product = "Unknown"
+                    self._publish(EventType.DEVICE_DISCONNECTED)
+                    return False
+            try:
+                self._device.open()
+            except Exception:
+                return False
+            logger.info("Relay device reconnected")
+            self._all_off_locked()
+            self._refresh_device_strings()
         self._audit("fail_safe", None, RelayState.OFF)
+        return True
+
+    def _refresh_device_strings(self) -> None:
+        """Re-read device strings over USB.  Caller must hold ``_lock``."""
+        self._manufacturer = self._device.manufacturer
+        self._product = self._device.product
+
+    def _all_off_locked(self) -> None:
+        """Write OFF to every channel.  Caller must hold ``_lock``."""
+        for ch in range(1, self._channels + 1):
+            try:
+                self._write(ch, False)
+            except Exception:
+                logger.exception("Fail-safe OFF failed for channel %d", ch)
+        self._commit_states(dict.fromkeys(self._states, RelayState.OFF))
+        logger.info("Fail-safe: all channels OFF")
+        self._publish(EventType.FAIL_SAFE, None, RelayState.OFF)
 
     @property
     def channel_count(self) -> int:
         return self._channels
 
+    def get_scheduler_stats(self) -> SchedulerStats:
+        return self._lock.stats()
+
+    def get_lock_profile(self, top: int = 10) -> LockProfile:
+        """Most contended device lock operations and the current holder."""
+        return self._lock.contention_profile(top)
+
+    def set_lock_profiling(self, enabled: bool) -> LockProfile:
+        """Switch lock contention profiling on (clearing old data) or off."""
+        self._lock.profiler.set_enabled(enabled)
+        return self.get_lock_profile()
+
+    def get_debounce_stats(self) -> DebounceStats:
+        with self._debounce_lock:
+            return DebounceStats(
+                channels=[
+                    ChannelDebounceStats(
+                        channel=ch,
+                        min_switch_ms=round(self._min_switch_s[ch] * 1000.0),
+                        deferred=self._deferred[ch],
+                        suppressed=self._suppressed[ch],
+                        pending=self._pending.get(ch),
+                    )
+                    for ch in range(1, self._channels + 1)
+                ]
+            )
+
+    @property
+    def state_version(self) -> int:
+        return self._version
+
+    def changed_since(self, version: int) -> list[int] | None:
+        """Channels whose state changed after ``version``, ascending.
+
+        Returns ``None`` when the answer is unknown — ``version`` is older
+        than the bounded change log, or newer than the current version
+        (e.g. issued before a restart) — and the caller must resync from a
+        full read.
+        """
+        current = self._version
+        log = list(self._change_log)  # atomic copy; writers append concurrently
+        if version > current:
+            return None
+        if version == current:
+            return []
+        # Versions are consecutive, so the log covers everything after
+        # the version just before its oldest entry.
+        if not log or version < log[0][0] - 1:
+            return None
+        changed: set[int] = set()
+        for entry_version, channels in log:
+            if entry_version > version:
+                changed.update(channels)
+        return sorted(changed)
+
+    @property
+    def events(self) -> EventBus:
+        return self._events
+
     @property
     def is_device_connected(self) -> bool:
         return self._device.is_open
 
+    def render_metrics(self) -> str:
+        """Prometheus text for the service and device metrics."""
+        PULSE_TIMERS.set(len(self._pulse_timers))
+        DEVICE_CONNECTED.set(1 if self.is_device_connected else 0)
+        return SERVICE_METRICS.render()
+
     def get_device_info(self) -> DeviceInfo:
+        """Device information from the cached device strings (no USB I/O)."""
         return DeviceInfo(
-            manufacturer=self._device.manufacturer,
-            product=self._device.product,
+            manufacturer=self._manufacturer,
+            product=self._product,
             channels=self._channels,
             connected=self._device.is_open,
         )
@@ -175,11 +576,12 @@ class RelayService:
         self._burn_errors = 0
         self._burn_mode = mode
         self._burn_running = True
+        self._publish(EventType.BURN_STARTED)
 
-        self._burn_thread = threading.Thread(
-            target=self._burn_test_loop,
-            args=(cycles, delay_ms / 1000.0, mode),
-            daemon=True,
+        self._burn_thread = self._clock.thread(
+            self._burn_test_loop,
+            (cycles, delay_ms / 1000.0, mode),
+            name="relay-burn-test",
         )
         self._burn_thread.start()
         logger.info(
@@ -205,6 +607,7 @@ class RelayService:
             "Burn test stopped after %d cycles", self._burn_cycles_completed
         )
         self._audit("burn_test_stop", None, RelayState.OFF)
+        self._publish(EventType.BURN_STOPPED)
         return self.get_burn_test_status()
 
     def get_burn_test_status(self) -> BurnTestStatus:
@@ -234,6 +637,12 @@ class RelayService:
                 self._burn_cycles_completed,
                 self._burn_errors,
             )
+            self._publish(EventType.BURN_FINISHED)
+
+    def _burn_write(self, channel: int, state: RelayState) -> None:
+        self.set_channel(
+            channel, state, priority=CommandPriority.BACKGROUND, source="burn_test"
+        )
 
     def _burn_loop_all(self, cycles: int, delay_s: float) -> None:
         """All channels ON together, then all OFF together."""
@@ -247,12 +656,12 @@ class RelayService:
                 if self._burn_stop.is_set():
                     return
                 try:
-                    self.set_channel(ch, RelayState.ON)
+                    self._burn_write(ch, RelayState.ON)
                 except Exception:
                     self._burn_errors += 1
                     logger.exception("Burn test error on channel %d ON", ch)
 
-            if self._burn_stop.wait(delay_s):
+            if self._clock.wait(self._burn_stop, delay_s):
                 return
 
             # OFF phase
@@ -260,16 +669,18 @@ class RelayService:
                 if self._burn_stop.is_set():
                     return
                 try:
-                    self.set_channel(ch, RelayState.OFF)
+                    self._burn_write(ch, RelayState.OFF)
                 except Exception:
                     self._burn_errors += 1
                     logger.exception("Burn test error on channel %d OFF", ch)
 
-            if self._burn_stop.wait(delay_s):
+            if self._clock.wait(self._burn_stop, delay_s):
                 return
 
             cycle += 1
             self._burn_cycles_completed = cycle
+            BURN_CYCLES.inc()
+            self._publish(EventType.BURN_CYCLE)
 
     def _burn_loop_alternate(self, cycles: int, delay_s: float) -> None:
         """Relay 1 ON / Relay 2 OFF, then swap. Alternating switch test."""
@@ -280,33 +691,35 @@ class RelayService:
 
             # Phase A: relay 1 ON, relay 2 OFF
             try:
-                self.set_channel(1, RelayState.ON)
+                self._burn_write(1, RelayState.ON)
             except Exception:
                 self._burn_errors += 1
                 logger.exception("Burn test alternate error: ch1 ON")
             try:
-                self.set_channel(2, RelayState.OFF)
+                self._burn_write(2, RelayState.OFF)
             except Exception:
                 self._burn_errors += 1
                 logger.exception("Burn test alternate error: ch2 OFF")
 
-            if self._burn_stop.wait(delay_s):
+            if self._clock.wait(self._burn_stop, delay_s):
                 return
 
             # Phase B: relay 1 OFF, relay 2 ON
             try:
-                self.set_channel(1, RelayState.OFF)
+                self._burn_write(1, RelayState.OFF)
             except Exception:
                 self._burn_errors += 1
                 logger.exception("Burn test alternate error: ch1 OFF")
             try:
-                self.set_channel(2, RelayState.ON)
+                self._burn_write(2, RelayState.ON)
             except Exception:
                 self._burn_errors += 1
                 logger.exception("Burn test alternate error: ch2 ON")
 
-            if self._burn_stop.wait(delay_s):
+            if self._clock.wait(self._burn_stop, delay_s):
                 return
 
             cycle += 1
             self._burn_cycles_completed = cycle
+            BURN_CYCLES.inc()
+            self._publish(EventType.BURN_CYCLE)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from app.core import timing
+from app.core.metrics import LOCK_HOLD, LOCK_WAIT
+from app.models.schemas import (
+    CommandPriority,
+    LockProfile,
+    SchedulerClassStats,
+    SchedulerStats,
+)
+from app.services.contention import ContentionProfiler
+
+# Highest priority first; the index is the class rank.
+_CLASSES = (
+    CommandPriority.FAIL_SAFE,
+    CommandPriority.INTERACTIVE,
+    CommandPriority.BACKGROUND,
+)
+_RANK = {priority: rank for rank, priority in enumerate(_CLASSES)}
+
+
+class _ClassStats:
+    __slots__ = ("acquisitions", "contended", "queued", "total_wait", "max_wait")
+
+    def __init__(self) -> None:
+        self.acquisitions = 0
+        self.contended = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class DeviceScheduler:
+    """Mutual-exclusion lock for device access with priority classes.
+
+    Drop-in replacement for the plain device lock.  When the device is
+    busy, waiters queue per priority class and ownership is handed
+    directly to the next waiter on release: always the highest non-empty
+    class, round-robin across ``source`` names within a class.  A
+    fail-safe OFF therefore waits at most for the single command
+    currently holding the device, never for queued background writes.
+
+    Slots report to :attr:`profiler`, which records per-operation
+    contention while it is enabled.
+    """
+
+    def __init__(self, profiler: ContentionProfiler | None = None) -> None:
+        self._mutex = threading.Lock()
+        self._held = False
+        self._waiting = 0
+        self._queues: list[OrderedDict[str, deque[threading.Event]]] = [
+            OrderedDict() for _ in _CLASSES
+        ]
+        self._stats = [_ClassStats() for _ in _CLASSES]
+        self.profiler = profiler if profiler is not None else ContentionProfiler()
+
+    def acquire(
+        self,
+        priority: CommandPriority = CommandPriority.INTERACTIVE,
+        source: str = "default",
+    ) -> None:
+        self._acquire(priority, source)
+
+    def _acquire(
+        self, priority: CommandPriority, source: str
+    ) -> tuple[float, int]:
+        """Take the lock; returns the wait and the queue depth on arrival."""
+        rank = _RANK[priority]
+        stats = self._stats[rank]
+        with self._mutex:
+            if not self._held and not self._waiting:
+                self._held = True
+                stats.acquisitions += 1
+                grant = None
+            else:
+                depth = self._waiting
+                grant = threading.Event()
+                self._queues[rank].setdefault(source, deque()).append(grant)
+                self._waiting += 1
+                stats.queued += 1
+        if grant is None:
+            LOCK_WAIT.observe(0.0, priority.value)
+            return 0.0, 0
+        start = time.perf_counter()
+        grant.wait()
+        waited = time.perf_counter() - start
+        LOCK_WAIT.observe(waited, priority.value)
+        with self._mutex:
+            stats.acquisitions += 1
+            stats.contended += 1
+            stats.total_wait += waited
+            if waited > stats.max_wait:
+                stats.max_wait = waited
+        # Count the holder too: a command that finds the lock held queues
+        # behind at least one other.
+        return waited, depth + 1
+
+    def release(self) -> None:
+        with self._mutex:
+            for rank, sources in enumerate(self._queues):
+                if not sources:
+                    continue
+                source, waiters = next(iter(sources.items()))
+                grant = waiters.popleft()
+                if waiters:
+                    sources.move_to_end(source)
+                else:
+                    del sources[source]
+                self._waiting -= 1
+                self._stats[rank].queued -= 1
+                # Ownership passes straight to the waiter; _held stays True.
+                grant.set()
+                return
+            self._held = False
+
+    @contextmanager
+    def slot(
+        self,
+        priority: CommandPriority = CommandPriority.INTERACTIVE,
+        source: str = "default",
+        operation: str = "",
+    ) -> Iterator[None]:
+        """Hold the device for the duration of a ``with`` block.
+
+        ``operation`` names the work done under the lock for the
+        contention profiler; it defaults to ``source``.
+        """
+        waited, depth = self._acquire(priority, source)
+        timing.record("lock", waited)
+        profiler = self.profiler
+        profiling = profiler.enabled
+        if profiling:
+            profiler.acquired(operation or source, source, priority, waited, depth)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            LOCK_HOLD.observe(time.perf_counter() - start, priority.value)
+            if profiling:
+                profiler.released()
+            self.release()
+
+    def contention_profile(self, top: int = 10) -> LockProfile:
+        return self.profiler.report(self._waiting, top)
+
+    def stats(self) -> SchedulerStats:
+        with self._mutex:
+            return SchedulerStats(
+                classes=[
+                    SchedulerClassStats(
+                        priority=priority,
+                        acquisitions=s.acquisitions,
+                        contended=s.contended,
+                        queued=s.queued,
+                        mean_wait_ms=(
+                            s.total_wait / s.acquisitions * 1000.0
+                            if s.acquisitions
+                            else 0.0
+                        ),
+                        max_wait_ms=s.max_wait * 1000.0,
+                    )
+                    for priority, s in zip(_CLASSES, self._stats)
+                ]
+            )
@@ -0,0 +1,5 @@
+"""Performance benchmarks for the relay API.
+
+Run individual benchmarks as modules from the repository root, e.g.
+``python -m benchmarks.bench_websocket``.
+"""
@@ -0,0 +1,104 @@
+"""Throughput of the pure ASGI middleware stack vs ``BaseHTTPMiddleware``.
+
+Both stacks rate-limit every request and require an API key.  The
+``before`` stack wraps the limiter in ``BaseHTTPMiddleware`` and rejects
+bad keys in the route dependency; the ``after`` stack is the app's
+current pure ASGI rate limiter and auth middleware::
+
+    python -m benchmarks.bench_middleware
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI, Request, Response
+from httpx import ASGITransport, AsyncClient
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.types import ASGIApp
+
+from app.api.dependencies import init_relay_service
+from app.api.v1.relays import router as relays_router
+from app.config import settings
+from app.core.device import MockRelayDevice
+from app.middleware import (
+    APIKeyAuthMiddleware,
+    RateLimitMiddleware,
+    SlidingWindowRateLimiter,
+    client_key,
+    route_cost,
+)
+from app.services.relay_service import RelayService
+
+API_KEY = "bench-key"
+
+
+class _BaseHTTPRateLimit(BaseHTTPMiddleware):
+    """The rate limiter as it ran on ``BaseHTTPMiddleware``."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app)
+        self._limiter = SlidingWindowRateLimiter(settings.rate_limit)
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        retry_after = self._limiter.hit(
+            client_key(request.scope, settings.rate_limit_key),
+            route_cost(request.method, request.url.path, settings.rate_limit_costs),
+        )
+        if retry_after is not None:
+            return Response(status_code=429, headers={"Retry-After": str(retry_after)})
+        return await call_next(request)
+
+
+def _app(asgi: bool) -> FastAPI:
+    bench = FastAPI()
+    if asgi:
+        bench.add_middleware(APIKeyAuthMiddleware)
+        bench.add_middleware(RateLimitMiddleware)
+    else:
+        bench.add_middleware(_BaseHTTPRateLimit)
+    bench.include_router(relays_router, prefix="/api/v1")
+    return bench
+
+
+async def _rate(target: FastAPI, requests: int, key: str) -> float:
+    transport = ASGITransport(app=target)
+    headers = {"X-API-Key": key}
+    async with AsyncClient(
+        transport=transport, base_url="http://bench", headers=headers
+    ) as client:
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/api/v1/relays")
+        return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    settings.api_key = API_KEY
+    settings.rate_limit = 10 * args.requests
+    device = MockRelayDevice(channels=8)
+    device.open()
+    init_relay_service(RelayService(device, channels=8))
+
+    print(f"GET /api/v1/relays throughput ({args.requests} requests, in-process):")
+    for name, key in (("authorized", API_KEY), ("rejected (401)", "wrong")):
+        before = asyncio.run(_rate(_app(asgi=False), args.requests, key))
+        after = asyncio.run(_rate(_app(asgi=True), args.requests, key))
+        print(
+            f"  {name:<16} before {before:8.0f}/s  after {after:8.0f}/s"
+            f"  ({after / before:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
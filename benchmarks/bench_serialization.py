@@ -0,0 +1,128 @@
+"""Microbenchmarks for the relay response/request fast path.
+
+Compares the generic FastAPI pipeline (pydantic models, response-model
+validation, ``jsonable_encoder``) with ``app.api.fastpath``, first per
+operation and then as end-to-end request throughput::
+
+    python -m benchmarks.bench_serialization
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+import timeit
+from collections.abc import Callable
+
+from fastapi import Depends, FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.api.dependencies import (
+    get_relay_service,
+    init_relay_service,
+    require_device,
+)
+from app.api.fastpath import parse_relay_command, state_response_cache
+from app.api.v1.relays import router as relays_router
+from app.core.device import MockRelayDevice
+from app.models.schemas import RelayAllStatus, RelayCommand, RelayStatus
+from app.services.relay_service import RelayService
+
+
+def _per_op_us(fn: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def _classic_app() -> FastAPI:
+    """The relay GET/PUT handlers as written before the fast path."""
+    classic = FastAPI()
+
+    @classic.get("/api/v1/relays", response_model=RelayAllStatus)
+    def get_all_relays(
+        service: RelayService = Depends(get_relay_service),
+    ) -> RelayAllStatus:
+        return RelayAllStatus(channels=service.get_all_channels())
+
+    @classic.put("/api/v1/relays/{channel}", response_model=RelayStatus)
+    def set_relay(
+        command: RelayCommand,
+        channel: int,
+        service: RelayService = Depends(require_device),
+    ) -> RelayStatus:
+        return service.set_channel(channel, command.state)
+
+    return classic
+
+
+def _fast_app() -> FastAPI:
+    """The current relay router, without unrelated middleware."""
+    fast = FastAPI()
+    fast.include_router(relays_router, prefix="/api/v1")
+    return fast
+
+
+async def _throughput(target: FastAPI, requests: int) -> tuple[float, float]:
+    transport = ASGITransport(app=target)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/api/v1/relays")
+        get_rate = requests / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.put(
+                "/api/v1/relays/1", json={"state": "on" if i % 2 == 0 else "off"}
+            )
+        put_rate = requests / (time.perf_counter() - start)
+    return get_rate, put_rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    device = MockRelayDevice(channels=args.channels)
+    device.open()
+    service = RelayService(device, channels=args.channels)
+    init_relay_service(service)
+    body = b'{"state":"on"}'
+
+    print(f"Per operation ({args.channels} channels), best of 5:")
+    ops: list[tuple[str, Callable[[], object], Callable[[], object]]] = [
+        (
+            "GET /relays body",
+            lambda: JSONResponse(
+                jsonable_encoder(
+                    RelayAllStatus(channels=service.get_all_channels())
+                )
+            ).body,
+            lambda: state_response_cache.render_all(service),
+        ),
+        (
+            "RelayCommand parse",
+            lambda: RelayCommand.model_validate_json(body),
+            lambda: parse_relay_command(body),
+        ),
+    ]
+    for name, before, after in ops:
+        b = _per_op_us(before, args.number)
+        a = _per_op_us(after, args.number)
+        print(f"  {name:<20} before {b:8.2f}us  after {a:8.2f}us  ({b / a:.1f}x)")
+
+    print(f"Request throughput ({args.requests} requests, in-process):")
+    before_get, before_put = asyncio.run(_throughput(_classic_app(), args.requests))
+    after_get, after_put = asyncio.run(_throughput(_fast_app(), args.requests))
+    print(f"  GET /relays          before {before_get:8.0f}/s  after {after_get:8.0f}/s")
+    print(f"  PUT /relays/1        before {before_put:8.0f}/s  after {after_put:8.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
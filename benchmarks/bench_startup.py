@@ -0,0 +1,142 @@
+"""Startup time: interpreter start to first HTTP response.
+
+Launches the server as a fresh process against a mock device and polls
+``/health`` until it answers (first response) and until it reports the
+device connected (device ready).  ``--open-delay-ms`` makes the mock
+device's ``open`` sleep to simulate slow USB enumeration; with the device
+opened in the background the first response should not move::
+
+    python -m benchmarks.bench_startup --runs 5 --open-delay-ms 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# Runs in the child: optionally slow down the mock open, then serve.
+_SERVER = """
+import sys, time
+import uvicorn
+from app.core.device import MockRelayDevice
+
+delay_s = float(sys.argv[2])
+if delay_s:
+    _open = MockRelayDevice.open
+
+    def slow_open(self):
+        time.sleep(delay_s)
+        _open(self)
+
+    MockRelayDevice.open = slow_open
+uvicorn.run(
+    "app.main:app", host="127.0.0.1", port=int(sys.argv[1]), log_level="warning"
+)
+"""
+
+_IMPORT = """
+import time
+start = time.perf_counter()
+import app.main
+print(time.perf_counter() - start)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _health(port: int) -> dict[str, object] | None:
+    try:
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{port}/health", timeout=0.5
+        ) as resp:
+            body: dict[str, object] = json.load(resp)
+            return body
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def _run_once(delay_s: float, timeout_s: float = 30.0) -> tuple[float, float]:
+    """Seconds from process spawn to first response and to device ready."""
+    port = _free_port()
+    env = {**os.environ, "RELAY_MOCK": "true"}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _SERVER, str(port), str(delay_s)],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    first = ready = 0.0
+    try:
+        while time.perf_counter() - start < timeout_s:
+            body = _health(port)
+            now = time.perf_counter() - start
+            if body is not None:
+                first = first or now
+                if body.get("device_connected"):
+                    ready = now
+                    break
+            time.sleep(0.005)
+        else:
+            raise SystemExit("Server did not become ready in time")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10.0)
+    return first, ready
+
+
+def _import_time() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _IMPORT],
+        env={**os.environ, "RELAY_MOCK": "true"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--open-delay-ms",
+        type=int,
+        default=0,
+        help="Simulated device open (USB enumeration) time",
+    )
+    args = parser.parse_args()
+
+    imports = [_import_time() for _ in range(args.runs)]
+    runs = [_run_once(args.open_delay_ms / 1000.0) for _ in range(args.runs)]
+    first = [r[0] for r in runs]
+    ready = [r[1] for r in runs]
+
+    print(
+        f"Startup ({args.runs} runs, mock device, "
+        f"open delay {args.open_delay_ms}ms), median / min:"
+    )
+    for name, samples in (
+        ("import app.main", imports),
+        ("first response", first),
+        ("device ready", ready),
+    ):
+        print(
+            f"  {name:<16} {statistics.median(samples) * 1000:8.1f} ms"
+            f"  {min(samples) * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
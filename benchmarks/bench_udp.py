@@ -0,0 +1,127 @@
+"""Loopback command latency: REST ``PUT`` vs the UDP command listener.
+
+Starts the server as a separate process against a mock device with the
+UDP listener enabled, then times lockstep commands (send, wait for the
+response or ack) over real loopback sockets.  REST reuses one keep-alive
+connection, so the comparison is per-command cost, not connection setup::
+
+    python -m benchmarks.bench_udp --commands 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+
+from app.frontends.udp import Status, UDPRelayClient
+from app.models.schemas import RelayState
+
+_KEY = "bench-key"
+
+
+def _free_port(kind: int) -> int:
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def _start_server(http_port: int, udp_port: int) -> subprocess.Popen[bytes]:
+    env = {
+        **os.environ,
+        "RELAY_MOCK": "true",
+        "RELAY_API_KEY": "",
+        "RELAY_PULSE_MS": "0",
+        "RELAY_UDP_PORT": str(udp_port),
+        "RELAY_UDP_KEY": _KEY,
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(http_port)],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30.0
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", http_port, timeout=1.0)
+            conn.request("GET", "/health")
+            if json.loads(conn.getresponse().read()).get("device_connected"):
+                return proc
+        except (ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    proc.terminate()
+    raise SystemExit("Server did not become ready in time")
+
+
+def _states(n: int) -> list[RelayState]:
+    return [RelayState.ON if i % 2 == 0 else RelayState.OFF for i in range(n)]
+
+
+def bench_rest(http_port: int, n: int) -> list[float]:
+    conn = http.client.HTTPConnection("127.0.0.1", http_port)
+    headers = {"Content-Type": "application/json"}
+    samples = []
+    for state in _states(n):
+        body = json.dumps({"state": state.value})
+        start = time.perf_counter()
+        conn.request("PUT", "/api/v1/relays/1", body, headers)
+        resp = conn.getresponse()
+        resp.read()
+        samples.append(time.perf_counter() - start)
+        assert resp.status == 200
+    conn.close()
+    return samples
+
+
+def bench_udp(udp_port: int, n: int) -> list[float]:
+    samples = []
+    with UDPRelayClient("127.0.0.1", udp_port, _KEY) as client:
+        for state in _states(n):
+            start = time.perf_counter()
+            ack = client.set_channel(1, state)
+            samples.append(time.perf_counter() - start)
+            assert ack.status == Status.OK
+    return samples
+
+
+def _report(name: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<10} median {statistics.median(ordered) * 1e6:8.1f} us"
+        f"   p99 {p99 * 1e6:8.1f} us"
+        f"   {len(samples) / sum(samples):8.0f} commands/sec"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=2000)
+    args = parser.parse_args()
+
+    http_port = _free_port(socket.SOCK_STREAM)
+    udp_port = _free_port(socket.SOCK_DGRAM)
+    proc = _start_server(http_port, udp_port)
+    benches: list[tuple[str, Callable[[], list[float]]]] = [
+        ("REST PUT", lambda: bench_rest(http_port, args.commands)),
+        ("UDP", lambda: bench_udp(udp_port, args.commands)),
+    ]
+    try:
+        for name, bench in benches:
+            bench()  # warm-up
+            _report(name, bench())
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare relay command throughput: REST ``PUT`` vs the WebSocket channel.
+
+Runs fully in-process against a mock device so the numbers isolate
+per-command framework overhead from USB latency::
+
+    python -m benchmarks.bench_websocket --commands 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import init_relay_service
+from app.core.device import MockRelayDevice
+from app.main import app
+from app.services.relay_service import RelayService
+
+
+def _states(n: int) -> list[str]:
+    return ["on" if i % 2 == 0 else "off" for i in range(n)]
+
+
+def bench_rest(client: TestClient, n: int) -> float:
+    start = time.perf_counter()
+    for state in _states(n):
+        resp = client.put("/api/v1/relays/1", json={"state": state})
+        assert resp.status_code == 200
+    return n / (time.perf_counter() - start)
+
+
+def bench_ws_lockstep(client: TestClient, n: int) -> float:
+    with client.websocket_connect("/api/v1/relays/ws") as ws:
+        start = time.perf_counter()
+        for i, state in enumerate(_states(n)):
+            ws.send_json({"id": i, "op": "set", "ch": 1, "state": state})
+            assert ws.receive_json()["ok"]
+        return n / (time.perf_counter() - start)
+
+
+def bench_ws_pipelined(client: TestClient, n: int) -> float:
+    with client.websocket_connect("/api/v1/relays/ws") as ws:
+        start = time.perf_counter()
+        for i, state in enumerate(_states(n)):
+            ws.send_json({"id": i, "op": "set", "ch": 1, "state": state})
+        for _ in range(n):
+            assert ws.receive_json()["ok"]
+        return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    device = MockRelayDevice(channels=2)
+    device.open()
+    init_relay_service(RelayService(device, channels=2))
+    client = TestClient(app)
+
+    for name, bench in (
+        ("REST PUT", bench_rest),
+        ("WebSocket lockstep", bench_ws_lockstep),
+        ("WebSocket pipelined", bench_ws_pipelined),
+    ):
+        rate = bench(client, args.commands)
+        print(f"{name:<22} {rate:>10.0f} commands/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""Open-loop HTTP load generator for a running relay-api.
+
+Requests are issued on a fixed schedule (``--rate`` per second) no matter
+how fast responses come back, the way independent clients behave.  A
+closed-loop client waits for each response before sending the next, so
+when the server stalls it simply stops sending and the stall never shows
+up in its percentiles ("coordinated omission").  Here every latency is
+measured from the request's *scheduled* send time, so time spent queued
+behind a slow server, in the connection pool or in the client's own event
+loop counts.  The uncorrected service time (from the actual send) is
+reported alongside for contrast.
+
+Start a server first, e.g. against the mock device::
+
+    RELAY_MOCK=true uvicorn app.main:app --port 8000
+    python -m benchmarks.loadgen --rate 500 --duration 20 \\
+        --mix get=60,put=30,bulk=5,burn=5 --output run.json
+    python -m benchmarks.loadgen --rate 500 --baseline run.json
+
+Request kinds: ``get`` (``GET /api/v1/relays``), ``put`` (one channel),
+``bulk`` (``PUT /api/v1/relays``) and ``burn`` (``GET`` burn-test status,
+as a dashboard polls it).  ``--baseline`` compares corrected p99 latency
+per kind and exits 1 on a regression beyond ``--threshold``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Any
+from urllib.parse import urlsplit
+
+from benchmarks.suite import compare, git_commit, print_comparison
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+_PATHS = {
+    "get": ("GET", "/api/v1/relays"),
+    "put": ("PUT", "/api/v1/relays/{channel}"),
+    "bulk": ("PUT", "/api/v1/relays"),
+    "burn": ("GET", "/api/v1/relays/burn-test"),
+}
+
+
+@dataclass
+class Sample:
+    kind: str
+    scheduled: float
+    sent: float
+    done: float
+    status: int  # 0 for transport errors and timeouts
+
+
+@dataclass
+class Target:
+    host: str
+    port: int
+    api_key: str
+    channels: int
+
+
+# --- Minimal HTTP/1.1 keep-alive client ---
+
+
+class Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, head: bytes, body: bytes) -> tuple[int, bytes]:
+        """Send one request; the response status and body."""
+        self.writer.write(head + body)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        return status, await self.reader.readexactly(length)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class Pool:
+    """Keep-alive connections, opened on demand up to ``size``."""
+
+    def __init__(self, target: Target, size: int) -> None:
+        self._target = target
+        self._idle: list[Connection] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def acquire(self) -> Connection:
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            reader, writer = await asyncio.open_connection(
+                self._target.host, self._target.port
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        return Connection(reader, writer)
+
+    def release(self, conn: Connection, reusable: bool) -> None:
+        if reusable:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self) -> None:
+        for conn in self._idle:
+            conn.close()
+        self._idle.clear()
+
+
+def build_request(
+    target: Target,
+    method: str,
+    path: str,
+    body: bytes = b"",
+    content_type: str = "application/json",
+) -> tuple[bytes, bytes]:
+    """Request head and body, ready for :meth:`Connection.request`."""
+    headers = [
+        f"{method} {path} HTTP/1.1",
+        f"Host: {target.host}:{target.port}",
+        f"Content-Length: {len(body)}",
+    ]
+    if body:
+        headers.append(f"Content-Type: {content_type}")
+    if target.api_key:
+        headers.append(f"X-API-Key: {target.api_key}")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode(), body
+
+
+def _encode(target: Target, kind: str, rng: random.Random) -> tuple[bytes, bytes]:
+    method, path = _PATHS[kind]
+    body = b""
+    if kind == "put":
+        path = path.format(channel=rng.randint(1, target.channels))
+    if method == "PUT":
+        body = json.dumps({"state": rng.choice(("on", "off"))}).encode()
+    return build_request(target, method, path, body)
+
+
+# --- Open-loop driver ---
+
+
+async def issue(
+    pool: Pool,
+    kind: str,
+    request: tuple[bytes, bytes],
+    scheduled: float,
+    timeout: float,
+    samples: list[Sample],
+) -> None:
+    """Send one request and append its :class:`Sample`; errors are recorded."""
+    status = 0
+    sent = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            conn = await pool.acquire()
+            sent = time.perf_counter()
+            try:
+                status, _ = await conn.request(*request)
+            except BaseException:
+                pool.release(conn, reusable=False)
+                raise
+            pool.release(conn, reusable=True)
+    except (OSError, TimeoutError, ValueError, asyncio.IncompleteReadError):
+        pass
+    samples.append(Sample(kind, scheduled, sent, time.perf_counter(), status))
+
+
+async def drive(
+    target: Target,
+    rate: float,
+    duration: float,
+    mix: dict[str, float],
+    connections: int,
+    timeout: float,
+    seed: int,
+) -> tuple[list[Sample], float, float]:
+    """Issue ``rate * duration`` requests on schedule.
+
+    Returns the samples, the wall time and how far (seconds) the generator
+    itself fell behind its schedule at worst.
+    """
+    rng = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    pool = Pool(target, connections)
+    samples: list[Sample] = []
+    tasks: set[asyncio.Task[None]] = set()
+    total = int(rate * duration)
+    lag = 0.0
+    start = time.perf_counter()
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            lag = max(lag, -delay)
+        kind = rng.choices(kinds, weights)[0]
+        task = asyncio.create_task(
+            issue(pool, kind, _encode(target, kind, rng), scheduled, timeout, samples)
+        )
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    wall = time.perf_counter() - start
+    pool.close()
+    return samples, wall, lag
+
+
+# --- Reporting ---
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))]
+
+
+def summarize(samples: list[Sample], wall: float) -> dict[str, float]:
+    """Corrected and uncorrected latency percentiles (µs), errors, throughput."""
+    corrected = sorted(s.done - s.scheduled for s in samples)
+    service = sorted(s.done - s.sent for s in samples)
+    errors = sum(1 for s in samples if not 200 <= s.status < 300)
+    result: dict[str, float] = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput": (len(samples) - errors) / wall if wall else 0.0,
+    }
+    for p in PERCENTILES:
+        result[f"p{p:g}_us"] = percentile(corrected, p) * 1e6
+    result["max_us"] = corrected[-1] * 1e6 if corrected else 0.0
+    result["service_p50_us"] = percentile(service, 50.0) * 1e6
+    result["service_p99_us"] = percentile(service, 99.0) * 1e6
+    return result
+
+
+def report(samples: list[Sample], wall: float) -> dict[str, dict[str, float]]:
+    by_kind: dict[str, list[Sample]] = {"all": samples}
+    for s in samples:
+        by_kind.setdefault(s.kind, []).append(s)
+    return {kind: summarize(group, wall) for kind, group in by_kind.items()}
+
+
+def _print_report(results: dict[str, dict[str, float]]) -> None:
+    print(
+        f"{'kind':<6} {'reqs':>7} {'err%':>6} {'req/s':>8} {'p50':>9} {'p90':>9} "
+        f"{'p99':>9} {'p99.9':>9} {'max':>9} {'svc p99':>9}   (ms)"
+    )
+    for kind, r in results.items():
+        print(
+            f"{kind:<6} {r['requests']:>7.0f} {r['error_rate'] * 100:>6.2f} "
+            f"{r['throughput']:>8.1f} {r['p50_us'] / 1e3:>9.2f} "
+            f"{r['p90_us'] / 1e3:>9.2f} {r['p99_us'] / 1e3:>9.2f} "
+            f"{r['p99.9_us'] / 1e3:>9.2f} {r['max_us'] / 1e3:>9.2f} "
+            f"{r['service_p99_us'] / 1e3:>9.2f}"
+        )
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """``"get=60,put=30"`` -> ``{"get": 60.0, "put": 30.0}``."""
+    mix: dict[str, float] = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in _PATHS:
+            raise ValueError(f"Unknown request kind {kind!r} (use {', '.join(_PATHS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+async def channel_count(target: Target) -> int:
+    """Number of relay channels the server reports."""
+    reader, writer = await asyncio.open_connection(target.host, target.port)
+    conn = Connection(reader, writer)
+    try:
+        status, body = await conn.request(*_encode(target, "get", random.Random()))
+    finally:
+        conn.close()
+    if status != 200:
+        raise SystemExit(f"GET /api/v1/relays failed with HTTP {status}")
+    return len(json.loads(body)["channels"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--rate", type=float, default=200.0, help="Requests/sec")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds")
+    parser.add_argument("--mix", default="get=60,put=30,bulk=5,burn=5")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Save JSON results here")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    target = Target(url.hostname or "127.0.0.1", url.port or 80, args.api_key, 0)
+    target = replace(target, channels=asyncio.run(channel_count(target)))
+    mix = parse_mix(args.mix)
+    samples, wall, lag = asyncio.run(
+        drive(
+            target,
+            args.rate,
+            args.duration,
+            mix,
+            args.connections,
+            args.timeout,
+            args.seed,
+        )
+    )
+    results = report(samples, wall)
+    _print_report(results)
+    if lag > 0.01:
+        # Still counted in the corrected latencies, but the client, not the
+        # server, may be the bottleneck.
+        print(f"\nwarning: generator fell up to {lag * 1e3:.1f} ms behind schedule")
+
+    if args.output:
+        saved: dict[str, Any] = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "url": args.url,
+                "rate": args.rate,
+                "duration": args.duration,
+                "mix": mix,
+                "connections": args.connections,
+                "seed": args.seed,
+                "max_schedule_lag_us": lag * 1e6,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(saved, indent=2) + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print()
+        print_comparison(baseline, results, args.threshold, "p99_us")
+        if compare(baseline, results, args.threshold, "p99_us"):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
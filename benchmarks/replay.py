@@ -0,0 +1,258 @@
+"""Replay recorded relay traffic from the audit log at 1x..Nx speed.
+
+Parses ``relay.audit`` records out of server log output and re-issues the
+commands over HTTP against a running instance, keeping their recorded
+inter-arrival times divided by the speed factor.  Commands touching the
+same channel are sent strictly in recorded order (a command waits for the
+previous one on each of its channels to finish); unrelated channels
+proceed in parallel.  As with :mod:`benchmarks.loadgen`, latency counts
+from each command's scheduled time, so backlog from a saturated server
+shows up::
+
+    python -m benchmarks.replay relay.log --speeds 1,2,5 --output replay.json
+
+Replayed: ``set_channel`` (``PUT /relays/{channel}``), ``set_all_channels``
+(``PUT /relays``) and ``set_channels`` (the per-channel records of one bulk
+write, merged back into a bitmask ``PUT /relays`` when they cover every
+channel).  Audit records do not say who sent a command, so burn-test
+writes replay as ordinary channel writes.  Records produced by the server
+itself (pulse auto-off, fail-safe OFF, burn-test start/stop markers) are
+skipped and counted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Any
+from urllib.parse import urlsplit
+
+from app.models.schemas import RelayState
+from benchmarks.loadgen import (
+    Pool,
+    Sample,
+    Target,
+    build_request,
+    channel_count,
+    issue,
+    summarize,
+)
+from benchmarks.suite import git_commit
+
+# The audit message, wherever it sits in a formatted log line.
+_RECORD = re.compile(
+    r"(?P<ts>\d{4}-\d\d-\d\dT\S+) \| (?P<action>\w+) \| "
+    r"(?:channel=(?P<channel>\d+)|all) → (?P<state>on|off)"
+)
+_REPLAYED = {"set_channel", "set_all_channels", "set_channels"}
+
+
+@dataclass
+class Command:
+    at: float  # seconds since the epoch
+    action: str
+    states: dict[int, RelayState] = field(default_factory=dict)
+    all_state: RelayState | None = None  # set_all_channels
+
+
+def parse_audit(lines: Iterable[str]) -> tuple[list[Command], Counter[str]]:
+    """Replayable commands in log order, and skipped records by action."""
+    commands: list[Command] = []
+    skipped: Counter[str] = Counter()
+    for line in lines:
+        match = _RECORD.search(line)
+        if match is None:
+            continue
+        action = match["action"]
+        if action not in _REPLAYED:
+            skipped[action] += 1
+            continue
+        at = datetime.fromisoformat(match["ts"]).timestamp()
+        state = RelayState(match["state"])
+        if action == "set_all_channels":
+            commands.append(Command(at, action, all_state=state))
+            continue
+        channel = int(match["channel"])
+        last = commands[-1] if commands else None
+        # One bulk write logs one record per channel with the same timestamp.
+        if (
+            action == "set_channels"
+            and last is not None
+            and last.action == action
+            and last.at == at
+            and channel not in last.states
+        ):
+            last.states[channel] = state
+            continue
+        commands.append(Command(at, action, {channel: state}))
+    return commands, skipped
+
+
+def requests_for(
+    command: Command, target: Target
+) -> list[tuple[tuple[int, ...], tuple[bytes, bytes], str]]:
+    """(channels touched, request, kind) for each HTTP request of a command."""
+    every = tuple(range(1, target.channels + 1))
+    if command.all_state is not None:
+        body = json.dumps({"state": command.all_state.value}).encode()
+        return [(every, build_request(target, "PUT", "/api/v1/relays", body), "bulk")]
+    if command.action == "set_channels" and len(command.states) == target.channels:
+        mask = sum(
+            1 << (ch - 1) for ch, s in command.states.items() if s == RelayState.ON
+        )
+        body = mask.to_bytes((target.channels + 7) // 8, "little")
+        request = build_request(
+            target, "PUT", "/api/v1/relays", body, "application/octet-stream"
+        )
+        return [(every, request, "bulk")]
+    return [
+        (
+            (ch,),
+            build_request(
+                target,
+                "PUT",
+                f"/api/v1/relays/{ch}",
+                json.dumps({"state": state.value}).encode(),
+            ),
+            "put",
+        )
+        for ch, state in command.states.items()
+    ]
+
+
+async def replay(
+    target: Target,
+    commands: list[Command],
+    speed: float,
+    connections: int,
+    timeout: float,
+) -> tuple[list[Sample], float]:
+    """Re-issue ``commands`` at ``speed``x; samples and wall time."""
+    pool = Pool(target, connections)
+    samples: list[Sample] = []
+    tasks: set[asyncio.Task[None]] = set()
+    # Completion of the latest request per channel, for per-channel order.
+    last: dict[int, asyncio.Future[None]] = {}
+
+    async def send(
+        after: list[asyncio.Future[None]],
+        done: asyncio.Future[None],
+        kind: str,
+        request: tuple[bytes, bytes],
+        scheduled: float,
+    ) -> None:
+        try:
+            if after:
+                await asyncio.wait(after)
+            await issue(pool, kind, request, scheduled, timeout, samples)
+        finally:
+            done.set_result(None)
+
+    loop = asyncio.get_running_loop()
+    base = commands[0].at if commands else 0.0
+    start = time.perf_counter()
+    for command in commands:
+        scheduled = start + (command.at - base) / speed
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        for channels, request, kind in requests_for(command, target):
+            after = list({id(f): f for ch in channels if (f := last.get(ch))}.values())
+            done: asyncio.Future[None] = loop.create_future()
+            for ch in channels:
+                last[ch] = done
+            task = asyncio.create_task(send(after, done, kind, request, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    wall = time.perf_counter() - start
+    pool.close()
+    return samples, wall
+
+
+def _print_table(results: dict[str, dict[str, float]]) -> None:
+    print(
+        f"{'speed':>6} {'reqs':>7} {'err%':>6} {'req/s':>8} {'p50':>9} "
+        f"{'p99':>9} {'max':>9} {'svc p99':>9}   (ms)"
+    )
+    for speed, r in results.items():
+        print(
+            f"{speed:>6} {r['requests']:>7.0f} {r['error_rate'] * 100:>6.2f} "
+            f"{r['throughput']:>8.1f} {r['p50_us'] / 1e3:>9.2f} "
+            f"{r['p99_us'] / 1e3:>9.2f} {r['max_us'] / 1e3:>9.2f} "
+            f"{r['service_p99_us'] / 1e3:>9.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="Log file with relay.audit records ('-': stdin)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--speeds", default="1,2,5", help="Comma-separated factors")
+    parser.add_argument(
+        "--max-duration",
+        type=float,
+        default=0.0,
+        help="Replay only this many recorded seconds (0 = all)",
+    )
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--output", help="Save JSON results here")
+    args = parser.parse_args()
+
+    if args.log == "-":
+        commands, skipped = parse_audit(sys.stdin)
+    else:
+        with open(args.log, encoding="utf-8") as f:
+            commands, skipped = parse_audit(f)
+    if not commands:
+        raise SystemExit("No replayable relay.audit records found")
+    if args.max_duration > 0:
+        end = commands[0].at + args.max_duration
+        commands = [c for c in commands if c.at <= end]
+    span = commands[-1].at - commands[0].at
+    print(
+        f"{len(commands)} commands over {span:.1f} s recorded"
+        + (f"; skipped {dict(skipped)}" if skipped else "")
+    )
+
+    url = urlsplit(args.url)
+    target = Target(url.hostname or "127.0.0.1", url.port or 80, args.api_key, 0)
+    target = replace(target, channels=asyncio.run(channel_count(target)))
+    results: dict[str, dict[str, float]] = {}
+    for speed in (float(s) for s in args.speeds.split(",")):
+        samples, wall = asyncio.run(
+            replay(target, commands, speed, args.connections, args.timeout)
+        )
+        results[f"{speed:g}x"] = summarize(samples, wall)
+    _print_table(results)
+
+    if args.output:
+        saved: dict[str, Any] = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "source": args.log,
+                "url": args.url,
+                "commands": len(commands),
+                "recorded_span_s": span,
+                "skipped": dict(skipped),
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(saved, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
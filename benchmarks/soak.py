@@ -0,0 +1,453 @@
+"""Soak test: long mixed traffic against the full app, watching for leaks.
+
+Runs the real ASGI app (all middleware, mock device) in-process and drives
+it at an accelerated rate with pulses (every ON arms a ``threading.Timer``),
+bulk writes, burn-test start/stop (a thread each) and reads, each from one
+of ``--clients`` distinct client IPs so the rate limiter sees far more
+clients than it keeps.  Pulse auto-off is shortened to ``--pulse-ms`` so
+timers come and go quickly.  Requests are issued straight into the ASGI
+app, without sockets, so a day of per-IP and per-pulse churn fits in
+minutes::
+
+    python -m benchmarks.soak --duration 600 --rate 2000 --output soak.json
+
+Every ``--sample-every`` seconds it records the thread count (pulse and
+debounce timers separately), the tracemalloc-traced heap and the process
+RSS.  After ``--warmup`` the run is split into four segments; a metric
+leaks if the median of every segment is at least that of the one before
+and the growth from first to last exceeds its tolerance.  Noise around a
+steady state does not rise in every segment, a leak does.  Threads must
+also return to the pre-traffic count once traffic stops and timers drain.
+The largest tracemalloc growths by source line are printed to point at
+the culprit.  Exits 1 on a leak.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message
+
+from app.config import settings
+from benchmarks.suite import git_commit
+
+SEGMENTS = 4
+# Tolerated growth between the first and last segment medians.
+TOLERANCES = {"threads": 2.0, "traced_mib": 2.0, "rss_mib": 16.0}
+MIX = {"get": 40.0, "pulse": 35.0, "bulk": 15.0, "burn": 5.0, "stop": 5.0}
+_TIMER_PREFIXES = ("relay-pulse-", "relay-debounce-")
+# Starts workers on demand up to its limit and keeps them idle: not a leak.
+_POOL_THREAD = "AnyIO worker thread"
+
+
+@dataclass
+class Sample:
+    at: float  # seconds since the start of traffic
+    requests: int
+    threads: int  # excluding the request threadpool
+    pool_threads: int
+    timers: int
+    traced_mib: float
+    rss_mib: float
+
+
+# --- Process measurements ---
+
+
+def rss_mib() -> float:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def _threads() -> tuple[int, int]:
+    """Threads outside the request threadpool, and inside it."""
+    names = [t.name for t in threading.enumerate()]
+    pool = names.count(_POOL_THREAD)
+    return len(names) - pool, pool
+
+
+def measure(at: float, requests: int) -> Sample:
+    threads, pool = _threads()
+    return Sample(
+        at,
+        requests,
+        threads,
+        pool,
+        sum(1 for t in threading.enumerate() if t.name.startswith(_TIMER_PREFIXES)),
+        tracemalloc.get_traced_memory()[0] / 2**20,
+        rss_mib(),
+    )
+
+
+# --- Leak detection ---
+
+
+def sustained_growth(values: list[float], tolerance: float) -> float | None:
+    """Growth between the first and last segment medians if it is sustained.
+
+    ``None`` when some segment's median falls below the one before it or
+    the total growth stays within ``tolerance``.
+    """
+    if len(values) < SEGMENTS:
+        return None
+    size = len(values) // SEGMENTS
+    medians = [
+        statistics.median(values[i * size : (i + 1) * size]) for i in range(SEGMENTS)
+    ]
+    if any(b < a for a, b in zip(medians, medians[1:])):
+        return None
+    growth = medians[-1] - medians[0]
+    return growth if growth > tolerance else None
+
+
+def find_leaks(
+    samples: list[Sample], tolerances: dict[str, float]
+) -> dict[str, float]:
+    """Metrics with sustained growth, and by how much."""
+    leaks: dict[str, float] = {}
+    for metric, tolerance in tolerances.items():
+        growth = sustained_growth([getattr(s, metric) for s in samples], tolerance)
+        if growth is not None:
+            leaks[metric] = growth
+    return leaks
+
+
+# --- Raw ASGI client ---
+
+
+async def call(
+    app: ASGIApp,
+    method: str,
+    path: str,
+    body: bytes = b"",
+    client: str = "127.0.0.1",
+    headers: tuple[tuple[bytes, bytes], ...] = (),
+) -> int:
+    """Issue one HTTP request straight into ``app``; the response status."""
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"soak"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+        "client": (client, 50000),
+        "server": ("soak", 80),
+    }
+    status = 0
+    sent = False
+    finished = asyncio.Event()
+
+    async def receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get(
+            "more_body", False
+        ):
+            finished.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return status
+
+
+# --- Traffic ---
+
+
+Request = tuple[str, str, bytes]  # method, path, body
+
+
+def _requests(channels: int) -> dict[str, Callable[[random.Random], Request]]:
+    def pulse(rng: random.Random) -> Request:
+        return "PUT", f"/api/v1/relays/{rng.randint(1, channels)}", b'{"state":"on"}'
+
+    def bulk(rng: random.Random) -> Request:
+        state = rng.choice(("on", "off"))
+        return "PUT", "/api/v1/relays", b'{"state":"%s"}' % state.encode()
+
+    return {
+        "get": lambda rng: ("GET", "/api/v1/relays", b""),
+        "pulse": pulse,
+        "bulk": bulk,
+        "burn": lambda rng: (
+            "POST",
+            "/api/v1/relays/burn-test",
+            b'{"cycles":3,"delay_ms":100,"mode":"alternate"}',
+        ),
+        "stop": lambda rng: ("DELETE", "/api/v1/relays/burn-test", b""),
+    }
+
+
+async def drive(
+    app: ASGIApp,
+    duration: float,
+    rate: float,
+    clients: int,
+    concurrency: int,
+    sample_every: float,
+    seed: int = 1,
+    on_sample: Callable[[Sample], None] | None = None,
+) -> tuple[list[Sample], Counter[str]]:
+    """Mixed traffic for ``duration`` s at ``rate`` req/s; samples, statuses."""
+    channels = settings.relay_channels
+    builders = _requests(channels)
+    kinds, weights = list(MIX), list(MIX.values())
+    statuses: Counter[str] = Counter()
+    samples: list[Sample] = []
+    issued = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    # Each worker paces itself to its share of the rate.
+    gap = concurrency / rate
+
+    async def worker(index: int) -> None:
+        nonlocal issued
+        rng = random.Random(seed * 1000 + index)
+        next_at = time.perf_counter()
+        while (now := time.perf_counter()) < deadline:
+            if next_at > now:
+                await asyncio.sleep(next_at - now)
+            next_at += gap
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body = builders[kind](rng)
+            n = rng.randrange(clients)
+            ip = f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+            status = await call(app, method, path, body, ip)
+            statuses[f"{kind} {status}"] += 1
+            issued += 1
+
+    async def sampler() -> None:
+        while (now := time.perf_counter()) < deadline:
+            sample = measure(now - start, issued)
+            samples.append(sample)
+            if on_sample is not None:
+                on_sample(sample)
+            await asyncio.sleep(sample_every)
+
+    await asyncio.gather(sampler(), *(worker(i) for i in range(concurrency)))
+    return samples, statuses
+
+
+async def settle(app: ASGIApp, timeout: float) -> int:
+    """Stop any burn test and wait for timers to drain; threads left after.
+
+    The request threadpool is not counted.
+    """
+    await call(app, "DELETE", "/api/v1/relays/burn-test")
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(
+            t.name.startswith((*_TIMER_PREFIXES, "relay-burn-test"))
+            for t in threading.enumerate()
+        ):
+            break
+        await asyncio.sleep(0.05)
+    return _threads()[0]
+
+
+async def wait_ready(app: ASGIApp, timeout: float = 10.0) -> None:
+    """Wait for the device to open (relay routes answer 503 until then)."""
+    deadline = time.monotonic() + timeout
+    while await call(app, "GET", "/api/v1/relays") != 200:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Relay device did not come up")
+        await asyncio.sleep(0.05)
+
+
+@dataclass
+class Outcome:
+    samples: list[Sample]
+    statuses: Counter[str]
+    leaks: dict[str, float]
+    threads_before: int
+    threads_after: int
+    top_growth: list[str]
+
+
+async def soak(
+    app: FastAPI,
+    duration: float,
+    rate: float,
+    clients: int = 50_000,
+    concurrency: int = 32,
+    sample_every: float = 1.0,
+    warmup: float = 0.0,
+    tolerances: dict[str, float] = TOLERANCES,
+    top: int = 10,
+    on_sample: Callable[[Sample], None] | None = None,
+) -> Outcome:
+    """Run the app's lifespan, warm up, then soak and analyse."""
+    tracemalloc.start()
+    try:
+        async with app.router.lifespan_context(app):
+            await wait_ready(app)
+            if warmup > 0:
+                await drive(app, warmup, rate, clients, concurrency, warmup)
+            threads_before = await settle(app, timeout=10.0)
+            baseline = tracemalloc.take_snapshot()
+            samples, statuses = await drive(
+                app,
+                duration,
+                rate,
+                clients,
+                concurrency,
+                sample_every,
+                on_sample=on_sample,
+            )
+            threads_after = await settle(app, timeout=10.0)
+            growth = tracemalloc.take_snapshot().compare_to(baseline, "lineno")
+    finally:
+        tracemalloc.stop()
+    leaks = find_leaks(samples, tolerances)
+    if threads_after - threads_before > tolerances["threads"]:
+        leaks["threads_after_drain"] = float(threads_after - threads_before)
+    return Outcome(
+        samples,
+        statuses,
+        leaks,
+        threads_before,
+        threads_after,
+        [str(stat) for stat in growth[:top] if stat.size_diff > 0],
+    )
+
+
+def _print_sample(sample: Sample) -> None:
+    print(
+        f"{sample.at:>8.0f} {sample.requests:>10} {sample.threads:>8} "
+        f"{sample.pool_threads:>5} {sample.timers:>7} "
+        f"{sample.traced_mib:>11.2f} {sample.rss_mib:>9.1f}",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=300.0, help="Seconds")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests/sec")
+    parser.add_argument("--warmup", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--clients", type=int, default=50_000, help="Distinct IPs")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pulse-ms", type=int, default=20)
+    parser.add_argument("--sample-every", type=float, default=5.0, help="Seconds")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites")
+    for metric, default in TOLERANCES.items():
+        parser.add_argument(
+            f"--max-{metric.replace('_', '-')}",
+            type=float,
+            default=default,
+            help=f"Tolerated {metric} growth",
+        )
+    parser.add_argument("--output", help="Save JSON results here")
+    args = parser.parse_args()
+
+    # Configure before the app is imported and its middleware is built.
+    settings.mock = True
+    settings.api_key = ""
+    settings.pulse_ms = args.pulse_ms
+    # Limit enforced (so every request touches the limiter) but never hit.
+    settings.rate_limit = 1_000_000_000
+    settings.owner_socket = ""
+    settings.modbus_port = 0
+    settings.udp_port = 0
+    logging.disable(logging.WARNING)
+    from app.main import app
+
+    tolerances = {m: getattr(args, f"max_{m}") for m in TOLERANCES}
+    print(
+        f"{'t (s)':>8} {'requests':>10} {'threads':>8} {'pool':>5} {'timers':>7} "
+        f"{'traced MiB':>11} {'RSS MiB':>9}"
+    )
+    outcome = asyncio.run(
+        soak(
+            app,
+            args.duration,
+            args.rate,
+            args.clients,
+            args.concurrency,
+            args.sample_every,
+            args.warmup,
+            tolerances,
+            args.top,
+            on_sample=_print_sample,
+        )
+    )
+
+    print(f"\nstatuses: {dict(sorted(outcome.statuses.items()))}")
+    print(
+        f"threads before/after traffic: {outcome.threads_before}"
+        f"/{outcome.threads_after}"
+    )
+    print("\ntop allocation growth:")
+    for line in outcome.top_growth:
+        print(f"  {line}")
+    if args.output:
+        saved: dict[str, Any] = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "duration": args.duration,
+                "rate": args.rate,
+                "clients": args.clients,
+                "pulse_ms": args.pulse_ms,
+                "tolerances": tolerances,
+            },
+            "samples": [asdict(s) for s in outcome.samples],
+            "statuses": dict(outcome.statuses),
+            "leaks": outcome.leaks,
+            "top_growth": outcome.top_growth,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(saved, indent=2) + "\n")
+    if outcome.leaks:
+        print(f"\nLEAK: {outcome.leaks}")
+        sys.exit(1)
+    print("\nno sustained growth")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Service and device hot-path benchmark suite with JSON output.
+
+Times ``RelayService`` directly (no HTTP) in four setups:
+
+``single``
+    One thread against the in-memory mock device.
+``contended``
+    Several threads issuing commands at once, so the numbers include
+    device lock hand-offs.
+``latency``
+    A mock device whose writes take ``--write-latency-us`` (default 200),
+    roughly a USB HID feature report.
+``virtual``
+    Timer-driven paths on a :class:`~app.core.clock.VirtualClock`: a full
+    pulse (ON, then the auto-off firing) per operation, without waiting
+    for the pulse to elapse.
+
+Each scenario is warmed up, then repeated ``--repeat`` times, and the
+repeat with the lowest median is kept, which filters out one-off scheduler
+noise.  Results are JSON; ``--baseline`` compares them against an earlier
+run and exits with status 1 if any scenario's median latency regressed by
+more than ``--threshold``::
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json --threshold 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core.clock import VirtualClock
+from app.core.device import MockRelayDevice
+from app.models.schemas import BurnTestMode, RelayState
+from app.services.events import EventType
+from app.services.relay_service import RelayService
+
+CHANNELS = 8
+THREADS = 4
+# Pulse long enough that it never fires during a run: only arm/cancel cost.
+_PULSE_MS = 60_000
+
+Result = dict[str, float]
+Scenario = Callable[[int], list[float]]
+
+
+class LatencyDevice(MockRelayDevice):
+    """Mock device whose writes take a fixed time, like a USB round trip."""
+
+    def __init__(self, channels: int, latency_s: float):
+        super().__init__(channels)
+        self._latency_s = latency_s
+
+    def set_channel(self, channel: int, on: bool) -> None:
+        time.sleep(self._latency_s)
+        super().set_channel(channel, on)
+
+
+def _service(device: MockRelayDevice, pulse_ms: int = 0) -> RelayService:
+    device.open()
+    return RelayService(device, channels=CHANNELS, pulse_ms=pulse_ms)
+
+
+def _toggle(i: int) -> RelayState:
+    return RelayState.ON if i % 2 == 0 else RelayState.OFF
+
+
+def _timed(op: Callable[[int], object], n: int) -> list[float]:
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        op(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _contended(service: RelayService, n: int) -> list[float]:
+    """``THREADS`` threads each toggling their own channel ``n`` times."""
+    results: list[list[float]] = [[] for _ in range(THREADS)]
+    barrier = threading.Barrier(THREADS)
+
+    def worker(index: int) -> None:
+        channel = index % CHANNELS + 1
+        barrier.wait()
+        results[index] = _timed(
+            lambda i: service.set_channel(channel, _toggle(i)), n // THREADS
+        )
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [s for samples in results for s in samples]
+
+
+def _burn(service: RelayService, mode: BurnTestMode, cycles: int) -> list[float]:
+    """Seconds per cycle of a zero-delay burn test, one sample per cycle.
+
+    Cycles are timed by the burn thread's own event timestamps: events
+    are dequeued here in bursts, so the time they arrive says nothing
+    about when a cycle finished.
+    """
+    samples = []
+    last: float | None = None
+    # Every write publishes CHANNEL_SET too; a full queue would drop cycles.
+    per_cycle = 2 * service.channel_count + 1
+    with service.events.subscribe(maxsize=cycles * per_cycle + 8) as sub:
+        service.start_burn_test(cycles, 0, mode)
+        while (event := sub.get(timeout=10.0)) is not None:
+            if event.type == EventType.BURN_STARTED:
+                last = event.timestamp
+            elif event.type == EventType.BURN_CYCLE and last is not None:
+                samples.append(event.timestamp - last)
+                last = event.timestamp
+            elif event.type == EventType.BURN_FINISHED:
+                break
+    return samples
+
+
+def scenarios(write_latency_s: float) -> dict[str, Scenario]:
+    """Scenario name -> function running ``n`` operations, returning samples."""
+
+    def single(pulse_ms: int = 0) -> RelayService:
+        return _service(MockRelayDevice(CHANNELS), pulse_ms)
+
+    def slow() -> RelayService:
+        return _service(LatencyDevice(CHANNELS, write_latency_s))
+
+    def set_channel(n: int) -> list[float]:
+        service = single()
+        return _timed(lambda i: service.set_channel(1, _toggle(i)), n)
+
+    def set_all_channels(n: int) -> list[float]:
+        service = single()
+        return _timed(lambda i: service.set_all_channels(_toggle(i)), n)
+
+    def get_all_channels(n: int) -> list[float]:
+        service = single()
+        return _timed(lambda i: service.get_all_channels(), n)
+
+    def pulse(n: int) -> list[float]:
+        # ON arms the auto-off timer, OFF cancels it.
+        service = single(_PULSE_MS)
+        return _timed(lambda i: service.set_channel(1, _toggle(i)), n)
+
+    def burn_all(n: int) -> list[float]:
+        return _burn(single(), BurnTestMode.ALL, max(1, n // (2 * CHANNELS)))
+
+    def burn_alternate(n: int) -> list[float]:
+        return _burn(single(), BurnTestMode.ALTERNATE, max(1, n // 4))
+
+    def contended_set_channel(n: int) -> list[float]:
+        return _contended(single(), n)
+
+    def latency_set_channel(n: int) -> list[float]:
+        service = slow()
+        return _timed(lambda i: service.set_channel(1, _toggle(i)), n)
+
+    def latency_set_all_channels(n: int) -> list[float]:
+        service = slow()
+        return _timed(lambda i: service.set_all_channels(_toggle(i)), n)
+
+    def latency_contended_set_channel(n: int) -> list[float]:
+        return _contended(slow(), n)
+
+    def virtual_pulse_cycle(n: int) -> list[float]:
+        clock = VirtualClock()
+        device = MockRelayDevice(CHANNELS)
+        device.open()
+        service = RelayService(
+            device, channels=CHANNELS, pulse_ms=_PULSE_MS, clock=clock
+        )
+
+        def cycle(i: int) -> None:
+            service.set_channel(i % CHANNELS + 1, RelayState.ON)
+            clock.advance(_PULSE_MS / 1000.0)
+
+        return _timed(cycle, n)
+
+    return {
+        "single.set_channel": set_channel,
+        "single.set_all_channels": set_all_channels,
+        "single.get_all_channels": get_all_channels,
+        "single.pulse": pulse,
+        "single.burn_all": burn_all,
+        "single.burn_alternate": burn_alternate,
+        "contended.set_channel": contended_set_channel,
+        "latency.set_channel": latency_set_channel,
+        "latency.set_all_channels": latency_set_all_channels,
+        "latency.contended_set_channel": latency_contended_set_channel,
+        "virtual.pulse_cycle": virtual_pulse_cycle,
+    }
+
+
+def summarize(samples: list[float], wall_s: float) -> Result:
+    ordered = sorted(samples)
+    return {
+        "ops": len(ordered),
+        "median_us": statistics.median(ordered) * 1e6,
+        "p99_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6,
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "ops_per_sec": len(ordered) / wall_s,
+    }
+
+
+def run(
+    ops: int, repeat: int, write_latency_s: float, only: str = ""
+) -> dict[str, Result]:
+    results: dict[str, Result] = {}
+    for name, scenario in scenarios(write_latency_s).items():
+        if only and only not in name:
+            continue
+        # Latency scenarios sleep per write; keep their runtime comparable.
+        n = ops // 10 if name.startswith("latency.") else ops
+        scenario(max(1, n // 10))  # warm-up: caches, allocator, lazy imports
+        best: Result | None = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = summarize(scenario(n), time.perf_counter() - start)
+            if best is None or result["median_us"] < best["median_us"]:
+                best = result
+        assert best is not None
+        results[name] = best
+    return results
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return out.stdout.strip()
+
+
+def compare(
+    baseline: dict[str, Result],
+    current: dict[str, Result],
+    threshold: float,
+    metric: str = "median_us",
+) -> list[str]:
+    """Scenarios whose ``metric`` (a latency) grew by more than ``threshold``."""
+    return [
+        name
+        for name, result in current.items()
+        if name in baseline
+        and result[metric] > baseline[name][metric] * (1 + threshold)
+    ]
+
+
+def print_comparison(
+    baseline: dict[str, Result],
+    current: dict[str, Result],
+    threshold: float,
+    metric: str = "median_us",
+) -> None:
+    regressed = set(compare(baseline, current, threshold, metric))
+    print(f"{'scenario':<34} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current.items():
+        if name not in baseline:
+            print(f"{name:<34} {'-':>10} {result[metric]:>8.1f}us  (new)")
+            continue
+        before, after = baseline[name][metric], result[metric]
+        flag = "  REGRESSION" if name in regressed else ""
+        print(
+            f"{name:<34} {before:>8.1f}us {after:>8.1f}us "
+            f"{(after - before) / before:>+8.1%}{flag}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=5000, help="Operations per run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--write-latency-us", type=int, default=200)
+    parser.add_argument("--only", default="", help="Run scenarios containing this")
+    parser.add_argument("--output", help="Write JSON results here (default stdout)")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Median slowdown counted as a regression (0.15 = 15%%)",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    report: dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "ops": args.ops,
+            "repeat": args.repeat,
+            "write_latency_us": args.write_latency_us,
+        },
+        "results": run(
+            args.ops, args.repeat, args.write_latency_us / 1e6, args.only
+        ),
+    }
+
+    rendered = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(rendered + "\n")
+    elif not args.baseline:
+        print(rendered)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print_comparison(baseline, report["results"], args.threshold)
+        if compare(baseline, report["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,63 @@
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
 import uvicorn
 
 from app.config import settings
+from app.ipc.server import run_owner
 
-if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
+
+def _wait_for_owner(path: str, owner: multiprocessing.Process) -> None:
+    """Block until the device owner accepts connections."""
+    deadline = time.monotonic() + 10.0
+    while time.monotonic() < deadline:
+        if not owner.is_alive():
+            raise SystemExit("Device owner process exited during startup")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+                return
+            except OSError:
+                time.sleep(0.05)
+    raise SystemExit(f"Device owner did not start listening on {path}")
+
+
+def _run_workers() -> None:
+    """One device-owner process plus ``settings.workers`` HTTP workers."""
+    path = settings.owner_socket or os.path.join(
+        tempfile.mkdtemp(prefix="relay-"), "owner.sock"
     )
+    segment = settings.state_segment or f"relay-state-{os.getpid()}"
+    owner = multiprocessing.Process(
+        target=run_owner, args=(path, segment), name="relay-owner"
+    )
+    owner.start()
+    try:
+        _wait_for_owner(path, owner)
+        # Workers read this from the environment when they import the app.
+        os.environ["RELAY_OWNER_SOCKET"] = path
+        os.environ["RELAY_STATE_SEGMENT"] = segment
+        uvicorn.run(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            workers=settings.workers,
+        )
+    finally:
+        owner.terminate()
+        owner.join(timeout=10.0)
+
+
+if __name__ == "__main__":
+    if settings.workers > 1:
+        _run_workers()
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            reload=settings.debug,
+        )
@@ -6,12 +6,14 @@ import pytest
 from fastapi.testclient import TestClient
 
 from app.api.dependencies import (
+    get_idempotency_cache,
     get_relay_service,
     get_relay_service_public,
     init_relay_service,
     require_device,
 )
 from app.core.device import MockRelayDevice
+from app.services.idempotency import IdempotencyCache
 from app.services.relay_service import RelayService
 
 
@@ -44,6 +46,8 @@ def client(service: RelayService) -> Generator[TestClient, None, None]:
     app.dependency_overrides[get_relay_service] = lambda: service
     app.dependency_overrides[get_relay_service_public] = lambda: service
     app.dependency_overrides[require_device] = lambda: service
+    cache = IdempotencyCache()
+    app.dependency_overrides[get_idempotency_cache] = lambda: cache
     yield TestClient(app, raise_server_exceptions=False)
     app.dependency_overrides.clear()
 
@@ -1,14 +1,30 @@
 from __future__ import annotations
 
+import functools
 from typing import Generator
 
 import pytest
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.testclient import TestClient
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+from starlette.types import ASGIApp
 
-from app.api.dependencies import get_relay_service_public
+
+from app.api.dependencies import get_relay_service_public, init_relay_service
+from app.api.v1.relays import router as relays_router
+from app.api.v1.system import router as system_router
+from app.api.v1.ws import router as ws_router
+from app.config import settings
 from app.core.device import MockRelayDevice
-from app.middleware import RateLimitMiddleware
+from app.core.metrics import RATE_LIMITED
+from app.middleware import (
+    APIKeyAuthMiddleware,
+    RateLimitMiddleware,
+    SlidingWindowRateLimiter,
+    client_key,
+    route_cost,
+)
 from app.models.schemas import HealthResponse
 from app.services.relay_service import RelayService
 
@@ -27,6 +43,12 @@ class TestApiKeyAuthEnabled:
         )
         assert resp.status_code == 401
 
+    def test_non_ascii_key_returns_401(self, client_auth: TestClient) -> None:
+        resp = client_auth.get(
+            "/api/v1/relays", headers={"X-API-Key": b"t\xe9st-key"}
+        )
+        assert resp.status_code == 401
+
     def test_correct_key_returns_200(self, client_auth: TestClient) -> None:
         resp = client_auth.get(
             "/api/v1/relays", headers={"X-API-Key": "test-key"}
@@ -123,3 +145,166 @@ class TestRateLimiting:
         assert resp.status_code == 429
         assert "Rate limit exceeded" in resp.json()["detail"]
         assert "Retry-After" in resp.headers
+
+    def test_rejections_are_counted(self, client_rate_limited: TestClient) -> None:
+        before = RATE_LIMITED.value()
+        for _ in range(5):
+            client_rate_limited.get("/health")
+        assert RATE_LIMITED.value() == before + 2
+
+    def test_rotating_invalid_keys_share_the_ip_bucket(
+        self, client_rate_limited: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("app.config.settings.api_key", "test-key")
+        monkeypatch.setattr("app.config.settings.rate_limit_key", "api_key")
+        statuses = [
+            client_rate_limited.get(
+                "/health", headers={"X-API-Key": f"fake-{i}"}
+            ).status_code
+            for i in range(5)
+        ]
+        assert statuses == [200, 200, 200, 429, 429]
+
+    def test_matches_base_http_middleware(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """The ASGI limiter answers exactly like the BaseHTTPMiddleware it replaced."""
+        monkeypatch.setattr("app.config.settings.rate_limit", 3)
+        # Both limiters read one frozen clock, so no window boundary can
+        # fall between the two runs and Retry-After values are comparable.
+        frozen = functools.partial(SlidingWindowRateLimiter, clock=lambda: 30.0)
+        monkeypatch.setattr("app.middleware.SlidingWindowRateLimiter", frozen)
+        monkeypatch.setattr(f"{__name__}.SlidingWindowRateLimiter", frozen)
+        monkeypatch.setattr(
+            "app.config.settings.rate_limit_costs", {"PUT /heavy": 2}
+        )
+        results = []
+        for middleware in (RateLimitMiddleware, _BaseHTTPRateLimit):
+            test_app = FastAPI()
+            test_app.add_middleware(middleware)
+            test_app.get("/light")(lambda: {"ok": True})
+            test_app.put("/heavy")(lambda: {"ok": True})
+            tc = TestClient(test_app, raise_server_exceptions=False)
+            results.append(
+                [
+                    (r.status_code, r.content, r.headers.get("Retry-After"))
+                    for r in (
+                        tc.put("/heavy"),
+                        tc.put("/heavy"),
+                        tc.get("/light"),
+                        tc.get("/light"),
+                    )
+                ]
+            )
+        assert results[0] == results[1]
+        assert [status for status, _, _ in results[0]] == [200, 429, 200, 429]
+
+
+class TestAuthMiddlewareEquivalence:
+    """APIKeyAuthMiddleware must answer exactly like the route dependency."""
+
+    CASES = [
+        ("GET", "/api/v1/relays", None),
+        ("GET", "/api/v1/relays", "wrong-key"),
+        ("GET", "/api/v1/relays", "test-key"),
+        ("GET", "/api/v1/relays/1", None),
+        ("GET", "/api/v1/relays/1", "test-key"),
+        ("PUT", "/api/v1/relays/1", None),
+        ("PUT", "/api/v1/relays/1", "TEST-KEY"),
+        ("PUT", "/api/v1/relays/1", "test-key"),
+        ("GET", "/api/v1/relays/device/info", ""),
+        ("GET", "/api/v1/relays/99", "test-key"),
+        ("GET", "/health", None),
+        ("GET", "/openapi.json", None),
+    ]
+
+    @pytest.fixture()
+    def clients(
+        self, service: RelayService, monkeypatch: pytest.MonkeyPatch
+    ) -> Generator[tuple[TestClient, TestClient], None, None]:
+        monkeypatch.setattr("app.config.settings.api_key", "test-key")
+        init_relay_service(service)
+        yield _auth_app(middleware=False), _auth_app(middleware=True)
+        init_relay_service(None)  # type: ignore[arg-type]
+
+    @pytest.mark.parametrize(("method", "path", "key"), CASES)
+    def test_same_response(
+        self,
+        clients: tuple[TestClient, TestClient],
+        method: str,
+        path: str,
+        key: str | None,
+    ) -> None:
+        headers = {"X-API-Key": key} if key is not None else {}
+        body = {"state": "off"} if method == "PUT" else None
+        dependency_only, with_middleware = (
+            c.request(method, path, headers=headers, json=body) for c in clients
+        )
+        assert with_middleware.status_code == dependency_only.status_code
+        assert with_middleware.json() == dependency_only.json()
+
+    def test_rejects_before_routing(
+        self, clients: tuple[TestClient, TestClient]
+    ) -> None:
+        """Unauthenticated requests never reach the router, so unknown
+        paths are not revealed by a 404."""
+        dependency_only, with_middleware = clients
+        assert dependency_only.get("/api/v1/nope").status_code == 404
+        assert with_middleware.get("/api/v1/nope").status_code == 401
+
+    def test_websocket_passes_through(
+        self, clients: tuple[TestClient, TestClient]
+    ) -> None:
+        """The command channel authenticates in-band after connecting."""
+        _, with_middleware = clients
+        with with_middleware.websocket_connect("/api/v1/relays/ws") as ws:
+            ws.send_json({"op": "auth", "key": "test-key"})
+            ws.send_json({"id": 1, "op": "get", "ch": 1})
+            assert ws.receive_json()["ok"] is True
+
+
+# ─── Helpers ───
+
+
+class _BaseHTTPRateLimit(BaseHTTPMiddleware):
+    """``BaseHTTPMiddleware`` dispatch the ASGI rate limiter replaced.
+
+    Both wrap the same :class:`SlidingWindowRateLimiter`, so the
+    equivalence test covers the middleware layer (keying, costs, the 429
+    response), not the limiting algorithm.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app)
+        self._limiter = SlidingWindowRateLimiter(
+            settings.rate_limit, max_clients=settings.rate_limit_max_clients
+        )
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        if settings.rate_limit <= 0:
+            return await call_next(request)
+
+        retry_after = self._limiter.hit(
+            client_key(request.scope, settings.rate_limit_key),
+            route_cost(request.method, request.url.path, settings.rate_limit_costs),
+        )
+        if retry_after is not None:
+            return Response(
+                content='{"detail":"Rate limit exceeded"}',
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                media_type="application/json",
+                headers={"Retry-After": str(retry_after)},
+            )
+        return await call_next(request)
+
+
+def _auth_app(middleware: bool) -> TestClient:
+    test_app = FastAPI()
+    if middleware:
+        test_app.add_middleware(APIKeyAuthMiddleware)
+    test_app.include_router(relays_router, prefix="/api/v1")
+    test_app.include_router(ws_router, prefix="/api/v1")
+    test_app.include_router(system_router)
+    return TestClient(test_app, raise_server_exceptions=False)
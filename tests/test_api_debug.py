@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from httpx import Response
+
+
+@pytest.fixture()
+def debug_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.config.settings.debug_endpoints", True)
+
+
+class TestLockProfileEndpoint:
+    def test_hidden_unless_enabled(self, client: TestClient) -> None:
+        assert client.get("/api/v1/debug/lock-profile").status_code == 404
+        resp = client.put("/api/v1/debug/lock-profile", json={"enabled": True})
+        assert resp.status_code == 404
+
+    @pytest.mark.usefixtures("debug_enabled")
+    def test_enable_then_profile(self, client: TestClient) -> None:
+        resp = client.put("/api/v1/debug/lock-profile", json={"enabled": True})
+        assert resp.status_code == 200
+        assert resp.json()["enabled"] is True
+
+        client.put("/api/v1/relays/1", json={"state": "on"})
+        data = client.get("/api/v1/debug/lock-profile").json()
+        assert data["holder"] is None
+        assert data["queue_depth"] == 0
+        op = data["operations"][0]
+        assert (op["operation"], op["source"]) == ("set_channel", "api")
+        assert op["acquisitions"] == 1
+
+    @pytest.mark.usefixtures("debug_enabled")
+    def test_top_is_validated(self, client: TestClient) -> None:
+        assert client.get("/api/v1/debug/lock-profile?top=0").status_code == 422
+
+    @pytest.mark.usefixtures("debug_enabled")
+    def test_requires_api_key(self, client_auth: TestClient) -> None:
+        assert client_auth.get("/api/v1/debug/lock-profile").status_code == 401
+        resp = client_auth.get(
+            "/api/v1/debug/lock-profile", headers={"X-API-Key": "test-key"}
+        )
+        assert resp.status_code == 200
+
+
+class TestProfileEndpoint:
+    def test_hidden_unless_enabled(self, client: TestClient) -> None:
+        assert client.get("/api/v1/debug/profile").status_code == 404
+
+    @pytest.mark.usefixtures("debug_enabled")
+    def test_returns_collapsed_stacks(self, client: TestClient) -> None:
+        resp = client.get("/api/v1/debug/profile?seconds=0.05&interval_ms=5")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert int(resp.headers["X-Profile-Samples"]) >= 2
+        for line in resp.text.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert ";" in stack and int(count) >= 1
+
+    @pytest.mark.usefixtures("debug_enabled")
+    def test_requires_api_key(self, client_auth: TestClient) -> None:
+        url = "/api/v1/debug/profile?seconds=0.01"
+        assert client_auth.get(url).status_code == 401
+        resp = client_auth.get(url, headers={"X-API-Key": "test-key"})
+        assert resp.status_code == 200
+
+    @pytest.mark.usefixtures("debug_enabled")
+    def test_unknown_route(self, client: TestClient) -> None:
+        resp = client.get("/api/v1/debug/profile?route=/nope")
+        assert resp.status_code == 404
+        resp = client.get(
+            "/api/v1/debug/profile",
+            params={"route": "/api/v1/relays/{channel}", "method": "DELETE"},
+        )
+        assert resp.status_code == 404
+
+    @pytest.mark.usefixtures("debug_enabled")
+    def test_next_requests_on_a_route(self, client: TestClient) -> None:
+        result: list[Response] = []
+        profile = threading.Thread(
+            target=lambda: result.append(
+                client.get(
+                    "/api/v1/debug/profile",
+                    params={
+                        "route": "/api/v1/relays/{channel}",
+                        "method": "PUT",
+                        "requests": 3,
+                        "seconds": 10,
+                    },
+                )
+            )
+        )
+        profile.start()
+        deadline = time.monotonic() + 5.0
+        while profile.is_alive() and time.monotonic() < deadline:
+            client.put("/api/v1/relays/1", json={"state": "on"})
+            client.get("/api/v1/relays")
+        profile.join()
+        resp = result[0]
+        assert resp.status_code == 200
+        assert resp.headers["X-Profile-Requests"] == "3"
+        assert float(resp.headers["X-Profile-Duration"]) < 5.0
+        assert all("set_relay" in line for line in resp.text.splitlines())
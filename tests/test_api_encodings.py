@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import struct
+
+import msgpack
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api import encodings
+from app.api.encodings import (
+    BITMASK,
+    JSON,
+    MSGPACK,
+    VERSIONED_BITMASK,
+    decode_bitmask,
+    encode_bitmask,
+    encode_states,
+    negotiate,
+)
+from app.models.schemas import RelayState, RelayStatus
+from app.services.relay_service import RelayService
+
+
+class TestNegotiate:
+    @pytest.mark.parametrize(
+        ("accept", "expected"),
+        [
+            (None, JSON),
+            ("*/*", JSON),
+            ("text/html", JSON),
+            (BITMASK, BITMASK),
+            (f"{JSON};q=0.5, {VERSIONED_BITMASK}", VERSIONED_BITMASK),
+            (f"{BITMASK};q=0, application/*", JSON),
+            ("application/x-msgpack", MSGPACK),
+        ],
+    )
+    def test_picks_media_type(self, accept: str | None, expected: str) -> None:
+        assert negotiate(accept) == expected
+
+    def test_missing_msgpack_is_406(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(encodings, "msgpack", None)
+        with pytest.raises(HTTPException) as exc_info:
+            negotiate(MSGPACK)
+        assert exc_info.value.status_code == 406
+        assert negotiate(f"{MSGPACK}, {JSON};q=0.1") == JSON
+
+
+class TestBitmask:
+    def test_round_trip_over_byte_boundary(self) -> None:
+        states = {
+            ch: RelayState.ON if ch in (1, 9) else RelayState.OFF
+            for ch in range(1, 10)
+        }
+        statuses = [RelayStatus(channel=ch, state=s) for ch, s in states.items()]
+        mask = encode_bitmask(statuses)
+        assert mask == b"\x01\x01"
+        assert decode_bitmask(mask, 9) == states
+
+    @pytest.mark.parametrize("data", [b"", b"\x00\x00", b"\x04"])
+    def test_rejects_bad_masks(self, data: bytes) -> None:
+        with pytest.raises(ValueError):
+            decode_bitmask(data, 2)
+
+
+class TestCompactGet:
+    def test_bitmask(self, client: TestClient, service: RelayService) -> None:
+        service.set_channel(2, RelayState.ON)
+        resp = client.get("/api/v1/relays", headers={"Accept": BITMASK})
+        assert resp.headers["content-type"] == BITMASK
+        assert "Accept" in resp.headers["vary"]
+        assert resp.content == b"\x02"
+
+    def test_versioned_bitmask(
+        self, client: TestClient, service: RelayService
+    ) -> None:
+        service.set_channel(1, RelayState.ON)
+        resp = client.get("/api/v1/relays", headers={"Accept": VERSIONED_BITMASK})
+        assert struct.unpack("<QHB", resp.content) == (1, 2, 0b01)
+
+    def test_msgpack(self, client: TestClient, service: RelayService) -> None:
+        service.set_all_channels(RelayState.ON)
+        resp = client.get("/api/v1/relays", headers={"Accept": MSGPACK})
+        assert msgpack.unpackb(resp.content) == {
+            "version": 1,
+            "channels": 2,
+            "mask": b"\x03",
+        }
+
+    def test_msgpack_beyond_64_channels(self) -> None:
+        statuses = [
+            RelayStatus(channel=ch, state=RelayState.ON if ch == 80 else RelayState.OFF)
+            for ch in range(1, 81)
+        ]
+        body = msgpack.unpackb(encode_states(MSGPACK, statuses, 7))
+        assert body["channels"] == 80
+        assert int.from_bytes(body["mask"], "little") == 1 << 79
+
+    def test_json_is_default(self, client: TestClient) -> None:
+        resp = client.get("/api/v1/relays")
+        assert resp.json()["channels"][0] == {"channel": 1, "state": "off"}
+
+
+class TestBitmaskPut:
+    def test_sets_each_channel(
+        self, client: TestClient, service: RelayService
+    ) -> None:
+        resp = client.put(
+            "/api/v1/relays",
+            content=b"\x02",
+            headers={"Content-Type": BITMASK},
+        )
+        assert resp.status_code == 200
+        assert [c["state"] for c in resp.json()["channels"]] == ["off", "on"]
+        assert service.get_channel(2).state == RelayState.ON
+
+    def test_responds_in_accepted_encoding(self, client: TestClient) -> None:
+        resp = client.put(
+            "/api/v1/relays",
+            content=b"\x03",
+            headers={"Content-Type": BITMASK, "Accept": BITMASK},
+        )
+        assert resp.content == b"\x03"
+
+    def test_bad_mask_is_422(
+        self, client: TestClient, service: RelayService
+    ) -> None:
+        resp = client.put(
+            "/api/v1/relays",
+            content=b"\xff",
+            headers={"Content-Type": BITMASK},
+        )
+        assert resp.status_code == 422
+        assert service.state_version == 0
+
+    def test_idempotent_replay(self, client: TestClient) -> None:
+        headers = {"Content-Type": BITMASK, "Idempotency-Key": "mask-1"}
+        client.put("/api/v1/relays", content=b"\x01", headers=headers)
+        resp = client.put("/api/v1/relays", content=b"\x01", headers=headers)
+        assert resp.headers["Idempotent-Replayed"] == "true"
+        conflict = client.put("/api/v1/relays", content=b"\x02", headers=headers)
+        assert conflict.status_code == 409
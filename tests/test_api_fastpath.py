@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.api import fastpath
+from app.api.fastpath import (
+    StateResponseCache,
+    dumps,
+    parse_relay_command,
+    render_status,
+    render_statuses,
+)
+from app.models.schemas import RelayAllStatus, RelayState, RelayStatus
+from app.services.relay_service import RelayService
+
+
+class TestRendering:
+    def test_render_status_matches_pydantic(self) -> None:
+        expected = RelayStatus(channel=1, state=RelayState.ON).model_dump(mode="json")
+        assert json.loads(render_status(1, RelayState.ON)) == expected
+
+    def test_render_statuses_matches_pydantic(self, service: RelayService) -> None:
+        statuses = service.get_all_channels()
+        expected = RelayAllStatus(channels=statuses).model_dump(mode="json")
+        assert json.loads(render_statuses(statuses)) == expected
+
+    def test_dumps_without_orjson(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(fastpath, "orjson", None)
+        assert dumps({"state": "on"}) == b'{"state":"on"}'
+
+
+class TestStateResponseCache:
+    def test_reuses_body_while_version_unchanged(
+        self, service: RelayService
+    ) -> None:
+        cache = StateResponseCache()
+        assert cache.render_all(service) is cache.render_all(service)
+
+    def test_rerenders_after_state_change(self, service: RelayService) -> None:
+        cache = StateResponseCache()
+        before = cache.render_all(service)
+        service.set_channel(1, RelayState.ON)
+        after = cache.render_all(service)
+        assert before != after
+        assert json.loads(after)["channels"][0]["state"] == "on"
+
+    def test_distinguishes_services(
+        self, service: RelayService, service_disconnected: RelayService
+    ) -> None:
+        cache = StateResponseCache()
+        service.set_channel(1, RelayState.ON)
+        service.set_channel(1, RelayState.OFF)
+        first = cache.render_all(service)
+        assert cache.render_all(service_disconnected) is not first
+
+
+class TestCachedValidators:
+    def test_same_body_returns_cached_instance(self) -> None:
+        a = parse_relay_command(b'{"state":"on"}')
+        b = parse_relay_command(b'{"state":"on"}')
+        assert a is b
+        assert a.state == RelayState.ON
+
+    def test_cached_command_is_immutable(self) -> None:
+        command = parse_relay_command(b'{"state":"off"}')
+        with pytest.raises(ValidationError):
+            command.state = RelayState.ON  # type: ignore[misc]
+
+    def test_invalid_body_raises_every_time(self) -> None:
+        for _ in range(2):
+            with pytest.raises(ValidationError):
+                parse_relay_command(b'{"state":"maybe"}')
+
+
+class TestFastPathEndpoints:
+    def test_validation_error_shape_matches_fastapi(self, client: TestClient) -> None:
+        resp = client.put("/api/v1/relays/1", json={"state": "maybe"})
+        assert resp.status_code == 422
+        assert resp.json()["detail"][0]["loc"] == ["body", "state"]
+
+    def test_missing_body_error_shape(self, client: TestClient) -> None:
+        resp = client.put("/api/v1/relays")
+        assert resp.json()["detail"][0]["loc"] == ["body"]
+        assert resp.json()["detail"][0]["type"] == "missing"
+
+    def test_openapi_documents_manual_request_bodies(self, client: TestClient) -> None:
+        paths = client.get("/openapi.json").json()["paths"]
+        body = paths["/api/v1/relays/{channel}"]["put"]["requestBody"]
+        schema = body["content"]["application/json"]["schema"]
+        assert schema["title"] == "RelayCommand"
+        assert "requestBody" in paths["/api/v1/relays"]["put"]
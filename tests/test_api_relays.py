@@ -1,5 +1,7 @@
 from fastapi.testclient import TestClient
 
+from app.services.relay_service import RelayService
+
 
 # ─── GET /api/v1/relays ───
 
@@ -26,6 +28,54 @@ class TestGetAllRelays:
         assert channels[1]["state"] == "off"
 
 
+class TestDeltaQueries:
+    def test_full_response_carries_version(self, client: TestClient):
+        client.put("/api/v1/relays/1", json={"state": "on"})
+        data = client.get("/api/v1/relays").json()
+        assert data["version"] == 1
+        assert data["full"] is True
+
+    def test_since_version_returns_only_changes(self, client: TestClient):
+        version = client.get("/api/v1/relays").json()["version"]
+        client.put("/api/v1/relays/2", json={"state": "on"})
+        data = client.get(f"/api/v1/relays?since_version={version}").json()
+        assert data == {
+            "channels": [{"channel": 2, "state": "on"}],
+            "version": version + 1,
+            "full": False,
+        }
+
+    def test_unknown_version_returns_full_resync(self, client: TestClient):
+        data = client.get("/api/v1/relays?since_version=99").json()
+        assert data["full"] is True
+        assert len(data["channels"]) == 2
+
+    def test_channels_filter(self, client: TestClient):
+        data = client.get("/api/v1/relays?channels=2").json()
+        assert data["channels"] == [{"channel": 2, "state": "off"}]
+
+    def test_filter_combines_with_delta(self, client: TestClient):
+        client.put("/api/v1/relays", json={"state": "on"})
+        data = client.get("/api/v1/relays?since_version=0&channels=1").json()
+        assert data["channels"] == [{"channel": 1, "state": "on"}]
+        assert data["full"] is False
+
+    def test_unknown_channel_is_404(self, client: TestClient):
+        resp = client.get("/api/v1/relays?channels=1,7")
+        assert resp.status_code == 404
+
+    def test_malformed_filter_is_422(self, client: TestClient):
+        resp = client.get("/api/v1/relays?channels=1,,x")
+        assert resp.status_code == 422
+
+    def test_compact_encoding_with_query_is_406(self, client: TestClient):
+        resp = client.get(
+            "/api/v1/relays?since_version=0",
+            headers={"Accept": "application/octet-stream"},
+        )
+        assert resp.status_code == 406
+
+
 # ─── PUT /api/v1/relays ───
 
 
@@ -149,3 +199,101 @@ class TestDeviceInfo:
         data = resp.json()
         assert data["connected"] is False
         assert data["manufacturer"] == "Unknown"
+
+
+# ─── Idempotency-Key ───
+
+
+class TestIdempotencyKey:
+    def test_replay_returns_cached_response(self, client: TestClient):
+        headers = {"Idempotency-Key": "abc-123"}
+        first = client.put("/api/v1/relays/1", json={"state": "on"}, headers=headers)
+        client.put("/api/v1/relays/1", json={"state": "off"})
+        replay = client.put("/api/v1/relays/1", json={"state": "on"}, headers=headers)
+        assert replay.status_code == 200
+        assert replay.json() == first.json()
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        # The replay must not have touched the device
+        assert client.get("/api/v1/relays/1").json()["state"] == "off"
+
+    def test_replay_does_not_bump_state_version(
+        self, client: TestClient, service: RelayService
+    ):
+        headers = {"Idempotency-Key": "gate-open-1"}
+        client.put("/api/v1/relays/1", json={"state": "on"}, headers=headers)
+        version = service.state_version
+        client.put("/api/v1/relays/1", json={"state": "on"}, headers=headers)
+        assert service.state_version == version
+
+    def test_bulk_replay(self, client: TestClient):
+        headers = {"Idempotency-Key": "bulk-1"}
+        client.put("/api/v1/relays", json={"state": "on"}, headers=headers)
+        resp = client.put("/api/v1/relays", json={"state": "on"}, headers=headers)
+        assert resp.headers["Idempotent-Replayed"] == "true"
+
+    def test_key_reuse_with_different_body_returns_409(self, client: TestClient):
+        headers = {"Idempotency-Key": "reused"}
+        client.put("/api/v1/relays/1", json={"state": "on"}, headers=headers)
+        resp = client.put("/api/v1/relays/1", json={"state": "off"}, headers=headers)
+        assert resp.status_code == 409
+        assert "Idempotency-Key" in resp.json()["detail"]
+
+    def test_key_too_long_returns_422(self, client: TestClient):
+        resp = client.put(
+            "/api/v1/relays/1",
+            json={"state": "on"},
+            headers={"Idempotency-Key": "x" * 256},
+        )
+        assert resp.status_code == 422
+
+    def test_failed_command_is_not_cached(self, client: TestClient):
+        headers = {"Idempotency-Key": "bad-channel"}
+        resp = client.put("/api/v1/relays/99", json={"state": "on"}, headers=headers)
+        assert resp.status_code == 404
+        resp = client.put("/api/v1/relays/99", json={"state": "on"}, headers=headers)
+        assert "Idempotent-Replayed" not in resp.headers
+
+    def test_keys_are_scoped_per_client(self, client: TestClient):
+        headers = {"Idempotency-Key": "shared"}
+        client.put("/api/v1/relays/1", json={"state": "on"}, headers=headers)
+        other = TestClient(client.app, client=("10.0.0.2", 50000))
+        resp = other.put("/api/v1/relays/1", json={"state": "off"}, headers=headers)
+        assert resp.status_code == 200
+        assert "Idempotent-Replayed" not in resp.headers
+        assert resp.json()["state"] == "off"
+
+
+# ─── GET /api/v1/relays/scheduler ───
+
+
+class TestSchedulerStats:
+    def test_returns_all_priority_classes(self, client: TestClient):
+        client.put("/api/v1/relays/1", json={"state": "on"})
+        resp = client.get("/api/v1/relays/scheduler")
+        assert resp.status_code == 200
+        classes = resp.json()["classes"]
+        assert [c["priority"] for c in classes] == [
+            "fail_safe",
+            "interactive",
+            "background",
+        ]
+        assert classes[1]["acquisitions"] == 1
+
+
+# ─── GET /api/v1/relays/debounce ───
+
+
+class TestDebounceStats:
+    def test_returns_counters_per_channel(self, client: TestClient):
+        resp = client.get("/api/v1/relays/debounce")
+        assert resp.status_code == 200
+        channels = resp.json()["channels"]
+        assert [c["channel"] for c in channels] == [1, 2]
+        assert channels[0] == {
+            "channel": 1,
+            "min_switch_ms": 0,
+            "deferred": 0,
+            "suppressed": 0,
+            "pending": None,
+        }
@@ -1,5 +1,13 @@
+import time
+
+import pytest
 from fastapi.testclient import TestClient
 
+from app.api import dependencies
+from app.api.dependencies import init_relay_service
+from app.core.device import MockRelayDevice
+from app.core.metrics import HTTP_METRICS, SERVICE_METRICS
+
 
 class TestHealthEndpoint:
     def test_health_ok_when_connected(self, client: TestClient):
@@ -24,6 +32,29 @@ class TestHealthEndpoint:
         assert resp.json()["version"] == "1.0.0"
 
 
+class TestHealthProbes:
+    def test_liveness(self, client_disconnected: TestClient) -> None:
+        resp = client_disconnected.get("/health/live")
+        assert resp.status_code == 200
+        assert resp.json() == {"status": "ok"}
+
+    def test_ready_when_connected(self, client: TestClient) -> None:
+        resp = client.get("/health/ready")
+        assert resp.status_code == 200
+        assert resp.json()["device_connected"] is True
+
+    def test_not_ready_when_disconnected(
+        self, client_disconnected: TestClient
+    ) -> None:
+        resp = client_disconnected.get("/health/ready")
+        assert resp.status_code == 503
+        assert resp.json()["status"] == "degraded"
+
+    def test_probes_are_public(self, client_auth: TestClient) -> None:
+        assert client_auth.get("/health/live").status_code == 200
+        assert client_auth.get("/health/ready").status_code == 200
+
+
 class TestSwaggerDocs:
     def test_docs_endpoint_available(self, client: TestClient):
         resp = client.get("/docs")
@@ -40,3 +71,64 @@ class TestSwaggerDocs:
         assert schema["info"]["title"] == "Relay API"
         assert "/api/v1/relays" in schema["paths"]
         assert "/health" in schema["paths"]
+
+
+class TestMetricsEndpoint:
+    def test_prometheus_text_format(self, client: TestClient) -> None:
+        resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "relay_device_connected 1" in resp.text
+
+    def test_request_latency_by_route_template(self, client: TestClient) -> None:
+        HTTP_METRICS.reset()
+        client.put("/api/v1/relays/1", json={"state": "on"})
+        client.get("/api/v1/relays/99")
+        text = client.get("/metrics").text
+        assert (
+            'relay_http_request_duration_seconds_count{method="PUT",'
+            'route="/api/v1/relays/{channel}",status="200"} 1'
+        ) in text
+        assert 'route="/api/v1/relays/{channel}",status="404"} 1' in text
+
+    def test_device_writes_and_lock_times(self, client: TestClient) -> None:
+        SERVICE_METRICS.reset()
+        client.put("/api/v1/relays/2", json={"state": "on"})
+        text = client.get("/metrics").text
+        assert 'relay_device_write_seconds_count{channel="2"} 1' in text
+        assert 'relay_device_lock_hold_seconds_count{priority="interactive"}' in text
+        assert "relay_pulse_timers_active 0" in text
+
+    def test_device_write_errors_counted(
+        self, client: TestClient, mock_device: MockRelayDevice
+    ) -> None:
+        SERVICE_METRICS.reset()
+        mock_device.close()
+        client.put("/api/v1/relays/1", json={"state": "on"})
+        text = client.get("/metrics").text
+        assert 'relay_device_write_errors_total{channel="1"} 1' in text
+        assert "relay_device_connected 0" in text
+
+    def test_public_when_auth_enabled(self, client_auth: TestClient) -> None:
+        assert client_auth.get("/metrics").status_code == 200
+
+
+class TestLifespan:
+    def test_device_opens_in_background(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        from app.main import app
+
+        monkeypatch.setattr("app.config.settings.mock", True)
+        try:
+            with TestClient(app) as lifespan_client:
+                service = dependencies._relay_service
+                assert service is not None
+                deadline = time.monotonic() + 5.0
+                while not service.is_device_connected:
+                    assert time.monotonic() < deadline, "device never opened"
+                    time.sleep(0.01)
+                assert lifespan_client.get("/health").json()["status"] == "ok"
+            assert service.is_device_connected is False
+        finally:
+            init_relay_service(None)  # type: ignore[arg-type]
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.device import MockRelayDevice
+from app.core.exceptions import RelayError
+from app.models.schemas import RelayState
+from app.services.relay_service import RelayService
+
+WS_URL = "/api/v1/relays/ws"
+
+
+class TestWebSocketCommands:
+    def test_set_channel_acks_with_id(
+        self, client: TestClient, mock_device: MockRelayDevice
+    ) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 7, "op": "set", "ch": 1, "state": "on"})
+            ack = ws.receive_json()
+        assert ack == {"id": 7, "ok": True, "ch": 1, "state": "on"}
+        assert mock_device._states[1] is True
+
+    def test_get_and_get_all(
+        self, client: TestClient, service: RelayService
+    ) -> None:
+        service.set_channel(2, RelayState.ON)
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "op": "get", "ch": 2})
+            ws.send_json({"id": 2, "op": "get_all"})
+            assert ws.receive_json()["state"] == "on"
+            assert ws.receive_json()["states"] == ["off", "on"]
+
+    def test_set_all(self, client: TestClient, service: RelayService) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": "a", "op": "set_all", "state": "on"})
+            ack = ws.receive_json()
+        assert ack == {"id": "a", "ok": True, "states": ["on", "on"]}
+        assert all(s.state == RelayState.ON for s in service.get_all_channels())
+
+    def test_pipelined_commands_acked_in_order(
+        self, client: TestClient, service: RelayService
+    ) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            for i in range(20):
+                state = "on" if i % 2 == 0 else "off"
+                ws.send_json({"id": i, "op": "set", "ch": 1, "state": state})
+            acks = [ws.receive_json() for _ in range(20)]
+        assert [a["id"] for a in acks] == list(range(20))
+        assert all(a["ok"] for a in acks)
+        assert service.get_channel(1).state == RelayState.OFF
+
+    def test_ping(self, client: TestClient) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 3, "op": "ping"})
+            assert ws.receive_json() == {"id": 3, "ok": True}
+
+
+class TestWebSocketErrors:
+    def test_invalid_channel_returns_404_ack(self, client: TestClient) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "op": "set", "ch": 99, "state": "on"})
+            ack = ws.receive_json()
+            assert ack["ok"] is False
+            assert ack["code"] == 404
+            # Connection stays usable after a failed command
+            ws.send_json({"id": 2, "op": "ping"})
+            assert ws.receive_json()["ok"] is True
+
+    @pytest.mark.parametrize(
+        "msg",
+        [
+            {"id": 1, "op": "set", "ch": 1, "state": "maybe"},
+            {"id": 1, "op": "set", "ch": "1", "state": "on"},
+            {"id": 1, "op": "set", "ch": True, "state": "on"},
+        ],
+    )
+    def test_invalid_payload_returns_422_ack(
+        self, client: TestClient, msg: dict[str, object]
+    ) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json(msg)
+            ack = ws.receive_json()
+        assert ack["ok"] is False
+        assert ack["code"] == 422
+
+    def test_unknown_op_returns_400_ack(self, client: TestClient) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "op": "explode"})
+            assert ws.receive_json()["code"] == 400
+
+    def test_malformed_json_returns_400_ack(self, client: TestClient) -> None:
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_text("{not json")
+            ack = ws.receive_json()
+        assert ack["code"] == 400
+
+    def test_disconnected_device_returns_503_ack(
+        self, client_disconnected: TestClient
+    ) -> None:
+        with client_disconnected.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "op": "set", "ch": 1, "state": "on"})
+            ack = ws.receive_json()
+        assert ack["code"] == 503
+
+    def test_other_relay_error_returns_500_ack(
+        self,
+        client: TestClient,
+        service: RelayService,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        def fail(*args: object, **kwargs: object) -> None:
+            raise RelayError("owner failed")
+
+        monkeypatch.setattr(service, "set_channel", fail)
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "op": "set", "ch": 1, "state": "on"})
+            ack = ws.receive_json()
+            assert ack == {"id": 1, "ok": False, "code": 500, "error": "owner failed"}
+            ws.send_json({"id": 2, "op": "ping"})
+            assert ws.receive_json()["ok"] is True
+
+
+class TestWebSocketAuth:
+    def test_header_key_authenticates(self, client_auth: TestClient) -> None:
+        with client_auth.websocket_connect(
+            WS_URL, headers={"X-API-Key": "test-key"}
+        ) as ws:
+            ws.send_json({"id": 1, "op": "ping"})
+            assert ws.receive_json()["ok"] is True
+
+    def test_auth_frame_authenticates(self, client_auth: TestClient) -> None:
+        with client_auth.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 0, "op": "auth", "key": "test-key"})
+            assert ws.receive_json() == {"id": 0, "ok": True}
+            ws.send_json({"id": 1, "op": "get", "ch": 1})
+            assert ws.receive_json()["ok"] is True
+
+    def test_wrong_key_closes_connection(self, client_auth: TestClient) -> None:
+        with client_auth.websocket_connect(WS_URL) as ws:
+            ws.send_json({"op": "auth", "key": "wrong-key"})
+            ack = ws.receive_json()
+            assert ack["code"] == 401
+            assert "Invalid or missing" in ack["error"]
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                ws.receive_json()
+        assert exc_info.value.code == 1008
+
+    def test_command_before_auth_is_rejected(
+        self, client_auth: TestClient, service: RelayService
+    ) -> None:
+        with client_auth.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "op": "set", "ch": 1, "state": "on"})
+            assert ws.receive_json()["code"] == 401
+        assert service.get_channel(1).state == RelayState.OFF
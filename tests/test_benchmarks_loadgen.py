@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from benchmarks.loadgen import Sample, Target, drive, parse_mix, report, summarize
+
+
+# ─── Helpers ───
+
+
+async def _stub_server(stall_s: float) -> asyncio.Server:
+    """HTTP/1.1 keep-alive server answering every request after ``stall_s``."""
+    body = b'{"ok": true}'
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+                await asyncio.sleep(stall_s)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s"
+                    % (len(body), body)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def _run(stall_s: float, connections: int) -> list[Sample]:
+    async def main() -> list[Sample]:
+        server = await _stub_server(stall_s)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            samples, _, _ = await drive(
+                Target("127.0.0.1", port, "", 2),
+                rate=200.0,
+                duration=0.25,
+                mix={"get": 1.0, "put": 1.0},
+                connections=connections,
+                timeout=5.0,
+                seed=1,
+            )
+        return samples
+
+    return asyncio.run(main())
+
+
+class TestParseMix:
+    def test_weights(self) -> None:
+        assert parse_mix("get=60, put=30,burn") == {
+            "get": 60.0,
+            "put": 30.0,
+            "burn": 1.0,
+        }
+
+    def test_unknown_kind(self) -> None:
+        with pytest.raises(ValueError, match="Unknown request kind"):
+            parse_mix("delete=1")
+
+
+class TestSummarize:
+    def test_latency_counts_from_scheduled_time(self) -> None:
+        # Sent 90 ms late (queued behind a stall), answered 10 ms after send.
+        samples = [Sample("get", 0.0, 0.09, 0.1, 200)]
+        result = summarize(samples, wall=1.0)
+        assert result["p50_us"] == pytest.approx(100_000)
+        assert result["service_p50_us"] == pytest.approx(10_000)
+
+    def test_errors_and_throughput(self) -> None:
+        samples = [
+            Sample("get", 0.0, 0.0, 0.001, 200),
+            Sample("get", 0.0, 0.0, 0.001, 503),
+            Sample("get", 0.0, 0.0, 0.001, 0),
+            Sample("get", 0.0, 0.0, 0.001, 204),
+        ]
+        result = summarize(samples, wall=2.0)
+        assert result["errors"] == 2
+        assert result["error_rate"] == 0.5
+        assert result["throughput"] == 1.0
+
+    def test_report_groups_by_kind(self) -> None:
+        samples = [
+            Sample("get", 0.0, 0.0, 0.001, 200),
+            Sample("put", 0.0, 0.0, 0.001, 200),
+        ]
+        assert set(report(samples, wall=1.0)) == {"all", "get", "put"}
+
+
+class TestDrive:
+    def test_issues_the_scheduled_requests(self) -> None:
+        samples = _run(stall_s=0.0, connections=8)
+        assert len(samples) == 50
+        assert {s.kind for s in samples} == {"get", "put"}
+        assert all(s.status == 200 for s in samples)
+
+    def test_queueing_behind_a_slow_server_is_counted(self) -> None:
+        # One connection, 20 ms per response, a request every 5 ms: requests
+        # queue in the client, which a closed-loop client would never see.
+        result = summarize(_run(stall_s=0.02, connections=1), wall=1.0)
+        assert result["service_p50_us"] < 40_000
+        assert result["p99_us"] > 3 * result["service_p99_us"]
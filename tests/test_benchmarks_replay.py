@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from datetime import datetime
+
+import pytest
+
+from app.core.clock import VirtualClock
+from app.core.device import MockRelayDevice
+from app.models.schemas import RelayState
+from app.services.relay_service import RelayService
+from benchmarks.loadgen import Target
+from benchmarks.replay import Command, parse_audit, replay, requests_for
+
+
+def _audit_line(ts: str, record: str) -> str:
+    """A relay.audit record as the default log format writes it."""
+    asctime = ts[:19].replace("T", " ") + "," + ts[20:23]
+    return f"{asctime} | INFO     | relay.audit | {ts}+00:00 | {record}"
+
+
+_LOG = [
+    "2026-10-19 09:00:00,000 | INFO     | app.main | Relay API started",
+    _audit_line("2026-10-19T09:00:00.000100", "fail_safe | all → off"),
+    _audit_line("2026-10-19T09:00:01.000000", "set_channel | channel=1 → on"),
+    _audit_line("2026-10-19T09:00:01.300000", "pulse_off | channel=1 → off"),
+    _audit_line("2026-10-19T09:00:02.000000", "set_channels | channel=1 → on"),
+    _audit_line("2026-10-19T09:00:02.000000", "set_channels | channel=2 → off"),
+    # Bare message, as with a "%(message)s" audit handler.
+    "2026-10-19T09:00:02.500000+00:00 | set_all_channels | all → off",
+]
+
+
+# ─── Helpers ───
+
+
+class _TickingClock(VirtualClock):
+    """Virtual clock whose wall time moves 1 ms every time it is read."""
+
+    def now(self) -> datetime:
+        self.advance(0.001)
+        return super().now()
+
+
+def _commands(n: int, channels: int) -> list[Command]:
+    """``n`` alternating writes spread over ``channels`` channels, 1 ms apart."""
+    return [
+        Command(
+            i / 1000.0,
+            "set_channel",
+            {i % channels + 1: RelayState.ON if i % 2 == 0 else RelayState.OFF},
+        )
+        for i in range(n)
+    ]
+
+
+def _replay(commands: list[Command], channels: int) -> list[tuple[str, bytes]]:
+    """Replay against a stub server with random stalls; requests it saw."""
+    seen: list[tuple[str, bytes]] = []
+    body = b'{"ok": true}'
+    rng = random.Random(7)
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.split(b"\r\n")
+                length = 0
+                for line in lines:
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                payload = await reader.readexactly(length)
+                await asyncio.sleep(rng.uniform(0.0, 0.005))
+                seen.append((lines[0].split()[1].decode(), payload))
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s"
+                    % (len(body), body)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def main() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            samples, _ = await replay(
+                Target("127.0.0.1", port, "", channels),
+                commands,
+                speed=10.0,
+                connections=16,
+                timeout=5.0,
+            )
+        assert len(samples) == len(seen)
+
+    asyncio.run(main())
+    return seen
+
+
+class TestParseAudit:
+    def test_parses_and_skips(self) -> None:
+        commands, skipped = parse_audit(_LOG)
+        assert [c.action for c in commands] == [
+            "set_channel",
+            "set_channels",
+            "set_all_channels",
+        ]
+        assert skipped == {"fail_safe": 1, "pulse_off": 1}
+
+    def test_bulk_records_are_merged(self) -> None:
+        commands, _ = parse_audit(_LOG)
+        assert commands[1].states == {1: RelayState.ON, 2: RelayState.OFF}
+        assert commands[2].all_state == RelayState.OFF
+
+    def test_keeps_recorded_timing(self) -> None:
+        commands, _ = parse_audit(_LOG)
+        gaps = [b.at - a.at for a, b in zip(commands, commands[1:])]
+        assert gaps == [1.0, 0.5]
+
+    def test_merges_bulk_writes_as_the_service_logs_them(
+        self, mock_device: MockRelayDevice, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        service = RelayService(mock_device, channels=2, clock=_TickingClock())
+        with caplog.at_level(logging.INFO, logger="relay.audit"):
+            service.set_channels({1: RelayState.ON, 2: RelayState.OFF})
+            service.set_channels({1: RelayState.OFF, 2: RelayState.ON})
+        commands, _ = parse_audit(
+            r.getMessage() for r in caplog.records if r.name == "relay.audit"
+        )
+        assert [c.states for c in commands] == [
+            {1: RelayState.ON, 2: RelayState.OFF},
+            {1: RelayState.OFF, 2: RelayState.ON},
+        ]
+
+
+class TestRequestsFor:
+    def test_bulk_covering_every_channel_is_one_bitmask_put(self) -> None:
+        target = Target("h", 1, "", 2)
+        command = Command(0.0, "set_channels", {1: RelayState.OFF, 2: RelayState.ON})
+        [(channels, (head, body), kind)] = requests_for(command, target)
+        assert channels == (1, 2)
+        assert head.startswith(b"PUT /api/v1/relays HTTP/1.1")
+        assert b"application/octet-stream" in head
+        assert body == b"\x02"
+        assert kind == "bulk"
+
+    def test_partial_bulk_is_split_per_channel(self) -> None:
+        target = Target("h", 1, "", 4)
+        command = Command(0.0, "set_channels", {1: RelayState.ON, 3: RelayState.ON})
+        requests = requests_for(command, target)
+        assert [r[0] for r in requests] == [(1,), (3,)]
+
+
+class TestReplay:
+    def test_per_channel_order_is_preserved(self) -> None:
+        commands = _commands(60, channels=3)
+        seen = _replay(commands, channels=3)
+        assert len(seen) == 60
+        for ch in (1, 2, 3):
+            expected = [c.states[ch].value for c in commands if ch in c.states]
+            sent = [
+                body.decode().split('"')[3]
+                for path, body in seen
+                if path == f"/api/v1/relays/{ch}"
+            ]
+            assert sent == expected
+
+    def test_bulk_waits_for_earlier_channel_writes(self) -> None:
+        commands = _commands(10, channels=2)
+        commands.append(Command(0.01, "set_all_channels", all_state=RelayState.OFF))
+        commands.append(Command(0.01, "set_channel", {1: RelayState.ON}))
+        seen = _replay(commands, channels=2)
+        paths = [path for path, _ in seen]
+        bulk = paths.index("/api/v1/relays")
+        assert bulk == 10
+        assert paths[11] == "/api/v1/relays/1"
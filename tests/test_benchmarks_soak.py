@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.main import app
+from benchmarks.soak import Sample, find_leaks, soak, sustained_growth
+
+
+# ─── Helpers ───
+
+
+def _samples(traced: list[float]) -> list[Sample]:
+    return [Sample(float(i), i, 3, 4, 0, mib, 50.0) for i, mib in enumerate(traced)]
+
+
+class TestSustainedGrowth:
+    def test_steady_noise_is_not_growth(self) -> None:
+        assert sustained_growth([10.0, 14.0, 9.0, 13.0] * 8, tolerance=1.0) is None
+
+    def test_steady_rise_is_growth(self) -> None:
+        growth = sustained_growth([i * 0.5 for i in range(40)], tolerance=1.0)
+        assert growth == pytest.approx(15.0)
+
+    def test_rise_within_tolerance(self) -> None:
+        assert sustained_growth([i * 0.01 for i in range(40)], tolerance=1.0) is None
+
+    def test_rise_then_fall_is_not_sustained(self) -> None:
+        values = [0.0] * 10 + [5.0] * 10 + [1.0] * 10 + [6.0] * 10
+        assert sustained_growth(values, tolerance=1.0) is None
+
+    def test_find_leaks_names_the_metric(self) -> None:
+        samples = _samples([10.0 + i for i in range(20)])
+        leaks = find_leaks(samples, {"threads": 2.0, "traced_mib": 2.0})
+        assert list(leaks) == ["traced_mib"]
+
+
+class TestSoak:
+    def test_short_run(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr("app.config.settings.mock", True)
+        monkeypatch.setattr("app.config.settings.pulse_ms", 5)
+        outcome = asyncio.run(
+            soak(
+                app,
+                duration=1.0,
+                rate=400.0,
+                clients=1000,
+                concurrency=8,
+                sample_every=0.1,
+            )
+        )
+        assert len(outcome.samples) >= 5
+        assert outcome.statuses["pulse 200"] > 0
+        assert outcome.statuses["bulk 200"] > 0
+        assert outcome.statuses["burn 200"] > 0
+        assert "threads_after_drain" not in outcome.leaks
+        assert outcome.top_growth
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.suite import compare, run, scenarios, summarize
+
+
+class TestSummarize:
+    def test_percentiles_in_microseconds(self) -> None:
+        samples = [i / 1e6 for i in range(1, 101)]
+        result = summarize(samples, wall_s=0.5)
+        assert result["ops"] == 100
+        assert result["median_us"] == pytest.approx(50.5)
+        assert result["p99_us"] == pytest.approx(100.0)
+        assert result["ops_per_sec"] == pytest.approx(200.0)
+
+
+class TestCompare:
+    def test_flags_only_slowdowns_past_threshold(self) -> None:
+        baseline = {
+            "a": {"median_us": 10.0},
+            "b": {"median_us": 10.0},
+            "c": {"median_us": 10.0},
+        }
+        current = {
+            "a": {"median_us": 11.0},
+            "b": {"median_us": 13.0},
+            "c": {"median_us": 5.0},
+            "new": {"median_us": 99.0},
+        }
+        assert compare(baseline, current, threshold=0.2) == ["b"]
+
+
+class TestRun:
+    def test_every_scenario_produces_samples(self) -> None:
+        for name, scenario in scenarios(write_latency_s=0.0).items():
+            assert scenario(16), name
+
+    def test_only_filters_scenarios(self) -> None:
+        results = run(ops=20, repeat=1, write_latency_s=0.0, only="single.get")
+        assert list(results) == ["single.get_all_channels"]
+        assert results["single.get_all_channels"]["ops"] == 20
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.core.clock import SystemClock, VirtualClock
+
+
+# ─── Helpers ───
+
+
+def _blocked_waiter(
+    clock: VirtualClock, event: threading.Event, timeout_s: float
+) -> tuple[threading.Thread, list[tuple[float, bool]]]:
+    """A clock thread waiting on ``event``; its (wake time, result)."""
+    woke: list[tuple[float, bool]] = []
+
+    def run() -> None:
+        result = clock.wait(event, timeout_s)
+        woke.append((clock.monotonic(), result))
+
+    thread = clock.thread(run, name="waiter")
+    thread.start()
+    return thread, woke
+
+
+class TestVirtualClockTimers:
+    def test_fire_in_due_order_at_their_due_time(self) -> None:
+        clock = VirtualClock(start=10.0)
+        fired: list[tuple[str, float]] = []
+
+        def fire(name: str) -> None:
+            fired.append((name, clock.monotonic()))
+
+        for name, delay in (("b", 2.0), ("a", 1.0), ("c", 2.0)):
+            clock.timer(delay, fire, (name,)).start()
+        clock.advance(1.5)
+        assert fired == [("a", 11.0)]
+        clock.advance(0.5)
+        assert fired == [("a", 11.0), ("b", 12.0), ("c", 12.0)]
+        assert clock.monotonic() == 12.0
+
+    def test_cancelled_timer_never_fires(self) -> None:
+        clock = VirtualClock()
+        fired: list[int] = []
+        timer = clock.timer(1.0, fired.append, (1,))
+        timer.start()
+        assert clock.pending == 1
+        timer.cancel()
+        assert clock.pending == 0
+        clock.advance(5.0)
+        assert fired == []
+
+    def test_timer_armed_by_a_timer_fires_in_the_same_advance(self) -> None:
+        clock = VirtualClock()
+        fired: list[float] = []
+
+        def tick() -> None:
+            fired.append(clock.monotonic())
+            if len(fired) < 3:
+                clock.timer(1.0, tick).start()
+
+        clock.timer(1.0, tick).start()
+        clock.advance(10.0)
+        assert fired == [1.0, 2.0, 3.0]
+
+    def test_wall_time_follows_monotonic(self) -> None:
+        clock = VirtualClock(wall_start=86_400.0)
+        clock.advance(61.5)
+        assert clock.time() == 86_461.5
+        assert clock.now().isoformat() == "1970-01-02T00:01:01.500000+00:00"
+
+
+class TestVirtualClockWait:
+    def test_wait_returns_when_virtual_time_passes(self) -> None:
+        clock = VirtualClock()
+        thread, woke = _blocked_waiter(clock, threading.Event(), 30.0)
+        clock.advance(29.0)
+        assert woke == []
+        clock.advance(1.0)
+        # advance() returned only after the waiter ran to completion.
+        assert woke == [(30.0, False)]
+        thread.join(timeout=1.0)
+
+    def test_event_wakes_a_waiter_early(self) -> None:
+        clock = VirtualClock()
+        event = threading.Event()
+        thread, woke = _blocked_waiter(clock, event, 3600.0)
+        event.set()
+        thread.join(timeout=1.0)
+        assert woke == [(0.0, True)]
+        assert clock.pending == 0
+
+    def test_busy_clock_thread_fails_advance(self) -> None:
+        clock = VirtualClock(settle_timeout_s=0.05)
+        stop = threading.Event()
+        thread = clock.thread(stop.wait, (1.0,))
+        thread.start()
+        with pytest.raises(RuntimeError, match="still running"):
+            clock.advance(1.0)
+        stop.set()
+        thread.join()
+
+
+class TestSystemClock:
+    def test_named_daemon_timer(self) -> None:
+        fired = threading.Event()
+        timer = SystemClock().timer(0.01, fired.set, name="relay-pulse-ch1")
+        assert timer.name == "relay-pulse-ch1"
+        assert timer.daemon is True
+        timer.start()
+        assert fired.wait(timeout=2.0)
+
+    def test_wait(self) -> None:
+        start = time.monotonic()
+        assert SystemClock().wait(threading.Event(), 0.01) is False
+        assert time.monotonic() - start >= 0.01
@@ -1,3 +1,6 @@
+import subprocess
+import sys
+
 import pytest
 
 from app.core.device import HIDRelayDevice, MockRelayDevice, RelayDevice
@@ -62,6 +65,18 @@ class TestHIDRelayDeviceWithoutHardware:
         device.close()
 
 
+class TestLazyHIDImport:
+    def test_hid_not_imported_until_open(self):
+        code = (
+            "import sys; import app.core.device, app.services.factory; "
+            "print('hid' in sys.modules)"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert out.stdout.strip() == "False"
+
+
 class TestMockRelayDevice:
     def test_open_sets_is_open(self):
         device = MockRelayDevice()
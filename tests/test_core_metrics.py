@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import math
+
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+
+
+class TestCounter:
+    def test_inc_per_label_set(self) -> None:
+        counter = Counter("c_total", "help", ("channel",))
+        counter.inc("1")
+        counter.inc("1")
+        counter.inc("2", amount=3)
+        assert counter.value("1") == 2
+        assert counter.value("2") == 3
+        assert counter.value("3") == 0
+
+    def test_render_exposition(self) -> None:
+        counter = Counter("c_total", "Things.", ("channel",))
+        counter.inc("1")
+        assert counter.render() == [
+            "# HELP c_total Things.",
+            "# TYPE c_total counter",
+            'c_total{channel="1"} 1',
+        ]
+
+    def test_label_values_escaped(self) -> None:
+        counter = Counter("c_total", "help", ("route",))
+        counter.inc('a"b\\c')
+        assert counter.render()[-1] == 'c_total{route="a\\"b\\\\c"} 1'
+
+
+class TestGauge:
+    def test_set_overwrites(self) -> None:
+        gauge = Gauge("g", "help")
+        gauge.set(5)
+        gauge.set(2)
+        assert gauge.render()[1] == "# TYPE g gauge"
+        assert gauge.render()[-1] == "g 2"
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self) -> None:
+        hist = Histogram("h_seconds", "help", buckets=(0.1, 1.0))
+        hist.observe(0.05)
+        hist.observe(0.1)
+        hist.observe(0.5)
+        hist.observe(5.0)
+        assert hist.render()[2:] == [
+            'h_seconds_bucket{le="0.1"} 2',
+            'h_seconds_bucket{le="1"} 3',
+            'h_seconds_bucket{le="+Inf"} 4',
+            "h_seconds_sum 5.65",
+            "h_seconds_count 4",
+        ]
+        assert hist.count() == 4
+
+    def test_labels_precede_le(self) -> None:
+        hist = Histogram("h", "help", ("priority",), buckets=(1.0,))
+        hist.observe(math.inf, "fail_safe")
+        assert 'h_bucket{priority="fail_safe",le="+Inf"} 1' in hist.render()
+
+
+class TestRegistry:
+    def test_render_and_reset(self) -> None:
+        registry = Registry()
+        counter = Counter("c_total", "help")
+        registry.register(counter)
+        counter.inc()
+        assert registry.render().endswith("c_total 1\n")
+        registry.reset()
+        assert "c_total 1" not in registry.render()
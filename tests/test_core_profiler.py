@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from app.core import profiler
+from app.core.exceptions import ProfilerBusyError
+
+
+# ─── Helpers ───
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(100))
+
+
+@pytest.fixture()
+def spinner() -> Iterator[threading.Thread]:
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,), name="relay-test-spin")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def _in_background(
+    **kwargs: Any,
+) -> tuple[threading.Thread, list[profiler.Profile]]:
+    """Run :func:`profiler.sample` on another thread; its result list."""
+    result: list[profiler.Profile] = []
+    thread = threading.Thread(target=lambda: result.append(profiler.sample(**kwargs)))
+    thread.start()
+    return thread, result
+
+
+class TestSample:
+    @pytest.mark.usefixtures("spinner")
+    def test_collapsed_stacks_are_rooted_at_the_thread(self) -> None:
+        profile = profiler.sample(0.05, 0.005)
+        assert profile.samples >= 2
+        lines = profile.collapsed().splitlines()
+        spin = [line for line in lines if line.startswith("relay-test-spin;")]
+        assert spin
+        stack, count = spin[0].rsplit(" ", 1)
+        assert int(count) >= 1
+        assert "tests.test_core_profiler:_spin" in stack.split(";")
+        # The sampling thread never profiles itself.
+        assert not any("profiler:sample" in line for line in lines)
+
+    @pytest.mark.usefixtures("spinner")
+    def test_codes_keep_only_matching_stacks(self) -> None:
+        profile = profiler.sample(0.05, 0.005, frozenset({_spin.__code__}))
+        assert profile.stacks
+        assert all(":_spin" in stack for stack in profile.stacks)
+
+    def test_default_thread_names_are_merged(self) -> None:
+        assert profiler._thread_label("Thread-12 (run)") == "Thread (run)"
+        assert profiler._thread_label("relay-pulse-ch1") == "relay-pulse-ch1"
+
+    def test_one_profile_at_a_time(self) -> None:
+        thread, _ = _in_background(duration_s=0.5, interval_s=0.01)
+        time.sleep(0.05)
+        with pytest.raises(ProfilerBusyError):
+            profiler.sample(0.01, 0.01)
+        thread.join()
+        profiler.sample(0.01, 0.01)
+
+
+class TestRequestWatch:
+    def test_stops_after_matching_requests(self) -> None:
+        thread, result = _in_background(
+            duration_s=10.0,
+            interval_s=0.005,
+            route="/api/v1/relays/{channel}",
+            method="PUT",
+            requests=2,
+        )
+        time.sleep(0.05)
+        profiler.request_finished("GET", "/api/v1/relays/{channel}")
+        profiler.request_finished("PUT", "/api/v1/relays")
+        profiler.request_finished("PUT", "/api/v1/relays/{channel}")
+        profiler.request_finished("PUT", "/api/v1/relays/{channel}")
+        thread.join(timeout=5.0)
+        assert not thread.is_alive()
+        assert result[0].requests == 2
+        assert result[0].duration_s < 5.0
+
+    def test_idle_hook_is_a_no_op(self) -> None:
+        profiler.request_finished("GET", "/health")
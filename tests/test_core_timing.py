@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import timing
+
+
+def _phases(header: str) -> dict[str, float]:
+    return {
+        name: float(dur)
+        for name, dur in re.findall(r"(\w+);dur=([\d.]+)", header)
+    }
+
+
+class TestTimingContext:
+    def test_record_outside_request_is_noop(self) -> None:
+        assert timing.active() is False
+        timing.record("device", 1.0)
+        with timing.phase("audit"):
+            pass
+
+    def test_records_accumulate_per_phase(self) -> None:
+        phases, token = timing.begin()
+        try:
+            timing.record("device", 0.001)
+            timing.record("device", 0.002)
+            with timing.phase("audit"):
+                pass
+        finally:
+            timing.end(token)
+        assert phases["device"] == pytest.approx(0.003)
+        assert "audit" in phases
+        assert timing.active() is False
+
+    def test_header_format(self) -> None:
+        header = timing.header({"lock": 0.0005, "total": 0.0123})
+        assert header == "lock;dur=0.500, total;dur=12.300"
+
+
+class TestServerTimingHeader:
+    def test_absent_by_default(self, client: TestClient) -> None:
+        resp = client.put("/api/v1/relays/1", json={"state": "on"})
+        assert "server-timing" not in resp.headers
+
+    def test_phases_of_a_relay_write(
+        self, client_auth: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("app.config.settings.server_timing", True)
+        resp = client_auth.put(
+            "/api/v1/relays/1",
+            json={"state": "on"},
+            headers={"X-API-Key": "test-key"},
+        )
+        assert resp.status_code == 200
+        phases = _phases(resp.headers["server-timing"])
+        assert {"auth", "lock", "device", "audit", "total"} <= set(phases)
+        assert phases["total"] >= phases["device"]
+
+    def test_serialization_phase(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("app.config.settings.server_timing", True)
+        resp = client.get(
+            "/api/v1/relays", headers={"Accept": "application/octet-stream"}
+        )
+        assert "serialize" in _phases(resp.headers["server-timing"])
+
+    def test_rejected_request_is_timed(
+        self, client_auth: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("app.config.settings.server_timing", True)
+        resp = client_auth.get("/api/v1/relays")
+        assert resp.status_code == 401
+        assert set(_phases(resp.headers["server-timing"])) == {"auth", "total"}
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import socket
+import struct
+import threading
+from collections.abc import Generator
+
+import pytest
+
+from app.core.device import MockRelayDevice
+from app.frontends.modbus import ModbusTCPServer, pack_coils, unpack_coils
+from app.models.schemas import RelayState
+from app.services.events import EventType
+from app.services.relay_service import RelayService
+
+
+# ─── Helpers ───
+
+
+class _ModbusClient:
+    """Minimal blocking Modbus TCP client."""
+
+    def __init__(self, port: int) -> None:
+        self._sock = socket.create_connection(("127.0.0.1", port), timeout=5.0)
+        self._tid = 0
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def request(self, pdu: bytes, unit: int = 1) -> bytes:
+        self._tid = (self._tid + 1) & 0xFFFF
+        self._sock.sendall(struct.pack(">HHHB", self._tid, 0, len(pdu) + 1, unit) + pdu)
+        tid, protocol, length, reply_unit = struct.unpack(">HHHB", self._recv(7))
+        assert (tid, protocol, reply_unit) == (self._tid, 0, unit)
+        return self._recv(length - 1)
+
+    def read_coils(self, address: int, count: int) -> bytes:
+        return self.request(struct.pack(">BHH", 0x01, address, count))
+
+    def write_coil(self, address: int, on: bool) -> bytes:
+        return self.request(struct.pack(">BHH", 0x05, address, 0xFF00 if on else 0))
+
+    def write_coils(self, address: int, coils: list[bool]) -> bytes:
+        data = pack_coils(coils)
+        return self.request(
+            struct.pack(">BHHB", 0x0F, address, len(coils), len(data)) + data
+        )
+
+    def _recv(self, n: int) -> bytes:
+        buf = b""
+        while len(buf) < n:
+            chunk = self._sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("server closed the connection")
+            buf += chunk
+        return buf
+
+
+def _serve(service: RelayService) -> Generator[ModbusTCPServer, None, None]:
+    server = ModbusTCPServer(service)
+    server.start_in_thread("127.0.0.1", 0)
+    try:
+        yield server
+    finally:
+        server.stop_thread()
+
+
+@pytest.fixture()
+def four_channel_service() -> RelayService:
+    device = MockRelayDevice(channels=4)
+    device.open()
+    return RelayService(device, channels=4)
+
+
+@pytest.fixture()
+def modbus(
+    four_channel_service: RelayService,
+) -> Generator[ModbusTCPServer, None, None]:
+    yield from _serve(four_channel_service)
+
+
+@pytest.fixture()
+def modbus_client(modbus: ModbusTCPServer) -> Generator[_ModbusClient, None, None]:
+    client = _ModbusClient(modbus.port)
+    yield client
+    client.close()
+
+
+class TestCoilPacking:
+    def test_round_trip(self) -> None:
+        coils = [True, False, True, True, False, False, False, False, True]
+        packed = pack_coils(coils)
+        assert packed == bytes((0b00001101, 0b00000001))
+        assert unpack_coils(packed, len(coils)) == coils
+
+
+class TestReadCoils:
+    def test_reads_relay_states(
+        self, four_channel_service: RelayService, modbus_client: _ModbusClient
+    ) -> None:
+        four_channel_service.set_channel(2, RelayState.ON)
+        four_channel_service.set_channel(4, RelayState.ON)
+        assert modbus_client.read_coils(0, 4) == bytes((0x01, 1, 0b1010))
+        assert modbus_client.read_coils(1, 2) == bytes((0x01, 1, 0b01))
+
+    def test_address_past_last_channel(self, modbus_client: _ModbusClient) -> None:
+        assert modbus_client.read_coils(3, 2) == bytes((0x81, 0x02))
+
+    def test_zero_quantity(self, modbus_client: _ModbusClient) -> None:
+        assert modbus_client.read_coils(0, 0) == bytes((0x81, 0x03))
+
+
+class TestWriteSingleCoil:
+    def test_switches_channel_and_echoes(
+        self, four_channel_service: RelayService, modbus_client: _ModbusClient
+    ) -> None:
+        pdu = struct.pack(">BHH", 0x05, 2, 0xFF00)
+        assert modbus_client.request(pdu) == pdu
+        assert four_channel_service.get_channel(3).state == RelayState.ON
+        modbus_client.write_coil(2, False)
+        assert four_channel_service.get_channel(3).state == RelayState.OFF
+
+    def test_invalid_value(self, modbus_client: _ModbusClient) -> None:
+        reply = modbus_client.request(struct.pack(">BHH", 0x05, 0, 0x1234))
+        assert reply == bytes((0x85, 0x03))
+
+    def test_invalid_address(self, modbus_client: _ModbusClient) -> None:
+        assert modbus_client.write_coil(4, True) == bytes((0x85, 0x02))
+
+
+class TestWriteMultipleCoils:
+    def test_single_bulk_write(
+        self, four_channel_service: RelayService, modbus_client: _ModbusClient
+    ) -> None:
+        with four_channel_service.events.subscribe() as sub:
+            reply = modbus_client.write_coils(0, [True, False, True, True])
+            events = [e.type for e in sub.drain()]
+        assert reply == struct.pack(">BHH", 0x0F, 0, 4)
+        assert events == [EventType.CHANNELS_SET]
+        states = [s.state for s in four_channel_service.get_all_channels()]
+        assert states == [RelayState.ON, RelayState.OFF, RelayState.ON, RelayState.ON]
+
+    def test_byte_count_mismatch(self, modbus_client: _ModbusClient) -> None:
+        pdu = struct.pack(">BHHB", 0x0F, 0, 4, 2) + b"\x0f\x00"
+        assert modbus_client.request(pdu) == bytes((0x8F, 0x03))
+
+    def test_range_past_last_channel(self, modbus_client: _ModbusClient) -> None:
+        assert modbus_client.write_coils(2, [True] * 3) == bytes((0x8F, 0x02))
+
+
+class TestErrors:
+    def test_unsupported_function(self, modbus_client: _ModbusClient) -> None:
+        assert modbus_client.request(bytes((0x03, 0, 0, 0, 1))) == bytes((0x83, 0x01))
+
+    def test_device_disconnected(self, service_disconnected: RelayService) -> None:
+        for server in _serve(service_disconnected):
+            client = _ModbusClient(server.port)
+            try:
+                assert client.write_coil(0, True) == bytes((0x85, 0x04))
+                assert client.write_coils(0, [True]) == bytes((0x8F, 0x04))
+            finally:
+                client.close()
+
+    def test_bad_protocol_id_drops_connection(self, modbus: ModbusTCPServer) -> None:
+        with socket.create_connection(("127.0.0.1", modbus.port), timeout=5.0) as sock:
+            sock.sendall(struct.pack(">HHHB", 1, 7, 6, 1) + bytes(5))
+            assert sock.recv(16) == b""
+
+
+class TestConcurrentClients:
+    def test_many_connections(
+        self, four_channel_service: RelayService, modbus: ModbusTCPServer
+    ) -> None:
+        clients = [_ModbusClient(modbus.port) for _ in range(16)]
+        errors: list[BaseException] = []
+
+        def run(client: _ModbusClient, coil: int) -> None:
+            try:
+                for i in range(20):
+                    on = i % 2 == 0
+                    assert client.write_coil(coil, on)[0] == 0x05
+                    assert client.read_coils(0, 4)[0] == 0x01
+            except BaseException as exc:
+                errors.append(exc)
+
+        threads = [
+            threading.Thread(target=run, args=(client, i % 4))
+            for i, client in enumerate(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10.0)
+        for client in clients:
+            client.close()
+        assert errors == []
+        assert all(
+            s.state == RelayState.OFF for s in four_channel_service.get_all_channels()
+        )
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import socket
+from collections.abc import Generator
+
+import pytest
+
+from app.core.metrics import UDP_DROPPED
+from app.frontends.udp import (
+    Op,
+    SequenceWindow,
+    Status,
+    UDPCommandServer,
+    UDPRelayClient,
+    pack_request,
+    unpack_ack,
+)
+from app.models.schemas import RelayState
+from app.services.events import EventType
+from app.services.relay_service import RelayService
+
+KEY = "rig-secret"
+
+
+# ─── Helpers ───
+
+
+def _serve(service: RelayService) -> Generator[UDPCommandServer, None, None]:
+    server = UDPCommandServer(service, KEY)
+    server.start_in_thread("127.0.0.1", 0)
+    try:
+        yield server
+    finally:
+        server.stop_thread()
+
+
+def _raw_socket(port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(0.5)
+    sock.connect(("127.0.0.1", port))
+    return sock
+
+
+@pytest.fixture()
+def udp(service: RelayService) -> Generator[UDPCommandServer, None, None]:
+    yield from _serve(service)
+
+
+@pytest.fixture()
+def udp_client(udp: UDPCommandServer) -> Generator[UDPRelayClient, None, None]:
+    with UDPRelayClient("127.0.0.1", udp.port, KEY) as client:
+        yield client
+
+
+class TestSequenceWindow:
+    def test_accepts_increasing(self) -> None:
+        window = SequenceWindow()
+        assert all(window.accept(seq) for seq in range(1, 100))
+
+    def test_rejects_duplicates(self) -> None:
+        window = SequenceWindow()
+        assert window.accept(10)
+        assert not window.accept(10)
+
+    def test_accepts_reordered_within_window(self) -> None:
+        window = SequenceWindow()
+        assert window.accept(100)
+        assert window.accept(98)
+        assert window.accept(99)
+        assert not window.accept(98)
+
+    def test_rejects_older_than_window(self) -> None:
+        window = SequenceWindow()
+        assert window.accept(1000)
+        assert not window.accept(1000 - 64)
+        assert window.accept(1000 - 63)
+
+    def test_huge_jump_resets_window(self) -> None:
+        window = SequenceWindow()
+        assert window.accept(5)
+        assert window.accept(2**32 - 1)
+        assert not window.accept(2**32 - 1)
+        assert not window.accept(5)
+        assert window.accept(2**32 - 2)
+
+
+class TestCommands:
+    def test_set_channel(
+        self, service: RelayService, udp_client: UDPRelayClient
+    ) -> None:
+        ack = udp_client.set_channel(2, RelayState.ON)
+        assert ack.status == Status.OK
+        assert ack.op == Op.SET
+        assert ack.state(2) == RelayState.ON
+        assert service.get_channel(2).state == RelayState.ON
+
+    def test_set_all(self, service: RelayService, udp_client: UDPRelayClient) -> None:
+        ack = udp_client.set_all(RelayState.ON)
+        assert ack.status == Status.OK
+        assert ack.mask == 0b11
+        udp_client.set_all(RelayState.OFF)
+        assert all(s.state == RelayState.OFF for s in service.get_all_channels())
+
+    def test_get_reads_state(
+        self, service: RelayService, udp_client: UDPRelayClient
+    ) -> None:
+        service.set_channel(1, RelayState.ON)
+        ack = udp_client.get()
+        assert ack.status == Status.OK
+        assert ack.mask == 0b01
+
+    def test_invalid_channel(self, udp_client: UDPRelayClient) -> None:
+        assert udp_client.set_channel(3, RelayState.ON).status == Status.INVALID_CHANNEL
+
+    def test_unknown_op(self, udp: UDPCommandServer) -> None:
+        with _raw_socket(udp.port) as sock:
+            sock.send(pack_request(KEY.encode(), 1, 1, 9))  # type: ignore[arg-type]
+            ack = unpack_ack(KEY.encode(), sock.recv(2048))
+        assert ack.status == Status.INVALID_REQUEST
+
+    def test_device_disconnected(self, service_disconnected: RelayService) -> None:
+        for server in _serve(service_disconnected):
+            with UDPRelayClient("127.0.0.1", server.port, KEY) as client:
+                ack = client.set_channel(1, RelayState.ON)
+        assert ack.status == Status.DEVICE_ERROR
+
+
+class TestAuthentication:
+    def test_wrong_key_is_dropped_silently(self, udp: UDPCommandServer) -> None:
+        before = UDP_DROPPED.value("auth")
+        with UDPRelayClient("127.0.0.1", udp.port, "wrong", retries=0) as client:
+            with pytest.raises(TimeoutError):
+                client.set_channel(1, RelayState.ON)
+        assert UDP_DROPPED.value("auth") == before + 1
+
+    def test_tampered_datagram_is_dropped(
+        self, service: RelayService, udp: UDPCommandServer
+    ) -> None:
+        datagram = bytearray(pack_request(KEY.encode(), 1, 1, Op.SET, 1, True))
+        datagram[12] ^= 0x03  # channel 1 -> 2
+        with _raw_socket(udp.port) as sock:
+            sock.send(bytes(datagram))
+            with pytest.raises(TimeoutError):
+                sock.recv(2048)
+        assert service.get_channel(2).state == RelayState.OFF
+
+    def test_forged_ack_is_rejected(self) -> None:
+        with pytest.raises(ValueError):
+            unpack_ack(KEY.encode(), pack_request(b"other", 1, 1, Op.GET))
+
+
+class TestReplay:
+    def test_retransmission_is_acked_but_not_executed(
+        self, service: RelayService, udp: UDPCommandServer
+    ) -> None:
+        datagram = pack_request(KEY.encode(), 7, 1, Op.SET, 1, True)
+        with service.events.subscribe() as sub, _raw_socket(udp.port) as sock:
+            sock.send(datagram)
+            first = sock.recv(2048)
+            sock.send(datagram)
+            second = sock.recv(2048)
+            events = [e.type for e in sub.drain()]
+        assert first == second
+        assert unpack_ack(KEY.encode(), first).status == Status.OK
+        assert events == [EventType.CHANNEL_SET]
+
+    def test_replay_from_another_address_is_not_executed(
+        self, service: RelayService, udp: UDPCommandServer
+    ) -> None:
+        on = pack_request(KEY.encode(), 7, 1, Op.SET, 1, True)
+        off = pack_request(KEY.encode(), 7, 2, Op.SET, 1, False)
+        with _raw_socket(udp.port) as sock:
+            sock.send(on)
+            sock.recv(2048)
+            sock.send(off)
+            sock.recv(2048)
+        with service.events.subscribe() as sub, _raw_socket(udp.port) as attacker:
+            attacker.send(on)
+            attacker.recv(2048)  # the cached ack, nothing more
+            events = list(sub.drain())
+        assert events == []
+        assert service.get_channel(1).state == RelayState.OFF
+
+    def test_sequence_older_than_window_is_dropped(
+        self, udp: UDPCommandServer
+    ) -> None:
+        before = UDP_DROPPED.value("replay")
+        with _raw_socket(udp.port) as sock:
+            sock.send(pack_request(KEY.encode(), 7, 1000, Op.GET))
+            sock.recv(2048)
+            sock.send(pack_request(KEY.encode(), 7, 900, Op.GET))
+            with pytest.raises(TimeoutError):
+                sock.recv(2048)
+        assert UDP_DROPPED.value("replay") == before + 1
+
+
+class TestOrdering:
+    def test_pipelined_commands_run_in_order(
+        self, service: RelayService, udp: UDPCommandServer
+    ) -> None:
+        key = KEY.encode()
+        with _raw_socket(udp.port) as sock:
+            for seq in range(1, 51):
+                sock.send(pack_request(key, 3, seq, Op.SET, 1, seq % 2 == 1))
+            acks = [unpack_ack(key, sock.recv(2048)) for _ in range(50)]
+        assert [a.sequence for a in acks] == list(range(1, 51))
+        assert service.get_channel(1).state == RelayState.OFF
+
+
+class TestConfiguration:
+    def test_key_is_required(self, service: RelayService) -> None:
+        with pytest.raises(ValueError, match="RELAY_UDP_KEY"):
+            UDPCommandServer(service, "")
@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import inspect
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Generator
+from typing import cast
+
+import pytest
+from fastapi.dependencies.models import Dependant
+from fastapi.routing import APIRoute, iter_route_contexts
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import (
+    get_relay_service,
+    get_relay_service_public,
+    require_device,
+)
+from app.core import timing
+from app.core.device import MockRelayDevice
+from app.core.exceptions import DeviceConnectionError, InvalidChannelError
+from app.ipc.client import RemoteRelayService
+from app.ipc.protocol import MAX_FRAME, ProtocolError, encode, recv_frame
+from app.ipc.server import RelayOwnerServer
+from app.ipc.shm import StateSegmentReader, StateSegmentWriter
+from app.models.schemas import BurnTestMode, RelayState, RelayStatus
+from app.services.relay_service import RelayService
+from tests.test_services import _FailingMockDevice
+
+
+@pytest.fixture()
+def socket_path() -> Generator[str, None, None]:
+    # Unix socket paths are length-limited; keep them short.
+    directory = tempfile.mkdtemp(prefix="relay-")
+    yield os.path.join(directory, "owner.sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture()
+def segment_name() -> str:
+    return f"relay-test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture()
+def owner(
+    service: RelayService, socket_path: str
+) -> Generator[RelayOwnerServer, None, None]:
+    server = _start_owner(socket_path, service)
+    yield server
+    _stop_owner(server)
+
+
+@pytest.fixture()
+def remote(
+    owner: RelayOwnerServer, socket_path: str
+) -> Generator[RemoteRelayService, None, None]:
+    client = RemoteRelayService(socket_path)
+    yield client
+    client.close()
+
+
+class TestProtocol:
+    def test_round_trip(self) -> None:
+        a, b = socket.socketpair()
+        with a, b:
+            a.sendall(encode({"m": "ping", "a": [1]}))
+            assert recv_frame(b) == {"m": "ping", "a": [1]}
+
+    def test_clean_close_returns_none(self) -> None:
+        a, b = socket.socketpair()
+        with b:
+            a.close()
+            assert recv_frame(b) is None
+
+    def test_oversized_frame_rejected(self) -> None:
+        a, b = socket.socketpair()
+        with a, b:
+            a.sendall((MAX_FRAME + 1).to_bytes(4, "big"))
+            with pytest.raises(ProtocolError):
+                recv_frame(b)
+
+
+class TestRemoteRelayService:
+    def test_set_and_get_reach_owner_state(
+        self, remote: RemoteRelayService, service: RelayService
+    ) -> None:
+        result = remote.set_channel(1, RelayState.ON)
+        assert result.state == RelayState.ON
+        assert service.get_channel(1).state == RelayState.ON
+        assert remote.get_channel(1).state == RelayState.ON
+        assert remote.state_version == service.state_version == 1
+        assert remote.changed_since(0) == [1]
+        assert remote.changed_since(5) is None
+
+    def test_bulk_and_fail_safe(
+        self, remote: RemoteRelayService, service: RelayService
+    ) -> None:
+        statuses = remote.set_all_channels(RelayState.ON)
+        assert all(s.state == RelayState.ON for s in statuses)
+        statuses = remote.set_channels({2: RelayState.OFF})
+        assert [s.state for s in statuses] == [RelayState.ON, RelayState.OFF]
+        remote.all_off()
+        assert all(s.state == RelayState.OFF for s in service.get_all_channels())
+
+    def test_invalid_channel_keeps_exception_type(
+        self, remote: RemoteRelayService
+    ) -> None:
+        with pytest.raises(InvalidChannelError) as exc_info:
+            remote.set_channel(99, RelayState.ON)
+        assert exc_info.value.channel == 99
+        assert exc_info.value.max_channels == 2
+
+    def test_device_error_keeps_exception_type(self, socket_path: str) -> None:
+        device = _FailingMockDevice(fail_on_channel=2, channels=2)
+        device.open()
+        server = _start_owner(socket_path, RelayService(device, channels=2))
+        client = RemoteRelayService(socket_path)
+        try:
+            with pytest.raises(DeviceConnectionError, match="Simulated"):
+                client.set_channel(2, RelayState.ON)
+        finally:
+            client.close()
+            _stop_owner(server)
+
+    def test_metadata_and_burn_test(self, remote: RemoteRelayService) -> None:
+        assert remote.channel_count == 2
+        assert remote.is_device_connected is True
+        assert remote.get_device_info().channels == 2
+        assert len(remote.get_debounce_stats().channels) == 2
+        status = remote.start_burn_test(0, 10, BurnTestMode.ALTERNATE)
+        assert status.running is True
+        assert remote.stop_burn_test().running is False
+        assert "relay_device_connected 1" in remote.render_metrics()
+        assert remote.set_lock_profiling(True).enabled is True
+        remote.set_channel(1, RelayState.ON)
+        assert remote.get_lock_profile(1).operations[0].operation == "set_channel"
+
+    def test_owner_timing_phases_returned(self, remote: RemoteRelayService) -> None:
+        phases, token = timing.begin()
+        try:
+            remote.set_channel(1, RelayState.ON)
+        finally:
+            timing.end(token)
+        assert {"lock", "device", "audit", "ipc"} <= set(phases)
+        assert phases["ipc"] >= phases["device"]
+
+    def test_sequential_calls_reuse_one_connection(
+        self, remote: RemoteRelayService
+    ) -> None:
+        for _ in range(20):
+            remote.get_all_channels()
+        assert remote.idle_connections == 1
+
+    def test_concurrent_callers(
+        self, remote: RemoteRelayService, service: RelayService
+    ) -> None:
+        def worker(channel: int) -> None:
+            for i in range(50):
+                remote.set_channel(channel, RelayState.ON if i % 2 else RelayState.OFF)
+
+        threads = [threading.Thread(target=worker, args=(ch,)) for ch in (1, 2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert [s.state for s in service.get_all_channels()] == [
+            RelayState.ON,
+            RelayState.ON,
+        ]
+
+    def test_owner_down_means_disconnected(self, socket_path: str) -> None:
+        client = RemoteRelayService(socket_path)
+        assert client.is_device_connected is False
+        with pytest.raises(DeviceConnectionError):
+            client.set_channel(1, RelayState.ON)
+
+    def test_reconnects_after_owner_restart(
+        self, service: RelayService, socket_path: str
+    ) -> None:
+        server = _start_owner(socket_path, service)
+        client = RemoteRelayService(socket_path)
+        client.get_all_channels()
+        _stop_owner(server)
+        server = _start_owner(socket_path, service)
+        try:
+            assert client.set_channel(1, RelayState.ON).state == RelayState.ON
+        finally:
+            client.close()
+            _stop_owner(server)
+
+
+    def test_request_is_never_resent_after_it_went_out(
+        self, socket_path: str
+    ) -> None:
+        # A stub owner that answers the first request, then reads the
+        # second and drops the connection without replying.
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        listener.listen()
+        received: list[str] = []
+
+        def serve() -> None:
+            conn, _ = listener.accept()
+            with conn:
+                for reply in ({"r": 2}, None):
+                    request = recv_frame(conn)
+                    assert request is not None
+                    received.append(request["m"])
+                    if reply is not None:
+                        conn.sendall(encode(reply))
+            listener.settimeout(0.5)
+            try:
+                while True:
+                    extra, _ = listener.accept()
+                    with extra:
+                        request = recv_frame(extra)
+                        if request is not None:
+                            received.append(request["m"])
+            except OSError:
+                pass
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        client = RemoteRelayService(socket_path)
+        try:
+            assert client.channel_count == 2
+            with pytest.raises(DeviceConnectionError):
+                client.set_channel(1, RelayState.ON)
+        finally:
+            client.close()
+            thread.join()
+            listener.close()
+        assert received == ["channel_count", "set_channel"]
+
+
+class TestStateSegment:
+    def test_round_trip(self, service: RelayService, segment_name: str) -> None:
+        writer = StateSegmentWriter(segment_name, service.channel_count)
+        reader = StateSegmentReader(segment_name)
+        try:
+            service.set_channel(2, RelayState.ON)
+            writer.publish(service)
+            snapshot = reader.read()
+            assert snapshot.version == 1
+            assert snapshot.states == (RelayState.OFF, RelayState.ON)
+            assert snapshot.connected is True
+            assert snapshot.burn == service.get_burn_test_status()
+            with pytest.raises(InvalidChannelError):
+                snapshot.channel(3)
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_unchanged_segment_reuses_snapshot(
+        self, service: RelayService, segment_name: str
+    ) -> None:
+        writer = StateSegmentWriter(segment_name, service.channel_count)
+        reader = StateSegmentReader(segment_name)
+        try:
+            writer.publish(service)
+            assert reader.read() is reader.read()
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_concurrent_publishes_never_go_back(
+        self,
+        service: RelayService,
+        segment_name: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        writer = StateSegmentWriter(segment_name, service.channel_count)
+        reader = StateSegmentReader(segment_name)
+        gate = threading.Event()
+        snapshotting = threading.Event()
+        get_all_channels = service.get_all_channels
+
+        def slow_first_snapshot() -> list[RelayStatus]:
+            if not snapshotting.is_set():
+                snapshotting.set()
+                gate.wait(timeout=5.0)
+            return get_all_channels()
+
+        monkeypatch.setattr(service, "get_all_channels", slow_first_snapshot)
+        first = threading.Thread(target=writer.publish, args=(service,))
+        second = threading.Thread(target=writer.publish, args=(service,))
+        try:
+            first.start()
+            assert snapshotting.wait(timeout=5.0)
+            service.set_channel(1, RelayState.ON)
+            second.start()
+            time.sleep(0.05)
+            gate.set()
+            first.join()
+            second.join()
+            snapshot = reader.read()
+            assert snapshot.version == service.state_version
+            assert snapshot.states[0] == RelayState.ON
+        finally:
+            gate.set()
+            reader.close()
+            writer.close()
+
+    def test_reads_are_never_torn(self, segment_name: str) -> None:
+        device = MockRelayDevice(channels=8)
+        device.open()
+        svc = RelayService(device, channels=8)
+        writer = StateSegmentWriter(segment_name, 8)
+        reader = StateSegmentReader(segment_name)
+        stop = threading.Event()
+
+        def write() -> None:
+            on = False
+            while not stop.is_set():
+                on = not on
+                svc.set_all_channels(RelayState.ON if on else RelayState.OFF)
+                writer.publish(svc)
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        try:
+            for _ in range(5000):
+                snapshot = reader.read()
+                assert len(set(snapshot.states)) == 1
+                expected = RelayState.ON if snapshot.version % 2 else RelayState.OFF
+                assert snapshot.states[0] == expected
+        finally:
+            stop.set()
+            thread.join()
+            reader.close()
+            writer.close()
+
+    def test_reader_close_keeps_segment(
+        self, service: RelayService, segment_name: str
+    ) -> None:
+        writer = StateSegmentWriter(segment_name, service.channel_count)
+        try:
+            StateSegmentReader(segment_name).close()
+            reader = StateSegmentReader(segment_name)
+            reader.close()
+        finally:
+            writer.close()
+
+
+class TestRemoteReadsFromSegment:
+    @pytest.fixture()
+    def remote_shm(
+        self, socket_path: str, segment_name: str
+    ) -> Generator[tuple[RemoteRelayService, RelayOwnerServer], None, None]:
+        device = MockRelayDevice(channels=2)
+        device.open()
+        svc = RelayService(device, channels=2, pulse_ms=20)
+        writer = StateSegmentWriter(segment_name, 2)
+        writer.follow(svc)
+        server = _start_owner(socket_path, svc, writer)
+        client = RemoteRelayService(socket_path, segment_name)
+        yield client, server
+        client.close()
+        _stop_owner(server)
+        writer.close()
+
+    def test_reads_own_writes(
+        self, remote_shm: tuple[RemoteRelayService, RelayOwnerServer]
+    ) -> None:
+        remote, _ = remote_shm
+        remote.set_channel(1, RelayState.ON)
+        assert remote.get_channel(1).state == RelayState.ON
+        assert remote.state_version == 1
+
+    def test_owner_side_changes_are_published(
+        self, remote_shm: tuple[RemoteRelayService, RelayOwnerServer]
+    ) -> None:
+        remote, _ = remote_shm
+        remote.set_channel(1, RelayState.ON)  # pulse turns it off in the owner
+        deadline = time.monotonic() + 2.0
+        while remote.get_channel(1).state == RelayState.ON:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+        assert remote.state_version == 2
+
+    def test_reads_need_no_owner(
+        self, remote_shm: tuple[RemoteRelayService, RelayOwnerServer]
+    ) -> None:
+        remote, server = remote_shm
+        remote.set_all_channels(RelayState.ON)
+        _stop_owner(server)
+        assert [s.state for s in remote.get_all_channels()] == [
+            RelayState.ON,
+            RelayState.ON,
+        ]
+
+
+class TestApiThroughOwner:
+    def test_rest_round_trip(self, remote: RemoteRelayService) -> None:
+        from app.main import app
+
+        svc = cast(RelayService, remote)
+        app.dependency_overrides[get_relay_service] = lambda: svc
+        app.dependency_overrides[get_relay_service_public] = lambda: svc
+        app.dependency_overrides[require_device] = lambda: svc
+        try:
+            client = TestClient(app)
+            resp = client.put("/api/v1/relays/2", json={"state": "on"})
+            assert resp.json() == {"channel": 2, "state": "on"}
+            assert client.get("/api/v1/relays/2").json()["state"] == "on"
+            assert client.get("/api/v1/relays/9").status_code == 404
+        finally:
+            app.dependency_overrides.clear()
+
+    def test_service_calls_stay_off_the_event_loop(self) -> None:
+        # Remote service calls block on the owner; async handlers or
+        # dependencies making them would stall every request in the worker.
+        from app.main import app
+
+        for context in iter_route_contexts(app.routes):
+            route = context.route
+            if not isinstance(route, APIRoute):
+                continue
+            for dependant in _flatten(route.dependant):
+                if dependant.call is None or not any(
+                    sub.call in (get_relay_service, get_relay_service_public)
+                    for sub in dependant.dependencies
+                ):
+                    continue
+                assert not inspect.iscoroutinefunction(dependant.call), (
+                    f"{context.path}: {dependant.call.__name__} is async"
+                )
+
+
+# ─── Helpers ───
+
+
+def _flatten(dependant: Dependant) -> list[Dependant]:
+    found = [dependant]
+    for sub in dependant.dependencies:
+        found.extend(_flatten(sub))
+    return found
+
+
+def _start_owner(
+    path: str, service: RelayService, segment: StateSegmentWriter | None = None
+) -> RelayOwnerServer:
+    server = RelayOwnerServer(path, service, segment)
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    ).start()
+    return server
+
+
+def _stop_owner(server: RelayOwnerServer) -> None:
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+from starlette.types import Scope
+
+from app.config import Settings
+from app.middleware import SlidingWindowRateLimiter, client_key, route_cost
+
+
+class _FakeClock:
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _request(ip: str = "10.0.0.1", api_key: str | None = None) -> Scope:
+    headers = [(b"x-api-key", api_key.encode())] if api_key else []
+    return {"type": "http", "headers": headers, "client": (ip, 1234), "method": "GET"}
+
+
+class TestSlidingWindowRateLimiter:
+    def test_allows_up_to_limit(self) -> None:
+        limiter = SlidingWindowRateLimiter(3, clock=_FakeClock())
+        assert [limiter.hit("a") for _ in range(3)] == [None, None, None]
+        assert limiter.hit("a") is not None
+
+    def test_clients_are_independent(self) -> None:
+        limiter = SlidingWindowRateLimiter(1, clock=_FakeClock())
+        assert limiter.hit("a") is None
+        assert limiter.hit("b") is None
+        assert limiter.hit("a") is not None
+
+    def test_previous_window_decays(self) -> None:
+        clock = _FakeClock()
+        limiter = SlidingWindowRateLimiter(10, clock=clock)
+        for _ in range(10):
+            limiter.hit("a")
+        # Halfway into the next window half the old traffic still counts.
+        clock.now = 90.0
+        allowed = sum(limiter.hit("a") is None for _ in range(10))
+        assert allowed == 5
+
+    def test_full_reset_after_two_windows(self) -> None:
+        clock = _FakeClock()
+        limiter = SlidingWindowRateLimiter(2, clock=clock)
+        limiter.hit("a")
+        limiter.hit("a")
+        clock.now = 125.0
+        assert limiter.hit("a") is None
+
+    def test_cost_weights(self) -> None:
+        limiter = SlidingWindowRateLimiter(10, clock=_FakeClock())
+        assert limiter.hit("a", cost=4) is None
+        assert limiter.hit("a", cost=4) is None
+        assert limiter.hit("a", cost=4) is not None
+        assert limiter.hit("a", cost=2) is None
+
+    def test_retry_after_is_accurate(self) -> None:
+        clock = _FakeClock(30.0)
+        limiter = SlidingWindowRateLimiter(2, clock=clock)
+        limiter.hit("a")
+        limiter.hit("a")
+        retry_after = limiter.hit("a")
+        assert retry_after is not None
+        clock.now += retry_after
+        assert limiter.hit("a") is None
+
+    def test_cost_above_limit_never_allowed(self) -> None:
+        limiter = SlidingWindowRateLimiter(2, clock=_FakeClock())
+        assert limiter.hit("a", cost=5) == 60
+
+    def test_client_cap_evicts_least_recent(self) -> None:
+        limiter = SlidingWindowRateLimiter(1, max_clients=2, clock=_FakeClock())
+        limiter.hit("a")
+        limiter.hit("b")
+        limiter.hit("a")
+        limiter.hit("c")
+        assert len(limiter) == 2
+        # "a" was touched recently and is still limited.
+        assert limiter.hit("a") is not None
+        # "b" was least recently seen: evicted, so it starts fresh.
+        assert limiter.hit("b") is None
+
+    def test_zero_client_cap_does_not_crash(self) -> None:
+        limiter = SlidingWindowRateLimiter(1, max_clients=0, clock=_FakeClock())
+        assert limiter.hit("a") is None
+        assert len(limiter) == 0
+
+    def test_client_cap_setting_must_be_positive(self) -> None:
+        with pytest.raises(ValidationError):
+            Settings(rate_limit_max_clients=0)
+
+    def test_idle_clients_are_evicted(self) -> None:
+        clock = _FakeClock()
+        limiter = SlidingWindowRateLimiter(5, clock=clock)
+        for i in range(100):
+            limiter.hit(f"scanner-{i}")
+        clock.now = 500.0
+        for i in range(60):
+            limiter.hit(f"live-{i}")
+        assert len(limiter) == 60
+
+    def test_memory_bounded_under_scan(self) -> None:
+        limiter = SlidingWindowRateLimiter(5, max_clients=100, clock=_FakeClock())
+        for i in range(10_000):
+            limiter.hit(f"10.{i // 256}.{i % 256}.1")
+        assert len(limiter) == 100
+
+
+class TestClientKey:
+    def test_keyed_by_ip_by_default(self) -> None:
+        assert client_key(_request(api_key="secret"), "ip") == "ip:10.0.0.1"
+
+    def test_keyed_by_api_key_without_storing_secret(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr("app.config.settings.api_key", "secret")
+        key = client_key(_request(api_key="secret"), "api_key")
+        assert key.startswith("key:")
+        assert "secret" not in key
+        assert key == client_key(_request("10.9.9.9", api_key="secret"), "api_key")
+
+    def test_api_key_mode_falls_back_to_ip(self) -> None:
+        assert client_key(_request(), "api_key") == "ip:10.0.0.1"
+
+    def test_invalid_key_is_keyed_by_ip(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr("app.config.settings.api_key", "secret")
+        assert client_key(_request(api_key="made-up"), "api_key") == "ip:10.0.0.1"
+
+    def test_any_key_is_keyed_by_ip_without_auth(self) -> None:
+        assert client_key(_request(api_key="made-up"), "api_key") == "ip:10.0.0.1"
+
+
+class TestRouteCost:
+    def test_configured_route_cost(self) -> None:
+        costs = {"PUT /api/v1/relays": 4}
+        assert route_cost("PUT", "/api/v1/relays", costs) == 4
+        assert route_cost("GET", "/api/v1/relays", costs) == 1
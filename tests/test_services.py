@@ -5,9 +5,15 @@ import threading
 
 import pytest
 
+from app.core.clock import VirtualClock
 from app.core.device import MockRelayDevice
-from app.core.exceptions import DeviceConnectionError, InvalidChannelError
-from app.models.schemas import DeviceInfo, RelayState, RelayStatus
+from app.core.exceptions import (
+    DeviceConnectionError,
+    DeviceNotFoundError,
+    InvalidChannelError,
+)
+from app.models.schemas import BurnTestMode, DeviceInfo, RelayState, RelayStatus
+from app.services.events import EventType
 from app.services.relay_service import RelayService
 
 
@@ -159,6 +165,70 @@ class TestSetAllChannelsRollback:
         assert device._states[1] is False
 
 
+class TestSetChannels:
+    def test_sets_each_channel(
+        self, service: RelayService, mock_device: MockRelayDevice
+    ) -> None:
+        result = service.set_channels({1: RelayState.ON, 2: RelayState.OFF})
+        assert [s.state for s in result] == [RelayState.ON, RelayState.OFF]
+        assert mock_device._states == {1: True, 2: False}
+        assert service.state_version == 1
+
+    def test_invalid_channel_writes_nothing(
+        self, service: RelayService, mock_device: MockRelayDevice
+    ) -> None:
+        with pytest.raises(InvalidChannelError):
+            service.set_channels({1: RelayState.ON, 3: RelayState.ON})
+        assert mock_device._states[1] is False
+
+    def test_rolls_back_on_partial_failure(self) -> None:
+        device = _FailingMockDevice(fail_on_channel=2, channels=2)
+        device.open()
+        svc = RelayService(device, channels=2)
+        with pytest.raises(DeviceConnectionError):
+            svc.set_channels({1: RelayState.ON, 2: RelayState.ON})
+        assert device._states[1] is False
+        assert svc.state_version == 0
+
+    def test_cancels_pending_only_for_written_channels(
+        self, mock_device: MockRelayDevice
+    ) -> None:
+        svc = RelayService(mock_device, channels=2, min_switch_ms=10_000)
+        svc.set_all_channels(RelayState.ON)
+        svc.set_channel(1, RelayState.OFF)  # deferred
+        svc.set_channel(2, RelayState.OFF)  # deferred
+        svc.set_channels({1: RelayState.ON})
+        pending = [c.pending for c in svc.get_debounce_stats().channels]
+        assert pending == [None, RelayState.OFF]
+        svc.all_off()
+
+
+class TestChangedSince:
+    def test_reports_channels_changed_after_version(
+        self, service: RelayService
+    ) -> None:
+        service.set_channel(1, RelayState.ON)  # v1
+        service.set_channel(2, RelayState.ON)  # v2
+        service.set_channel(1, RelayState.OFF)  # v3
+        assert service.changed_since(0) == [1, 2]
+        assert service.changed_since(2) == [1]
+        assert service.changed_since(3) == []
+
+    def test_unchanged_writes_are_not_logged(self, service: RelayService) -> None:
+        service.set_channel(1, RelayState.OFF)
+        assert service.changed_since(0) == []
+
+    def test_version_outside_log_needs_resync(
+        self, mock_device: MockRelayDevice
+    ) -> None:
+        svc = RelayService(mock_device, channels=2, change_log_size=2)
+        for state in (RelayState.ON, RelayState.OFF, RelayState.ON):
+            svc.set_channel(1, state)  # v1..v3; log keeps v2, v3
+        assert svc.changed_since(1) == [1]
+        assert svc.changed_since(0) is None
+        assert svc.changed_since(4) is None
+
+
 class TestAllOff:
     def test_all_off_resets_states(self, service: RelayService) -> None:
         service.set_channel(1, RelayState.ON)
@@ -225,6 +295,106 @@ class TestThreadSafety:
         assert all(s.state == RelayState.OFF for s in result)
 
 
+class TestMinSwitchInterval:
+    """Commands inside the switch window are coalesced, not rejected."""
+
+    @pytest.fixture()
+    def clock(self) -> VirtualClock:
+        return VirtualClock()
+
+    @pytest.fixture()
+    def debounced(
+        self, mock_device: MockRelayDevice, clock: VirtualClock
+    ) -> RelayService:
+        return RelayService(mock_device, channels=2, min_switch_ms=100, clock=clock)
+
+    def test_first_switch_is_immediate(
+        self, debounced: RelayService, mock_device: MockRelayDevice
+    ) -> None:
+        result = debounced.set_channel(1, RelayState.ON)
+        assert result.state == RelayState.ON
+        assert mock_device._states[1] is True
+
+    def test_switch_inside_window_is_deferred(
+        self,
+        debounced: RelayService,
+        mock_device: MockRelayDevice,
+        clock: VirtualClock,
+    ) -> None:
+        debounced.set_channel(1, RelayState.ON)
+        clock.advance(0.04)
+        result = debounced.set_channel(1, RelayState.OFF)
+        assert result.state == RelayState.ON
+        clock.advance(0.059)
+        assert mock_device._states[1] is True
+        clock.advance(0.001)
+        assert mock_device._states[1] is False
+        assert debounced.get_channel(1).state == RelayState.OFF
+        stats = debounced.get_debounce_stats().channels[0]
+        assert stats.deferred == 1
+        assert stats.pending is None
+
+    def test_flap_back_inside_window_writes_nothing(
+        self, debounced: RelayService, clock: VirtualClock
+    ) -> None:
+        debounced.set_channel(1, RelayState.ON)
+        version = debounced.state_version
+        debounced.set_channel(1, RelayState.OFF)
+        debounced.set_channel(1, RelayState.ON)
+        clock.advance(1.0)
+        assert debounced.state_version == version
+        stats = debounced.get_debounce_stats().channels[0]
+        assert stats.suppressed == 2
+        assert stats.pending is None
+
+    def test_repeated_commands_coalesce_to_latest(
+        self, debounced: RelayService, clock: VirtualClock
+    ) -> None:
+        debounced.set_channel(1, RelayState.ON)
+        for _ in range(5):
+            debounced.set_channel(1, RelayState.OFF)
+        assert debounced.get_debounce_stats().channels[0].pending == RelayState.OFF
+        clock.advance(0.1)
+        assert debounced.get_channel(1).state == RelayState.OFF
+        stats = debounced.get_debounce_stats().channels[0]
+        assert stats.deferred == 1
+        assert stats.suppressed == 4
+
+    def test_all_off_cancels_pending_switch(
+        self,
+        debounced: RelayService,
+        mock_device: MockRelayDevice,
+        clock: VirtualClock,
+    ) -> None:
+        debounced.set_channel(1, RelayState.ON)
+        debounced.set_channel(1, RelayState.OFF)
+        debounced.set_channel(2, RelayState.ON)
+        debounced.set_channel(2, RelayState.OFF)  # deferred
+        debounced.all_off()
+        debounced.set_channel(2, RelayState.ON)  # deferred again
+        debounced.all_off()
+        clock.advance(1.0)
+        assert clock.pending == 0
+        assert mock_device._states[2] is False
+        assert debounced.get_channel(2).state == RelayState.OFF
+
+    def test_per_channel_override(self, mock_device: MockRelayDevice) -> None:
+        svc = RelayService(
+            mock_device, channels=2, min_switch_ms_channels={2: 100}
+        )
+        svc.set_channel(1, RelayState.ON)
+        assert svc.set_channel(1, RelayState.OFF).state == RelayState.OFF
+        svc.set_channel(2, RelayState.ON)
+        assert svc.set_channel(2, RelayState.OFF).state == RelayState.ON
+        stats = svc.get_debounce_stats().channels
+        assert [c.min_switch_ms for c in stats] == [0, 100]
+
+    def test_disabled_by_default(self, service: RelayService) -> None:
+        service.set_channel(1, RelayState.ON)
+        assert service.set_channel(1, RelayState.OFF).state == RelayState.OFF
+        assert service.get_debounce_stats().channels[0].deferred == 0
+
+
 class TestAuditLogging:
     def test_set_channel_audit(
         self, service: RelayService, caplog: pytest.LogCaptureFixture
@@ -264,6 +434,93 @@ class TestAuditLogging:
 # ─── Helpers ───
 
 
+class _UnopenableDevice(MockRelayDevice):
+    def open(self) -> None:
+        raise DeviceNotFoundError(0x16C0, 0x05DF)
+
+
+class TestDeviceLifecycle:
+    def test_open_device_drives_all_off(
+        self, service_disconnected: RelayService, mock_device_closed: MockRelayDevice
+    ) -> None:
+        with service_disconnected.events.subscribe() as sub:
+            service_disconnected.open_device()
+            events = [e.type for e in sub.drain()]
+        assert service_disconnected.is_device_connected is True
+        assert mock_device_closed._states == {1: False, 2: False}
+        assert events == [EventType.FAIL_SAFE]
+
+    def test_open_failure_leaves_service_disconnected(self) -> None:
+        service = RelayService(_UnopenableDevice(channels=2), channels=2)
+        with pytest.raises(DeviceNotFoundError):
+            service.open_device()
+        assert service.is_device_connected is False
+
+    def test_close_device_turns_off_then_closes(
+        self, service: RelayService, mock_device: MockRelayDevice
+    ) -> None:
+        service.set_channel(1, RelayState.ON)
+        service.close_device()
+        assert service.get_channel(1).state == RelayState.OFF
+        assert mock_device.is_open is False
+        service.close_device()  # already closed: no-op
+
+
+class _ProbedDevice(MockRelayDevice):
+    """Mock device counting string reads, able to stop answering."""
+
+    def __init__(self) -> None:
+        super().__init__(channels=2)
+        self.string_reads = 0
+        self.unplugged = False
+
+    @property
+    def manufacturer(self) -> str:
+        self.string_reads += 1
+        if self.unplugged:
+            raise OSError("device disconnected")
+        return super().manufacturer
+
+
+class TestProbeDevice:
+    def test_device_info_served_from_cache(self) -> None:
+        device = _ProbedDevice()
+        service = RelayService(device, channels=2)
+        service.open_device()
+        reads = device.string_reads
+        for _ in range(10):
+            assert service.get_device_info().manufacturer == "MockManufacturer"
+        assert device.string_reads == reads
+
+    def test_probe_refreshes_strings(self) -> None:
+        device = _ProbedDevice()
+        service = RelayService(device, channels=2)
+        service.open_device()
+        reads = device.string_reads
+        assert service.probe_device() is True
+        assert device.string_reads == reads + 1
+
+    def test_unresponsive_device_is_closed(self) -> None:
+        device = _ProbedDevice()
+        service = RelayService(device, channels=2)
+        service.open_device()
+        device.unplugged = True
+        with service.events.subscribe() as sub:
+            assert service.probe_device() is False
+            events = [e.type for e in sub.drain()]
+        assert events == [EventType.DEVICE_DISCONNECTED]
+        info = service.get_device_info()
+        assert info.connected is False
+        assert info.manufacturer == "Unknown"
+
+    def test_closed_device_is_reopened_and_driven_off(self) -> None:
+        device = _ProbedDevice()
+        service = RelayService(device, channels=2)
+        assert service.probe_device() is True
+        assert service.is_device_connected is True
+        assert device._states == {1: False, 2: False}
+
+
 class _FailingMockDevice(MockRelayDevice):
     """Mock device that raises on a specific channel."""
 
@@ -277,3 +534,68 @@ class _FailingMockDevice(MockRelayDevice):
                 f"Simulated failure on channel {channel}"
             )
         super().set_channel(channel, on)
+
+
+class TestVirtualTime:
+    """Pulse and burn-test timing driven by a virtual clock, without waiting."""
+
+    def test_thousands_of_pulses(self, mock_device: MockRelayDevice) -> None:
+        clock = VirtualClock()
+        svc = RelayService(mock_device, channels=2, pulse_ms=500, clock=clock)
+        with svc.events.subscribe(maxsize=20_000) as sub:
+            for i in range(5000):
+                svc.set_channel(i % 2 + 1, RelayState.ON)
+                clock.advance(0.25)
+            clock.advance(0.5)
+            events = sub.drain()
+        # Every pulse ended exactly once.
+        assert [e.type for e in events].count(EventType.PULSE_OFF) == 5000
+        assert mock_device._states == {1: False, 2: False}
+        assert clock.pending == 0
+        assert clock.monotonic() == pytest.approx(1250.5)
+
+    def test_pulse_fires_at_its_due_time(self, mock_device: MockRelayDevice) -> None:
+        clock = VirtualClock()
+        svc = RelayService(mock_device, channels=2, pulse_ms=200, clock=clock)
+        with svc.events.subscribe() as sub:
+            svc.set_channel(1, RelayState.ON)
+            clock.advance(0.199)
+            assert svc.get_channel(1).state == RelayState.ON
+            clock.advance(0.001)
+            events = sub.drain()
+        assert svc.get_channel(1).state == RelayState.OFF
+        assert events[-1].type == EventType.PULSE_OFF
+        assert events[-1].timestamp - events[0].timestamp == pytest.approx(0.2)
+
+    def test_week_long_burn_test(self, mock_device: MockRelayDevice) -> None:
+        clock = VirtualClock()
+        svc = RelayService(mock_device, channels=2, clock=clock)
+        svc.start_burn_test(cycles=0, delay_ms=60_000)
+        clock.advance(7 * 24 * 3600)
+        status = svc.get_burn_test_status()
+        assert status.running is True
+        assert status.cycles_completed == 7 * 24 * 30
+        svc.stop_burn_test()
+        assert svc.get_burn_test_status().running is False
+
+    def test_burn_test_finishes_after_its_cycles(
+        self, mock_device: MockRelayDevice
+    ) -> None:
+        clock = VirtualClock()
+        svc = RelayService(mock_device, channels=2, clock=clock)
+        svc.start_burn_test(cycles=3, delay_ms=1000, mode=BurnTestMode.ALTERNATE)
+        clock.advance(5.999)
+        assert svc.get_burn_test_status().cycles_completed == 2
+        clock.advance(0.001)
+        status = svc.get_burn_test_status()
+        assert (status.running, status.cycles_completed) == (False, 3)
+
+    def test_audit_uses_clock_time(
+        self, mock_device: MockRelayDevice, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        clock = VirtualClock(wall_start=0.0)
+        svc = RelayService(mock_device, channels=2, clock=clock)
+        clock.advance(90.0)
+        with caplog.at_level(logging.INFO, logger="relay.audit"):
+            svc.set_channel(1, RelayState.ON)
+        assert "1970-01-01T00:01:30+00:00 | set_channel" in caplog.text
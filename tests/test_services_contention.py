@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app.core.device import MockRelayDevice
+from app.models.schemas import CommandPriority, RelayState
+from app.services.contention import ContentionProfiler
+from app.services.relay_service import RelayService
+from app.services.scheduler import DeviceScheduler
+
+
+# ─── Helpers ───
+
+
+class _SlowDevice(MockRelayDevice):
+    def __init__(self, delay_s: float) -> None:
+        super().__init__(channels=2)
+        self.delay_s = delay_s
+        self.open()
+
+    def set_channel(self, channel: int, on: bool) -> None:
+        time.sleep(self.delay_s)
+        super().set_channel(channel, on)
+
+
+class TestContentionProfiler:
+    def test_disabled_records_nothing(self) -> None:
+        scheduler = DeviceScheduler()
+        with scheduler.slot(CommandPriority.INTERACTIVE, "api", "set_channel"):
+            pass
+        profile = scheduler.contention_profile()
+        assert profile.enabled is False
+        assert profile.operations == []
+
+    def test_records_wait_and_hold_per_operation(self) -> None:
+        scheduler = DeviceScheduler(ContentionProfiler(enabled=True))
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold() -> None:
+            with scheduler.slot(CommandPriority.BACKGROUND, "burn_test", "set_channel"):
+                holding.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold, name="holder")
+        holder.start()
+        holding.wait()
+        profile = scheduler.contention_profile()
+        assert profile.holder is not None
+        assert profile.holder.source == "burn_test"
+        assert profile.holder.thread == "holder"
+
+        def wait() -> None:
+            with scheduler.slot(CommandPriority.INTERACTIVE, "api", "set_channel"):
+                pass
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        while scheduler.contention_profile().queue_depth == 0:
+            time.sleep(0.001)
+        time.sleep(0.01)
+        release.set()
+        holder.join()
+        waiter.join()
+
+        top = scheduler.contention_profile().operations[0]
+        assert (top.operation, top.source) == ("set_channel", "api")
+        assert top.contended == 1
+        assert top.max_queue_depth == 1
+        assert top.total_wait_ms >= 10.0
+
+    def test_enabling_clears_previous_data(self) -> None:
+        profiler = ContentionProfiler(enabled=True)
+        profiler.acquired("all_off", "fail_safe", CommandPriority.FAIL_SAFE, 0.0, 0)
+        profiler.released()
+        profiler.set_enabled(False)
+        assert len(profiler.report(0).operations) == 1
+        profiler.set_enabled(True)
+        assert profiler.report(0).operations == []
+
+    def test_top_limits_operations(self) -> None:
+        profiler = ContentionProfiler(enabled=True)
+        for name, waited in (("a", 0.1), ("b", 0.3), ("c", 0.2)):
+            profiler.acquired(name, "api", CommandPriority.INTERACTIVE, waited, 1)
+            profiler.released()
+        names = [op.operation for op in profiler.report(0, top=2).operations]
+        assert names == ["b", "c"]
+
+
+class TestServiceLockProfile:
+    def test_device_io_attributed_to_holder(self) -> None:
+        service = RelayService(_SlowDevice(0.005), channels=2, lock_profiling=True)
+        service.set_channel(1, RelayState.ON)
+        service.set_all_channels(RelayState.OFF)
+        ops = {op.operation: op for op in service.get_lock_profile().operations}
+        assert ops["set_channel"].device_io_ms >= 5.0
+        assert ops["set_all_channels"].device_io_ms >= 10.0
+        assert ops["set_all_channels"].priority == CommandPriority.FAIL_SAFE
+        for op in ops.values():
+            assert op.total_hold_ms >= op.device_io_ms
+
+    def test_switch_at_runtime(self, service: RelayService) -> None:
+        service.set_channel(1, RelayState.ON)
+        assert service.get_lock_profile().operations == []
+        assert service.set_lock_profiling(True).enabled is True
+        service.set_channel(1, RelayState.OFF)
+        assert service.get_lock_profile().operations[0].acquisitions == 1
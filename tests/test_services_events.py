@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app.core.device import MockRelayDevice
+from app.core.exceptions import DeviceConnectionError
+from app.models.schemas import RelayState
+from app.services.events import EventBus, EventType, RelayEvent
+from app.services.relay_service import RelayService
+from tests.test_services import _FailingMockDevice
+
+
+def _event(version: int = 0) -> RelayEvent:
+    return RelayEvent(EventType.CHANNEL_SET, 1, RelayState.ON, version, 0.0)
+
+
+class TestEventBus:
+    def test_each_subscriber_gets_every_event(self) -> None:
+        bus = EventBus()
+        a, b = bus.subscribe(), bus.subscribe()
+        bus.publish(_event())
+        assert a.get_nowait() == _event()
+        assert b.get_nowait() == _event()
+
+    def test_publish_without_subscribers_is_noop(self) -> None:
+        bus = EventBus()
+        assert bus.has_subscribers is False
+        bus.publish(_event())
+
+    def test_full_queue_drops_oldest(self) -> None:
+        bus = EventBus()
+        sub = bus.subscribe(maxsize=2)
+        for v in range(5):
+            bus.publish(_event(v))
+        assert [e.version for e in sub.drain()] == [3, 4]
+        assert sub.dropped == 3
+
+    def test_unsubscribe_stops_delivery(self) -> None:
+        bus = EventBus()
+        with bus.subscribe() as sub:
+            pass
+        bus.publish(_event())
+        assert sub.get_nowait() is None
+        assert bus.has_subscribers is False
+
+    def test_get_times_out_when_empty(self) -> None:
+        sub = EventBus().subscribe()
+        assert sub.get(timeout=0.01) is None
+
+    def test_get_wakes_on_publish_from_other_thread(self) -> None:
+        bus = EventBus()
+        sub = bus.subscribe()
+        timer = threading.Timer(0.02, bus.publish, args=(_event(),))
+        timer.start()
+        assert sub.get(timeout=2.0) == _event()
+        timer.join()
+
+
+class TestServiceEvents:
+    def test_set_channel_publishes_with_version(
+        self, service: RelayService
+    ) -> None:
+        sub = service.events.subscribe()
+        service.set_channel(1, RelayState.ON)
+        event = sub.get_nowait()
+        assert event is not None
+        assert event.type == EventType.CHANNEL_SET
+        assert event.channel == 1
+        assert event.state == RelayState.ON
+        assert event.version == service.state_version == 1
+
+    def test_version_unchanged_when_state_unchanged(
+        self, service: RelayService
+    ) -> None:
+        service.set_channel(1, RelayState.OFF)
+        assert service.state_version == 0
+
+    def test_bulk_and_fail_safe_publish(self, service: RelayService) -> None:
+        sub = service.events.subscribe()
+        service.set_all_channels(RelayState.ON)
+        service.all_off()
+        types = [e.type for e in sub.drain()]
+        assert types == [EventType.ALL_SET, EventType.FAIL_SAFE]
+        assert service.state_version == 2
+
+    def test_pulse_off_publishes(self, mock_device: MockRelayDevice) -> None:
+        svc = RelayService(mock_device, channels=2, pulse_ms=10)
+        sub = svc.events.subscribe()
+        svc.set_channel(1, RelayState.ON)
+        assert sub.get(timeout=1.0) is not None  # channel_set
+        event = sub.get(timeout=2.0)
+        assert event is not None
+        assert event.type == EventType.PULSE_OFF
+        assert event.state == RelayState.OFF
+
+    def test_burn_test_publishes_lifecycle(self, service: RelayService) -> None:
+        sub = service.events.subscribe(maxsize=4096)
+        service.start_burn_test(cycles=2, delay_ms=1)
+        assert service._burn_thread is not None
+        service._burn_thread.join(timeout=5.0)
+        types = [e.type for e in sub.drain()]
+        assert types[0] == EventType.BURN_STARTED
+        assert types.count(EventType.BURN_CYCLE) == 2
+        assert types[-1] == EventType.BURN_FINISHED
+
+    def test_failed_bulk_write_keeps_version(self) -> None:
+        device = _FailingMockDevice(fail_on_channel=2, channels=2)
+        device.open()
+        svc = RelayService(device, channels=2)
+        sub = svc.events.subscribe()
+        with pytest.raises(DeviceConnectionError):
+            svc.set_all_channels(RelayState.ON)
+        assert svc.state_version == 0
+        assert sub.get_nowait() is None
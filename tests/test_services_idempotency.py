@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app.core.exceptions import IdempotencyKeyConflictError
+from app.services.idempotency import IdempotencyCache
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestIdempotencyCache:
+    def test_first_call_runs(self) -> None:
+        cache = IdempotencyCache()
+        assert cache.run("k", "fp", lambda: 42) == (42, False)
+
+    def test_replay_returns_cached_without_running(self) -> None:
+        cache = IdempotencyCache()
+        calls: list[int] = []
+        cache.run("k", "fp", lambda: calls.append(1) or "first")
+        result = cache.run("k", "fp", lambda: calls.append(1) or "second")
+        assert result == ("first", True)
+        assert len(calls) == 1
+
+    def test_fingerprint_mismatch_raises(self) -> None:
+        cache = IdempotencyCache()
+        cache.run("k", "fp-a", lambda: 1)
+        with pytest.raises(IdempotencyKeyConflictError):
+            cache.run("k", "fp-b", lambda: 2)
+
+    def test_entry_expires_after_ttl(self) -> None:
+        clock = _FakeClock()
+        cache = IdempotencyCache(ttl_s=10, clock=clock)
+        cache.run("k", "fp", lambda: 1)
+        clock.now = 11.0
+        assert cache.run("k", "fp", lambda: 2) == (2, False)
+
+    def test_lru_eviction_caps_size(self) -> None:
+        cache = IdempotencyCache(max_entries=2)
+        cache.run("a", "fp", lambda: 1)
+        cache.run("b", "fp", lambda: 2)
+        cache.run("a", "fp", lambda: 1)  # touch: "b" is now least recent
+        cache.run("c", "fp", lambda: 3)
+        assert len(cache) == 2
+        assert cache.run("a", "fp", lambda: 0) == (1, True)
+        assert cache.run("b", "fp", lambda: 0) == (0, False)
+
+    def test_failure_is_not_cached(self) -> None:
+        cache = IdempotencyCache()
+
+        def boom() -> int:
+            raise RuntimeError("device gone")
+
+        with pytest.raises(RuntimeError):
+            cache.run("k", "fp", boom)
+        assert cache.run("k", "fp", lambda: 5) == (5, False)
+
+    def test_concurrent_duplicate_waits_for_in_flight(self) -> None:
+        cache = IdempotencyCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls: list[int] = []
+
+        def slow() -> str:
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5.0)
+            return "done"
+
+        results: list[tuple[str, bool]] = []
+        owner = threading.Thread(
+            target=lambda: results.append(cache.run("k", "fp", slow))
+        )
+        owner.start()
+        started.wait(timeout=5.0)
+        waiter = threading.Thread(
+            target=lambda: results.append(cache.run("k", "fp", slow))
+        )
+        waiter.start()
+        release.set()
+        owner.join()
+        waiter.join()
+
+        assert len(calls) == 1
+        assert sorted(results) == [("done", False), ("done", True)]
+
+    def test_keys_are_scoped_per_client(self) -> None:
+        cache = IdempotencyCache()
+        cache.run("k", "fp-a", lambda: 1, client="10.0.0.1")
+        assert cache.run("k", "fp-b", lambda: 2, client="10.0.0.2") == (2, False)
+        assert cache.run("k", "fp-a", lambda: 0, client="10.0.0.1") == (1, True)
+
+    def test_size_cap_never_evicts_in_flight(self) -> None:
+        cache = IdempotencyCache(max_entries=1)
+
+        def outer() -> int:
+            # While "a" is running, newer keys must not push it out.
+            cache.run("b", "fp", lambda: 2)
+            cache.run("c", "fp", lambda: 3)
+            return 1
+
+        cache.run("a", "fp", outer)
+        assert cache.run("a", "fp", lambda: 0) == (1, True)
+        assert cache.run("b", "fp", lambda: 0) == (0, False)
+
+    def test_in_flight_head_does_not_stop_expiry(self) -> None:
+        clock = _FakeClock()
+        cache = IdempotencyCache(ttl_s=10, clock=clock)
+
+        def outer() -> int:
+            cache.run("b", "fp", lambda: 2)
+            clock.now = 11.0
+            cache.run("c", "fp", lambda: 3)
+            assert len(cache) == 2  # "a" in flight and "c"; "b" expired
+            return 1
+
+        cache.run("a", "fp", outer)
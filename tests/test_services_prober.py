@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import threading
+
+from app.core.device import MockRelayDevice
+from app.services.prober import DeviceProber
+from app.services.relay_service import RelayService
+
+
+# ─── Helpers ───
+
+
+class _CountingService(RelayService):
+    def __init__(self) -> None:
+        super().__init__(MockRelayDevice(channels=2), channels=2)
+        self.probes = 0
+        self.probed = threading.Event()
+
+    def probe_device(self) -> bool:
+        self.probes += 1
+        if self.probes >= 3:
+            self.probed.set()
+        return super().probe_device()
+
+
+class TestDeviceProber:
+    def test_probes_on_interval_until_stopped(self) -> None:
+        service = _CountingService()
+        prober = DeviceProber(service, interval_s=0.005)
+        prober.start()
+        try:
+            assert service.probed.wait(2.0)
+        finally:
+            prober.stop()
+        probes = service.probes
+        assert service.is_device_connected is True
+        threading.Event().wait(0.02)
+        assert service.probes == probes
+
+    def test_probe_errors_do_not_stop_the_thread(self) -> None:
+        service = _CountingService()
+        calls = threading.Semaphore(0)
+
+        def failing_probe() -> bool:
+            calls.release()
+            raise RuntimeError("boom")
+
+        service.probe_device = failing_probe  # type: ignore[method-assign]
+        prober = DeviceProber(service, interval_s=0.005)
+        prober.start()
+        try:
+            assert calls.acquire(timeout=2.0)
+            assert calls.acquire(timeout=2.0)
+        finally:
+            prober.stop()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app.models.schemas import CommandPriority, RelayState
+from app.services.relay_service import RelayService
+from app.services.scheduler import DeviceScheduler
+
+
+def _wait_queued(scheduler: DeviceScheduler, count: int) -> None:
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        if sum(c.queued for c in scheduler.stats().classes) >= count:
+            return
+        time.sleep(0.001)
+    raise AssertionError(f"{count} waiters never queued")
+
+
+def _queue(
+    scheduler: DeviceScheduler,
+    order: list[str],
+    label: str,
+    priority: CommandPriority,
+    source: str = "default",
+) -> threading.Thread:
+    def run() -> None:
+        with scheduler.slot(priority, source):
+            order.append(label)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+class TestDeviceScheduler:
+    def test_uncontended_acquire_does_not_queue(self) -> None:
+        scheduler = DeviceScheduler()
+        with scheduler.slot():
+            pass
+        stats = scheduler.stats().classes[1]
+        assert stats.priority == CommandPriority.INTERACTIVE
+        assert stats.acquisitions == 1
+        assert stats.contended == 0
+
+    def test_fail_safe_jumps_background_queue(self) -> None:
+        scheduler = DeviceScheduler()
+        order: list[str] = []
+        scheduler.acquire()
+        threads = [
+            _queue(scheduler, order, f"bg{i}", CommandPriority.BACKGROUND)
+            for i in range(5)
+        ]
+        _wait_queued(scheduler, 5)
+        threads.append(
+            _queue(scheduler, order, "off", CommandPriority.FAIL_SAFE)
+        )
+        _wait_queued(scheduler, 6)
+        scheduler.release()
+        for t in threads:
+            t.join(timeout=5.0)
+        assert order[0] == "off"
+        assert sorted(order[1:]) == [f"bg{i}" for i in range(5)]
+
+    def test_priority_classes_served_in_order(self) -> None:
+        scheduler = DeviceScheduler()
+        order: list[str] = []
+        scheduler.acquire()
+        threads = [
+            _queue(scheduler, order, "bg", CommandPriority.BACKGROUND),
+        ]
+        _wait_queued(scheduler, 1)
+        threads.append(
+            _queue(scheduler, order, "api", CommandPriority.INTERACTIVE)
+        )
+        _wait_queued(scheduler, 2)
+        threads.append(_queue(scheduler, order, "off", CommandPriority.FAIL_SAFE))
+        _wait_queued(scheduler, 3)
+        scheduler.release()
+        for t in threads:
+            t.join(timeout=5.0)
+        assert order == ["off", "api", "bg"]
+
+    def test_round_robin_between_sources_in_class(self) -> None:
+        scheduler = DeviceScheduler()
+        order: list[str] = []
+        scheduler.acquire()
+        threads = []
+        for i in range(3):
+            threads.append(
+                _queue(scheduler, order, "burn", CommandPriority.BACKGROUND, "burn")
+            )
+            _wait_queued(scheduler, 2 * i + 1)
+            threads.append(
+                _queue(
+                    scheduler, order, "sched", CommandPriority.BACKGROUND, "sched"
+                )
+            )
+            _wait_queued(scheduler, 2 * i + 2)
+        scheduler.release()
+        for t in threads:
+            t.join(timeout=5.0)
+        assert order == ["burn", "sched"] * 3
+
+    def test_contended_wait_is_recorded(self) -> None:
+        scheduler = DeviceScheduler()
+        order: list[str] = []
+        scheduler.acquire()
+        thread = _queue(scheduler, order, "off", CommandPriority.FAIL_SAFE)
+        _wait_queued(scheduler, 1)
+        time.sleep(0.02)
+        scheduler.release()
+        thread.join(timeout=5.0)
+        stats = scheduler.stats().classes[0]
+        assert stats.contended == 1
+        assert stats.queued == 0
+        assert stats.max_wait_ms >= 10.0
+
+
+class TestServicePriorities:
+    def test_all_off_counts_as_fail_safe(self, service: RelayService) -> None:
+        service.all_off()
+        stats = {c.priority: c for c in service.get_scheduler_stats().classes}
+        assert stats[CommandPriority.FAIL_SAFE].acquisitions == 1
+        assert stats[CommandPriority.INTERACTIVE].acquisitions == 0
+
+    def test_bulk_off_is_fail_safe_bulk_on_is_interactive(
+        self, service: RelayService
+    ) -> None:
+        service.set_all_channels(RelayState.ON)
+        service.set_all_channels(RelayState.OFF)
+        stats = {c.priority: c for c in service.get_scheduler_stats().classes}
+        assert stats[CommandPriority.FAIL_SAFE].acquisitions == 1
+        assert stats[CommandPriority.INTERACTIVE].acquisitions == 1
+
+    def test_burn_test_runs_as_background(self, service: RelayService) -> None:
+        service.start_burn_test(cycles=1, delay_ms=1)
+        assert service._burn_thread is not None
+        service._burn_thread.join(timeout=5.0)
+        stats = {c.priority: c for c in service.get_scheduler_stats().classes}
+        assert stats[CommandPriority.BACKGROUND].acquisitions == 4
+        assert stats[CommandPriority.INTERACTIVE].acquisitions == 0